@@ -0,0 +1,41 @@
+from fastapi import HTTPException, Request
+
+from backend.app.database.supabase_client import SupabaseClient, database
+from backend.app.services.registry import ServiceRegistry, registry
+from backend.app.services.embedding_service import EmbeddingService
+from backend.app.services.pinecone_service import PineconeService
+from backend.app.services.llm_service import LLMService
+from backend.app.services.priority_service import PriorityService
+
+
+async def get_registry(request: Request) -> ServiceRegistry:
+    """Shared services created in the lifespan hook (initialized on demand if it did not run)"""
+    services = getattr(request.app.state, "services", None) or registry
+    if not services.initialized:
+        await services.initialize()
+    return services
+
+
+async def get_embedding_service(request: Request) -> EmbeddingService:
+    return (await get_registry(request)).embedding
+
+
+async def get_pinecone_service(request: Request) -> PineconeService:
+    return (await get_registry(request)).pinecone
+
+
+async def get_llm_service(request: Request) -> LLMService:
+    return (await get_registry(request)).llm
+
+
+async def get_priority_service(request: Request) -> PriorityService:
+    return (await get_registry(request)).priority
+
+
+async def get_database() -> SupabaseClient:
+    """Shared data-access layer; opened on first use without loading any models"""
+    if not database.initialized:
+        await database.initialize()
+    if not database.available:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    return database
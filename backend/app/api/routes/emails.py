@@ -1,251 +1,262 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-import uuid
-from datetime import datetime
+import asyncio
+import hmac
+import json
 import time
 
 from backend.app.models.email import Email, EmailCreate, EmailAnalysis, FetchInboxRequest
-from backend.app.services.email_service import EmailService
-from backend.app.services.embedding_service import EmbeddingService
-from backend.app.services.pinecone_service import PineconeService
-from backend.app.services.priority_service import PriorityService
-from backend.app.services.llm_service import LLMService
-from backend.app.database.supabase_client import SupabaseClient
-from backend.app.utils.metrics import MetricsCollector
+from backend.app.api.dependencies import get_database, get_registry
+from backend.app.services.batch_service import BatchAnalyzer
+from backend.app.services.fetch_pipeline import record_results, stream_inbox_analysis
+from backend.app.config import settings
+from backend.app.services.imap_watcher import InboxWatcher, watchers
+from backend.app.services.registry import ServiceRegistry
+from backend.app.database.supabase_client import SupabaseClient, encode_cursor
+from backend.app.utils.metrics import metrics
+from backend.app.utils.tracing import span, start_trace, wants_timings
 from backend.app.services.imap_service import fetch_emails
 
 router = APIRouter()
-metrics = MetricsCollector()
 
 
-@router.post("/analyze", response_model=EmailAnalysis)
-async def analyze_email(email_data: EmailCreate):
+@router.post("/analyze", response_model=EmailAnalysis, response_model_exclude_none=True)
+async def analyze_email(
+    email_data: EmailCreate,
+    request: Request,
+    services: ServiceRegistry = Depends(get_registry),
+):
     """Analyze a single email and return priority score"""
     start_time = time.time()
     
+    with start_trace("analyze_email") as trace, metrics.in_flight():
+        try:
+            item = BatchAnalyzer.normalize_email(email_data.model_dump())
+            email_id = item["email_id"]
+            
+            # Same email analyzed before: no model calls, no second vector
+            cached = (await services.batch.cached([item], "default_user")).get(email_id)
+            if cached is not None:
+                analysis = {k: v for k, v in cached.items() if k != "email_id"}
+            else:
+                analysis = await _analyze_one(email_data, item, services)
+            
+            # Record metrics
+            latency = (time.time() - start_time) * 1000
+            metrics.record_email_processing(latency, success=True)
+            metrics.record_analysis(analysis["priority_level"], analysis["intent"])
+            
+        except Exception as e:
+            latency = (time.time() - start_time) * 1000
+            metrics.record_email_processing(latency, success=False)
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    result = EmailAnalysis(email_id=email_id, **analysis)
+    if wants_timings(request.headers):
+        result.timings = trace.timings()
+    return result
+
+
+async def _analyze_one(email_data: EmailCreate, item: dict, services: ServiceRegistry) -> dict:
+    # Embed once, alongside sentiment and zero-shot; the same vector feeds similarity scoring and the upsert
+    embedding_task = asyncio.ensure_future(services.embedding.generate_embedding(
+        f"{email_data.subject} {email_data.body}"
+    ))
+    
+    # Calculate priority
     try:
-        # Initialize services
-        embedding_service = EmbeddingService()
-        if embedding_service.model is None:
-            await embedding_service.initialize()
-        
-        pinecone_service = PineconeService()
-        if pinecone_service.index is None:
-            await pinecone_service.initialize()
-        
-        llm_service = LLMService()
-        if llm_service.sentiment_analyzer is None:
-            await llm_service.initialize()
-        
-        # Calculate priority
-        priority_service = PriorityService(
-            embedding_service,
-            pinecone_service,
-            llm_service
-        )
-        
-        analysis = await priority_service.calculate_priority(
+        analysis = await services.priority.calculate_priority(
             subject=email_data.subject,
             body=email_data.body,
             sender=email_data.sender,
-            received_at=email_data.received_at,
-            user_id="default_user"  # TODO: Get from auth
+            received_at=item["received_at"],
+            user_id="default_user",  # TODO: Get from auth
+            embedding=embedding_task
         )
-        
-        # Generate embedding and store in Pinecone
-        embedding = embedding_service.generate_embedding(
-            f"{email_data.subject} {email_data.body}"
-        )
-        
-        email_id = str(uuid.uuid4())
-        await pinecone_service.upsert_email_embedding(
-            email_id=email_id,
-            embedding=embedding,
-            metadata={
-                "subject": email_data.subject,
-                "sender": email_data.sender,
-                "priority_score": analysis["priority_score"],
-                "priority_level": analysis["priority_level"],
-                "intent": analysis["intent"],
-                "received_at": email_data.received_at.isoformat()
-            }
-        )
-        
-        # Record metrics
-        latency = (time.time() - start_time) * 1000
-        metrics.record_email_processing(latency, success=True)
-        
-        return EmailAnalysis(
-            email_id=email_id,
-            **analysis
-        )
-        
-    except Exception as e:
-        latency = (time.time() - start_time) * 1000
-        metrics.record_email_processing(latency, success=False)
-        raise HTTPException(status_code=500, detail=str(e))
+        embedding = await embedding_task
+    except BaseException:
+        embedding_task.cancel()
+        raise
+    
+    # Store in Pinecone under the fingerprint, so a re-send overwrites instead of duplicating
+    email_id = item["email_id"]
+    await services.pinecone.upsert_email_embedding(
+        email_id=email_id,
+        embedding=embedding,
+        metadata={
+            "subject": email_data.subject,
+            "sender": email_data.sender,
+            "priority_score": analysis["priority_score"],
+            "priority_level": analysis["priority_level"],
+            "intent": analysis["intent"],
+            "received_at": item["received_at"].isoformat(),
+            "embedding_variant": services.embedding.variant,
+        }
+    )
+    await services.batch.persist([BatchAnalyzer.email_row(email_id, item, analysis)])
+    await services.batch.remember([item], [{"email_id": email_id, **analysis}], "default_user")
+    return analysis
 
 
 @router.post("/batch-analyze")
-async def batch_analyze_emails(emails: List[EmailCreate]):
-    results = []
+async def batch_analyze_emails(
+    emails: List[EmailCreate],
+    request: Request,
+    services: ServiceRegistry = Depends(get_registry),
+):
+    """Analyze many emails with batched embedding, sentiment and upsert"""
+    if not emails:
+        return {"results": [], "total": 0}
     
-    for email_data in emails:
-        try:
-            # Reuse analyze_email logic
-            import time
-            start_time = time.time()
-            
-            embedding_service = EmbeddingService()
-            if embedding_service.model is None:
-                await embedding_service.initialize()
-            
-            pinecone_service = PineconeService()
-            if pinecone_service.index is None:
-                await pinecone_service.initialize()
-            
-            llm_service = LLMService()
-            if llm_service.sentiment_analyzer is None:
-                await llm_service.initialize()
-            
-            priority_service = PriorityService(
-                embedding_service,
-                pinecone_service,
-                llm_service
-            )
-            
-            analysis = await priority_service.calculate_priority(
-                subject=email_data.subject,
-                body=email_data.body,
-                sender=email_data.sender,
-                received_at=email_data.received_at,
-                user_id="default_user"
-            )
-            
-            email_id = str(uuid.uuid4())
-            embedding = embedding_service.generate_embedding(
-                f"{email_data.subject} {email_data.body}"
-            )
-            
-            await pinecone_service.upsert_email_embedding(
-                email_id=email_id,
-                embedding=embedding,
-                metadata={
-                    "subject": email_data.subject,
-                    "sender": email_data.sender,
-                    "priority_score": analysis["priority_score"],
-                    "priority_level": analysis["priority_level"],
-                    "intent": analysis["intent"],
-                    "received_at": email_data.received_at.isoformat()
-                }
-            )
-            
-            latency = (time.time() - start_time) * 1000
-            metrics.record_email_processing(latency, success=True)
-            
-            results.append({
-                "email_id": email_id,
-                **analysis
-            })
-        except Exception as e:
-            results.append({"error": str(e)})
+    start_time = time.time()
+    with start_trace("batch_analyze", emails=len(emails)) as trace, metrics.in_flight(len(emails)):
+        results = await services.batch.analyze(
+            [e.model_dump() for e in emails],
+            user_id="default_user"
+        )
     
-    return {"results": results, "total": len(results)}
+    per_email_latency = (time.time() - start_time) * 1000 / len(emails)
+    for result in results:
+        success = "error" not in result
+        metrics.record_email_processing(per_email_latency, success=success)
+        if success:
+            metrics.record_analysis(result["priority_level"], result["intent"])
+    
+    response = {"results": results, "total": len(results)}
+    if wants_timings(request.headers):
+        response["timings"] = trace.timings()
+    return response
 
 
 @router.post("/fetch")
-async def fetch_inbox(req: FetchInboxRequest):
+async def fetch_inbox(
+    req: FetchInboxRequest,
+    request: Request,
+    services: ServiceRegistry = Depends(get_registry),
+):
     """Fetch recent emails via IMAP, analyze each, and return results."""
-    import asyncio
-    import time
+    with start_trace("fetch_inbox", limit=req.limit) as trace:
+        response = await _fetch_and_analyze(req, services)
+    if wants_timings(request.headers):
+        response["timings"] = trace.timings()
+    return response
+
+
+@router.post("/fetch/stream")
+async def fetch_inbox_stream(
+    req: FetchInboxRequest,
+    request: Request,
+    format: str = "ndjson",
+    services: ServiceRegistry = Depends(get_registry),
+):
+    """Like /fetch, but each result is sent as soon as its email is scored.
+
+    format=ndjson (default) writes one JSON object per line; format=sse sends
+    server-sent events. The last message is {"done": true, "total": n}.
+    """
+    sse = format == "sse"
+    show_timings = wants_timings(request.headers)
 
+    def encode(event: dict) -> str:
+        data = json.dumps(event, default=str)
+        return f"data: {data}\n\n" if sse else data + "\n"
+
+    async def events():
+        total = 0
+        with start_trace("fetch_inbox_stream", limit=req.limit) as trace:
+            async for row in stream_inbox_analysis(
+                services, req.email, req.password, limit=req.limit, incremental=req.incremental
+            ):
+                if "error" not in row:
+                    total += 1
+                yield encode(row)
+        done = {"done": True, "total": total}
+        if show_timings:
+            done["timings"] = trace.timings()
+        yield encode(done)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+async def _fetch_and_analyze(req: FetchInboxRequest, services: ServiceRegistry) -> dict:
     def _fetch():
-        return fetch_emails(req.email, req.password, limit=req.limit)
+        return fetch_emails(req.email, req.password, limit=req.limit, incremental=req.incremental)
 
     try:
-        parsed_list = await asyncio.to_thread(_fetch)
+        with span("imap_fetch"):
+            parsed_list = await asyncio.to_thread(_fetch)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"IMAP fetch failed: {e}")
 
     if not parsed_list:
         return {"results": [], "total": 0}
 
-    embedding_service = EmbeddingService()
-    if embedding_service.model is None:
-        await embedding_service.initialize()
-    pinecone_service = PineconeService()
-    if pinecone_service.index is None:
-        await pinecone_service.initialize()
-    llm_service = LLMService()
-    if llm_service.sentiment_analyzer is None:
-        await llm_service.initialize()
-    priority_service = PriorityService(
-        embedding_service,
-        pinecone_service,
-        llm_service,
-    )
-
-    results = []
-    for p in parsed_list:
-        try:
-            recipient = (p.get("recipient") or "").strip()
-            if not recipient or "@" not in recipient:
-                recipient = "user@example.com"
-            sender = (p.get("sender") or "").strip() or "unknown@example.com"
-            subject = (p.get("subject") or "").strip() or "(No subject)"
-            body = (p.get("body") or "").strip() or "(No body)"
-            received_at = p.get("received_at") or datetime.now()
-            if not hasattr(received_at, "isoformat"):
-                received_at = datetime.now()
-
-            start = time.time()
-            analysis = await priority_service.calculate_priority(
-                subject=subject,
-                body=body,
-                sender=sender,
-                received_at=received_at,
-                user_id="default_user",
-            )
-            embedding = embedding_service.generate_embedding(f"{subject} {body}")
-            email_id = str(uuid.uuid4())
-            await pinecone_service.upsert_email_embedding(
-                email_id=email_id,
-                embedding=embedding,
-                metadata={
-                    "subject": subject,
-                    "sender": sender,
-                    "priority_score": analysis["priority_score"],
-                    "priority_level": analysis["priority_level"],
-                    "intent": analysis["intent"],
-                    "received_at": received_at.isoformat(),
-                },
-            )
-            latency_ms = (time.time() - start) * 1000
-            metrics.record_email_processing(latency_ms, success=True)
-            results.append({
-                "email_id": email_id,
-                "priority_score": analysis["priority_score"],
-                "priority_level": analysis["priority_level"],
-                "intent": analysis["intent"],
-                "sentiment": analysis["sentiment"],
-                "urgency_keywords": analysis.get("urgency_keywords") or [],
-                "sender_importance": analysis.get("sender_importance", 0.5),
-                "processing_time_ms": latency_ms,
-                "subject": subject,
-                "sender": sender,
-            })
-        except Exception as e:
-            print(f"Error processing email: {e}")
-            continue
+    # Same batched pipeline as /batch-analyze: one embed/sentiment/similarity pass per chunk
+    items = [BatchAnalyzer.normalize_email(p) for p in parsed_list]
+    start = time.time()
+    with metrics.in_flight(len(items)):
+        analyses = await services.batch.analyze(items, user_id="default_user")
+    latency_ms = (time.time() - start) * 1000 / len(items)
 
+    results = record_results(items, analyses, latency_ms)
     return {"results": results, "total": len(results)}
 
 
+@router.post("/watch")
+async def watch_inbox(
+    req: FetchInboxRequest,
+    services: ServiceRegistry = Depends(get_registry),
+):
+    """Keep an IMAP IDLE connection open and score new mail as it arrives"""
+    try:
+        watcher = await watchers.start(req.email, req.password, services)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"IMAP login failed: {e}")
+    return watcher.status()
+
+
+def _watcher_for(email: str, password: str) -> InboxWatcher:
+    """The account's watcher, if password is the one it was started with"""
+    watcher = watchers.get(email)
+    # Same answer for "not watched" and "wrong password", so addresses cannot be probed
+    if watcher is None or not watcher.matches(password):
+        raise HTTPException(status_code=404, detail="Not watching this inbox")
+    return watcher
+
+
+@router.get("/watch")
+async def list_watches(authorization: Optional[str] = Header(None)):
+    """Every watcher's status; needs Authorization: Bearer <WATCH_ADMIN_TOKEN>"""
+    token = settings.watch_admin_token
+    expected = f"Bearer {token}"
+    if not token or not authorization or not hmac.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Not allowed")
+    return {"watchers": watchers.status()}
+
+
+@router.get("/watch/{email}")
+async def get_watch(email: str, x_imap_password: str = Header(...)):
+    """Watcher status plus the most recently scored emails (newest first).
+
+    The mailbox password goes in the X-IMAP-Password header.
+    """
+    watcher = _watcher_for(email, x_imap_password)
+    return {**watcher.status(), "results": list(reversed(watcher.recent))}
+
+
+@router.delete("/watch/{email}")
+async def stop_watch(email: str, x_imap_password: str = Header(...)):
+    _watcher_for(email, x_imap_password)
+    if not await asyncio.to_thread(watchers.stop, email):
+        raise HTTPException(status_code=404, detail="Not watching this inbox")
+    return {"stopped": email}
+
+
 @router.get("/{email_id}", response_model=Email)
-async def get_email(email_id: str):
-    supabase_client = SupabaseClient()
-    supabase_client.initialize()
-    email_data = await supabase_client.get_email(email_id)
+async def get_email(email_id: str, db: SupabaseClient = Depends(get_database)):
+    email_data = await db.get_email(email_id)
     if not email_data:
         raise HTTPException(status_code=404, detail="Email not found")
     return email_data
@@ -256,14 +267,25 @@ async def get_user_emails(
     user_id: str,
     limit: int = 50,
     offset: int = 0,
-    priority_level: Optional[str] = None
+    priority_level: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: str = "full",
+    db: SupabaseClient = Depends(get_database),
 ):
-    supabase_client = SupabaseClient()
-    supabase_client.initialize()
-    emails = await supabase_client.get_user_emails(
-        user_id=user_id,
-        limit=limit,
-        offset=offset,
-        priority_level=priority_level
-    )
-    return {"emails": emails, "count": len(emails)}
+    """Highest priority first. Pass next_cursor back as cursor for the next page;
+    fields=list omits body and html_body."""
+    if fields not in ("list", "full"):
+        raise HTTPException(status_code=400, detail="fields must be 'list' or 'full'")
+    try:
+        emails = await db.get_user_emails(
+            user_id=user_id,
+            limit=limit,
+            offset=offset,
+            priority_level=priority_level,
+            cursor=cursor,
+            fields=fields,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = encode_cursor(emails[-1]) if emails and len(emails) == limit else None
+    return {"emails": emails, "count": len(emails), "next_cursor": next_cursor}
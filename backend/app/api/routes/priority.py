@@ -1,28 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from backend.app.api.dependencies import get_database
 from backend.app.models.email import EmailPriorityUpdate
 from backend.app.database.supabase_client import SupabaseClient
-from backend.app.utils.metrics import MetricsCollector
+from backend.app.utils.metrics import metrics
 
 router = APIRouter()
-metrics = MetricsCollector()
 
 
 @router.post("/{email_id}/feedback")
-async def update_priority_feedback(email_id: str, feedback: EmailPriorityUpdate):
-    from backend.app.database.supabase_client import SupabaseClient
-    
+async def update_priority_feedback(
+    email_id: str,
+    feedback: EmailPriorityUpdate,
+    db: SupabaseClient = Depends(get_database),
+):
     try:
-        supabase_client = SupabaseClient()
-        supabase_client.initialize()
-        
         updates = {}
         if feedback.priority_score is not None:
             updates["priority_score"] = feedback.priority_score
         if feedback.priority_level is not None:
-            updates["priority_level"] = feedback.priority_level
+            updates["priority_level"] = feedback.priority_level.value
         
         # Update in database
-        await supabase_client.update_email(email_id, updates)
+        await db.update_email(email_id, updates)
 
         if feedback.user_feedback:
             is_correct = feedback.user_feedback == "correct"
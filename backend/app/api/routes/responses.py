@@ -1,12 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional
+from backend.app.api.dependencies import get_llm_service
 from backend.app.services.llm_service import LLMService
-from backend.app.utils.metrics import MetricsCollector
+from backend.app.utils.metrics import metrics
 
 router = APIRouter()
-llm_service = LLMService()
-metrics = MetricsCollector()
 
 
 class ResponseRequest(BaseModel):
@@ -21,15 +20,12 @@ class ResponseReply(BaseModel):
 
 
 @router.post("/generate", response_model=ResponseReply)
-async def generate_response(request: ResponseRequest):
+async def generate_response(
+    request: ResponseRequest,
+    llm_service: LLMService = Depends(get_llm_service),
+):
     """Generate email response"""
-    from backend.app.services.llm_service import LLMService
-    
     try:
-        llm_service = LLMService()
-        if llm_service.sentiment_analyzer is None:
-            await llm_service.initialize()
-        
         response = await llm_service.generate_response(
             email_subject=request.email_subject,
             email_body=request.email_body,
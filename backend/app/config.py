@@ -6,20 +6,106 @@ class Settings(BaseSettings):
     # Supabase
     supabase_url: Optional[str] = None
     supabase_key: Optional[str] = None
+    database_url: Optional[str] = None  # postgres://... of the same database; pooled asyncpg instead of REST
+    database_pool_min_size: int = 1
+    database_pool_max_size: int = 10
+    persist_emails: bool = True  # store analyzed emails in the emails table when a database is configured
     
     # Pinecone
     pinecone_api_key: Optional[str] = None
     pinecone_environment: Optional[str] = None
     pinecone_index_name: str = "email-prioritizer"
+    vector_backend: str = "auto"  # "pinecone", "local", or "auto" (local when no Pinecone key)
+    local_vector_path: Optional[str] = None  # persist the local index (<path>.f32 + <path>.meta.json)
+    local_vector_ivf_threshold: int = 50000  # switch to approximate IVF search past this many vectors
+    local_vector_nprobe: int = 8
     
     # Hugging Face
     huggingface_api_key: Optional[str] = None
+    huggingface_api_url: str = "https://api-inference.huggingface.co"
+    hf_max_connections: int = 100
+    hf_max_concurrency_per_model: int = 16
+    hf_timeout_s: float = 30.0
+
+    # Local models: "api", "torch", "onnx" (int8 ONNX Runtime on CPU), or "auto"
+    # (API in production, torch otherwise). Build ONNX models with
+    # python -m backend.app.services.onnx_export
+    inference_backend: str = "auto"
+    onnx_model_dir: str = "models/onnx"
+    onnx_intra_op_threads: int = 0  # threads per model call; 0 = one per physical core
+    onnx_tokenizer_cache_size: int = 4096  # tokenized texts kept per model
+
+    # Concurrent scoring stages
+    inference_threads: int = 4
+    micro_batch_window_ms: float = 5.0  # coalesce concurrent local model calls; 0 disables
+    micro_batch_max_items: int = 32
+    sentiment_timeout_s: float = 10.0
+    zero_shot_timeout_s: float = 15.0
+    similarity_timeout_s: float = 5.0
 
     # App
     environment: str = "development"
     api_key: Optional[str] = None
     log_level: str = "INFO"
     use_llm_priority: bool = True
+    warmup_on_startup: bool = True
+    startup_in_background: bool = True  # load models after the server starts; /ready reports progress
+    trace_export_path: Optional[str] = None  # append OTLP/JSON spans to this file
+
+    # Batch analysis
+    batch_size: int = 32  # texts per model forward pass
+    batch_chunk_size: int = 256  # emails per embed/sentiment/score/upsert pass
+    pinecone_upsert_batch_size: int = 100
+
+    # Pinecone write-behind buffer (upserts leave the request path)
+    pinecone_write_behind: bool = True
+    pinecone_flush_interval_s: float = 1.0
+    pinecone_upsert_concurrency: int = 4
+    pinecone_upsert_retries: int = 3
+    pinecone_query_concurrency: int = 8  # parallel queries in search_similar_emails_batch
+
+    # Pinecone client (shared per process)
+    pinecone_use_grpc: bool = False  # requires pinecone[grpc]
+    pinecone_pool_threads: int = 4  # HTTP connection pool / gRPC worker threads
+    pinecone_health_interval_s: float = 60.0  # 0 disables the background probe
+
+    # Email parsing
+    email_max_body_bytes: int = 262144  # decoded bytes kept per text part
+    parse_processes: int = 0  # parse worker processes; 0 = one per usable CPU, 1 disables the pool
+    parse_pool_min_batch: int = 64  # smaller batches parse in-thread (IPC would cost more)
+    parse_chunk_size: int = 32  # messages per worker task
+
+    # IMAP incremental sync: last seen UID per account (kept in memory when unset)
+    imap_checkpoint_path: Optional[str] = None
+    imap_fetch_chunk_size: int = 50  # messages per FETCH round trip
+    imap_timeout_s: float = 30.0
+    imap_pool_size: int = 2  # idle logged-in sessions kept per account
+    imap_pool_idle_timeout_s: float = 600.0
+    imap_pool_noop_after_s: float = 30.0  # NOOP-check sessions idle longer than this
+    imap_idle_renew_s: float = 1500.0  # re-issue IDLE before the server's 30 min cutoff
+    imap_watch_batch_limit: int = 100  # messages ingested per IDLE wake-up
+    imap_watch_recent_results: int = 100  # scored results kept per watched account
+    watch_admin_token: Optional[str] = None  # bearer token for listing all watchers; unset disables GET /watch
+
+    # /fetch/stream pipeline
+    fetch_stream_queue_size: int = 32  # bound on each queue between stages
+    fetch_stream_workers: int = 2  # concurrent scoring workers
+
+    # Analysis results by email fingerprint (0 disables); redis_url shares them across workers
+    analysis_cache_size: int = 10000
+    analysis_cache_ttl_s: float = 86400.0
+    redis_url: Optional[str] = None
+
+    # Embedding cache (0 disables); set a directory to persist across restarts
+    embedding_cache_size: int = 10000
+    embedding_cache_dir: Optional[str] = None
+    embedding_cache_disk_capacity: int = 100000
+
+    def resolved_inference_backend(self) -> str:
+        backend = self.inference_backend.lower()
+        if backend == "auto":
+            return "api" if self.environment == "production" else "torch"
+        return backend
 
     class Config:
         env_file = ".env"
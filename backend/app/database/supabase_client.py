@@ -1,56 +1,289 @@
-from supabase import create_client, Client
-from backend.app.config import settings
-from typing import Optional, Dict, List
+"""Async data access for the users/emails tables in setup_database.sql.
+
+With DATABASE_URL set, queries go over a shared asyncpg connection pool.
+Otherwise the Supabase REST client is created once per process and its
+blocking calls run in worker threads, so neither path stalls the event loop.
+"""
+
+import asyncio
+import base64
+import json
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from backend.app.config import settings
+from backend.app.utils.tracing import span
+
+# Columns written by insert_emails, in unnest() parameter order
+_EMAIL_COLUMNS = (
+    ("id", "uuid"),
+    ("user_id", "uuid"),
+    ("subject", "text"),
+    ("sender", "text"),
+    ("recipient", "text"),
+    ("body", "text"),
+    ("priority_score", "float8"),
+    ("priority_level", "text"),
+    ("intent", "text"),
+    ("sentiment", "text"),
+    ("received_at", "timestamptz"),
+)
+
+# Re-analysis of a stored email refreshes these, never its content
+_SCORE_COLUMNS = ("priority_score", "priority_level", "intent", "sentiment")
+
+_INSERT_EMAILS_SQL = (
+    "INSERT INTO emails ({columns}) SELECT * FROM unnest({params}) "
+    "ON CONFLICT (id) DO UPDATE SET {updates}"
+).format(
+    columns=", ".join(name for name, _ in _EMAIL_COLUMNS),
+    params=", ".join(f"${i}::{kind}[]" for i, (_, kind) in enumerate(_EMAIL_COLUMNS, 1)),
+    updates=", ".join(f"{name} = EXCLUDED.{name}" for name in _SCORE_COLUMNS),
+)
+
+# Inbox list view: everything but the body columns
+LIST_COLUMNS = (
+    "id", "user_id", "subject", "sender", "recipient", "priority_score", "priority_level",
+    "intent", "sentiment", "is_read", "is_archived", "received_at",
+)
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque keyset cursor pointing just past row in inbox order"""
+    received_at = row["received_at"]
+    if isinstance(received_at, datetime):
+        received_at = received_at.isoformat()
+    key = [row["priority_score"], received_at, row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, datetime, str]:
+    """(priority_score, received_at, id); ValueError for a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, received_at, email_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), datetime.fromisoformat(received_at), str(email_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def _init_connection(conn):
+    # Hand ids back as plain strings and JSONB as dicts, like the REST client does
+    await conn.set_type_codec("uuid", encoder=str, decoder=str, schema="pg_catalog", format="text")
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
 
 
 class SupabaseClient:
     def __init__(self):
-        self.client: Optional[Client] = None
-    
-    def initialize(self):
-        """Initialize Supabase client"""
-        self.client = create_client(settings.supabase_url, settings.supabase_key)
-    
+        self.client = None  # supabase.Client (REST fallback)
+        self.pool = None  # asyncpg.Pool
+        self.initialized = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.pool is not None or self.client is not None
+
+    @property
+    def backend(self) -> Optional[str]:
+        if self.pool is not None:
+            return "postgres"
+        return "supabase" if self.client is not None else None
+
+    async def initialize(self):
+        """Open the pool (or REST client) once; safe to call repeatedly"""
+        if self.initialized:
+            return
+        async with self._lock:
+            if self.initialized:
+                return
+            if settings.database_url:
+                try:
+                    import asyncpg
+                except ImportError:
+                    raise RuntimeError("asyncpg not installed. Run: pip install asyncpg")
+                self.pool = await asyncpg.create_pool(
+                    settings.database_url,
+                    min_size=settings.database_pool_min_size,
+                    max_size=settings.database_pool_max_size,
+                    init=_init_connection,
+                )
+            elif settings.supabase_url and settings.supabase_key:
+                from supabase import create_client
+
+                self.client = await asyncio.to_thread(
+                    create_client, settings.supabase_url, settings.supabase_key
+                )
+            self.initialized = True
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+        self.pool = None
+        self.client = None
+        self.initialized = False
+
+    def _require(self):
+        if not self.available:
+            raise RuntimeError("Database not configured: set DATABASE_URL or SUPABASE_URL/SUPABASE_KEY")
+
+    async def _rest(self, build):
+        """Run a REST query built by build(client) off the event loop"""
+        result = await asyncio.to_thread(lambda: build(self.client).execute())
+        return result.data or []
+
     async def create_email(self, email_data: Dict) -> Dict:
         """Create a new email record"""
-        result = self.client.table("emails").insert(email_data).execute()
-        return result.data[0] if result.data else None
-    
+        self._require()
+        if self.pool is not None:
+            columns = list(email_data)
+            sql = "INSERT INTO emails ({}) VALUES ({}) RETURNING *".format(
+                ", ".join(columns), ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+            )
+            row = await self.pool.fetchrow(sql, *email_data.values())
+            return dict(row) if row else None
+        rows = await self._rest(lambda c: c.table("emails").insert(email_data))
+        return rows[0] if rows else None
+
+    async def insert_emails(self, emails: List[Dict]) -> int:
+        """Insert (or re-score) analyzed emails; returns the row count.
+
+        Over the pool this is one statement. Either way, an id that is
+        already stored only gets its _SCORE_COLUMNS refreshed.
+        """
+        if not emails:
+            return 0
+        self._require()
+        with span("db_write", rows=len(emails)):
+            if self.pool is not None:
+                columns = [[e.get(name) for e in emails] for name, _ in _EMAIL_COLUMNS]
+                await self.pool.execute(_INSERT_EMAILS_SQL, *columns)
+            else:
+                rows = [
+                    {
+                        name: e[name].isoformat() if name == "received_at" else e.get(name)
+                        for name, _ in _EMAIL_COLUMNS
+                    }
+                    for e in emails
+                ]
+                # PostgREST's upsert rewrites every column it is sent, so insert
+                # only the new ids, then refresh the scores of the stored ones
+                inserted = await self._rest(
+                    lambda c: c.table("emails").upsert(rows, on_conflict="id", ignore_duplicates=True)
+                )
+                new_ids = {str(r["id"]) for r in inserted}
+                await asyncio.gather(*(
+                    self._rest(
+                        lambda c, row=row: c.table("emails")
+                        .update({name: row[name] for name in _SCORE_COLUMNS})
+                        .eq("id", row["id"])
+                    )
+                    for row in rows
+                    if str(row["id"]) not in new_ids
+                ))
+        return len(emails)
+
     async def get_email(self, email_id: str) -> Optional[Dict]:
         """Get email by ID"""
-        result = self.client.table("emails").select("*").eq("id", email_id).execute()
-        return result.data[0] if result.data else None
-    
+        self._require()
+        if self.pool is not None:
+            row = await self.pool.fetchrow("SELECT * FROM emails WHERE id = $1::uuid", email_id)
+            return dict(row) if row else None
+        rows = await self._rest(lambda c: c.table("emails").select("*").eq("id", email_id))
+        return rows[0] if rows else None
+
     async def update_email(self, email_id: str, updates: Dict) -> Dict:
         """Update email record"""
-        result = self.client.table("emails").update(updates).eq("id", email_id).execute()
-        return result.data[0] if result.data else None
-    
+        self._require()
+        if not updates:
+            return await self.get_email(email_id)
+        if self.pool is not None:
+            assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(updates, 2))
+            row = await self.pool.fetchrow(
+                f"UPDATE emails SET {assignments} WHERE id = $1::uuid RETURNING *",
+                email_id, *updates.values(),
+            )
+            return dict(row) if row else None
+        rows = await self._rest(lambda c: c.table("emails").update(updates).eq("id", email_id))
+        return rows[0] if rows else None
+
     async def get_user_emails(
         self,
         user_id: str,
         limit: int = 50,
         offset: int = 0,
-        priority_level: Optional[str] = None
+        priority_level: Optional[str] = None,
+        cursor: Optional[str] = None,
+        fields: str = "full",
     ) -> List[Dict]:
-        """Get emails for a user"""
-        query = self.client.table("emails").select("*").eq("user_id", user_id)
-        
-        if priority_level:
-            query = query.eq("priority_level", priority_level)
-        
-        query = query.order("priority_score", desc=True).limit(limit).offset(offset)
-        result = query.execute()
-        
-        return result.data if result.data else []
-    
+        """Get emails for a user, highest priority first.
+
+        Pass the cursor of the previous page's last row (encode_cursor) to
+        continue after it: a keyset seek on idx_emails_user_inbox, so deep
+        pages cost the same as the first. offset is only used without a
+        cursor. fields="list" leaves out body and html_body.
+        """
+        self._require()
+        after = decode_cursor(cursor) if cursor else None
+        columns = ", ".join(LIST_COLUMNS) if fields == "list" else "*"
+        if self.pool is not None:
+            sql = f"SELECT {columns} FROM emails WHERE user_id = $1::uuid"
+            args: List = [user_id]
+            if priority_level:
+                args.append(priority_level)
+                sql += f" AND priority_level = ${len(args)}"
+            if after:
+                args.extend(after)
+                n = len(args)
+                sql += f" AND (priority_score, received_at, id) < (${n - 2}, ${n - 1}, ${n}::uuid)"
+            sql += " ORDER BY priority_score DESC, received_at DESC, id DESC"
+            args.append(limit)
+            sql += f" LIMIT ${len(args)}"
+            if not after and offset:
+                args.append(offset)
+                sql += f" OFFSET ${len(args)}"
+            return [dict(r) for r in await self.pool.fetch(sql, *args)]
+
+        def build(c):
+            query = c.table("emails").select(",".join(LIST_COLUMNS) if fields == "list" else "*")
+            query = query.eq("user_id", user_id)
+            if priority_level:
+                query = query.eq("priority_level", priority_level)
+            if after:
+                # PostgREST has no row comparison; spell out the tuple "<"
+                score, received_at, email_id = f'"{after[0]!r}"', f'"{after[1].isoformat()}"', after[2]
+                query = query.or_(
+                    f"priority_score.lt.{score},"
+                    f"and(priority_score.eq.{score},received_at.lt.{received_at}),"
+                    f"and(priority_score.eq.{score},received_at.eq.{received_at},id.lt.{email_id})"
+                )
+            query = query.order("priority_score", desc=True).order("received_at", desc=True)
+            query = query.order("id", desc=True).limit(limit)
+            return query if after or not offset else query.offset(offset)
+
+        return await self._rest(build)
+
     async def create_user(self, user_data: Dict) -> Dict:
         """Create a new user"""
-        result = self.client.table("users").insert(user_data).execute()
-        return result.data[0] if result.data else None
-    
+        self._require()
+        if self.pool is not None:
+            columns = list(user_data)
+            sql = "INSERT INTO users ({}) VALUES ({}) RETURNING *".format(
+                ", ".join(columns), ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+            )
+            row = await self.pool.fetchrow(sql, *user_data.values())
+            return dict(row) if row else None
+        rows = await self._rest(lambda c: c.table("users").insert(user_data))
+        return rows[0] if rows else None
+
     async def get_user(self, user_id: str) -> Optional[Dict]:
         """Get user by ID"""
-        result = self.client.table("users").select("*").eq("id", user_id).execute()
-        return result.data[0] if result.data else None
+        self._require()
+        if self.pool is not None:
+            row = await self.pool.fetchrow("SELECT * FROM users WHERE id = $1::uuid", user_id)
+            return dict(row) if row else None
+        rows = await self._rest(lambda c: c.table("users").select("*").eq("id", user_id))
+        return rows[0] if rows else None
+
+
+database = SupabaseClient()
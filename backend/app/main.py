@@ -1,30 +1,40 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import time
 
 from backend.app.config import settings
 from backend.app.api.routes import emails, priority, responses
-from backend.app.utils.metrics import MetricsCollector
-
-metrics = MetricsCollector()
+from backend.app.services.registry import registry
+from backend.app.services.imap_pool import imap_pool
+from backend.app.services.imap_watcher import watchers
+from backend.app.utils.metrics import metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Starting Email Prioritizer API...")
     print(f"Environment: {settings.environment}")
     
-    # Services initialized lazily on first use
-    app.state.supabase = None
-    app.state.embedding = None
-    app.state.pinecone = None
-    app.state.llm = None
+    # Shared services: models are loaded once per process, not per request
+    app.state.services = registry
+    app.state.supabase = registry.db
+    if settings.startup_in_background:
+        # Accept connections right away; requests that need models wait for them
+        registry.start(warmup=settings.warmup_on_startup)
+    else:
+        await registry.initialize(warmup=settings.warmup_on_startup)
     
     print("FastAPI app ready")
     
     yield
     
     print("Shutting down...")
+    # Watchers score through the registry, so stop them before closing it
+    await asyncio.to_thread(watchers.stop_all)
+    imap_pool.close_all()
+    await registry.close()
+    metrics.mark_process_dead()
 
 
 app = FastAPI(
@@ -66,10 +76,45 @@ async def health():
     }
 
 
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness probe: 503 until models are loaded (and warmed up, if enabled)"""
+    status = registry.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
 @app.get("/metrics")
 async def get_metrics():
     """Get performance metrics"""
-    return metrics.get_metrics()
+    result = metrics.get_metrics()
+    if registry.embedding is not None and registry.embedding.cache is not None:
+        result["embedding_cache"] = registry.embedding.cache.stats()
+    batchers = {
+        "embedding": registry.embedding.batcher if registry.embedding is not None else None,
+        "sentiment": registry.llm.batcher if registry.llm is not None else None,
+    }
+    if any(batchers.values()):
+        result["micro_batching"] = {name: b.stats for name, b in batchers.items() if b is not None}
+    if registry.analysis_cache is not None:
+        result["analysis_cache"] = registry.analysis_cache.stats()
+    if registry.pinecone is not None and registry.pinecone.index is not None:
+        result["vector_store"] = {
+            "backend": registry.pinecone.backend,
+            "healthy": registry.pinecone.healthy,
+            "last_health_check": registry.pinecone.last_health_check,
+        }
+    if registry.pinecone is not None and registry.pinecone.writer is not None:
+        result["vector_writer"] = {**registry.pinecone.writer.stats, "pending": registry.pinecone.writer.pending}
+    return result
+
+
+@app.get("/metrics/prometheus")
+async def get_prometheus_metrics():
+    """Prometheus text exposition (aggregated across workers in multiprocess mode)"""
+    body, content_type = metrics.prometheus_exposition()
+    return Response(content=body, media_type=content_type)
 
 
 if __name__ == "__main__":
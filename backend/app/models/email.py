@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -30,8 +30,9 @@ class EmailCreate(BaseModel):
     body: str
     sender: str
     recipient: Optional[str] = None
-    received_at: datetime = datetime.now()
+    received_at: Optional[datetime] = None  # undated: analysis uses the arrival time
     html_body: Optional[str] = None
+    message_id: Optional[str] = None  # Message-ID header; the most reliable fingerprint
 
 
 class Email(BaseModel):
@@ -64,6 +65,7 @@ class EmailAnalysis(BaseModel):
     urgency_keywords: List[str] = []
     sender_importance: float = 0.5
     processing_time_ms: float = 0.0
+    timings: Optional[Dict[str, float]] = None  # per-stage ms, only with X-Debug-Timings
 
 
 class FetchInboxRequest(BaseModel):
@@ -71,6 +73,7 @@ class FetchInboxRequest(BaseModel):
     email: str
     password: str
     limit: int = 10
+    incremental: bool = False  # only messages newer than the last incremental fetch
 
 
 class EmailPriorityUpdate(BaseModel):
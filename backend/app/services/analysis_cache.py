@@ -0,0 +1,152 @@
+"""Analysis results keyed by message fingerprint: in-memory TTL/LRU or Redis."""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from backend.app.config import settings
+from backend.app.services.embedding_cache import normalize_text
+
+# uuid5 namespace for email ids; changing it re-keys every stored email
+_EMAIL_NAMESPACE = uuid.UUID("6f1b1c1e-2f0a-5d3b-9a57-0e4d3c2b1a90")
+
+
+def fingerprint(
+    sender: str,
+    subject: str,
+    body: str,
+    received_at: Optional[datetime] = None,
+    message_id: Optional[str] = None,
+) -> str:
+    """Deterministic email id (a UUID string): from Message-ID when present, else the content"""
+    message_id = (message_id or "").strip().strip("<>").strip()
+    if message_id:
+        key = f"mid:{message_id}"
+    else:
+        date = received_at.isoformat() if isinstance(received_at, datetime) else ""
+        content = "\x1f".join([
+            sender.strip().lower(), normalize_text(subject), date, normalize_text(body),
+        ])
+        key = "sha256:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(_EMAIL_NAMESPACE, key))
+
+
+class AnalysisCache:
+    """In-process LRU of analysis dicts; entries expire ttl_s after they were stored"""
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> str:
+        return "memory"
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = dict(entry[1])
+        return found
+
+    async def put_many(self, items: Dict[str, Dict]):
+        expires = time.monotonic() + self.ttl_s
+        with self._lock:
+            for key, analysis in items.items():
+                self._entries[key] = (expires, dict(analysis))
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    async def close(self):
+        pass
+
+
+class RedisAnalysisCache(AnalysisCache):
+    """Same interface over Redis (shared by all workers); one MGET / one pipeline per batch"""
+
+    def __init__(self, url: str, ttl_s: float = 86400.0, prefix: str = "analysis:"):
+        super().__init__(max_entries=0, ttl_s=ttl_s)
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self.client = redis.from_url(url)
+
+    @property
+    def backend(self) -> str:
+        return "redis"
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        if not keys:
+            return {}
+        try:
+            values = await self.client.mget([self.prefix + k for k in keys])
+        except Exception as e:
+            # An unreachable cache only costs a re-score
+            print(f"Analysis cache read failed: {e}")
+            self.misses += len(keys)
+            return {}
+        found = {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, items: Dict[str, Dict]):
+        if not items:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, analysis in items.items():
+                    pipe.set(self.prefix + key, json.dumps(analysis), ex=int(self.ttl_s))
+                await pipe.execute()
+        except Exception as e:
+            print(f"Analysis cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        result = super().stats()
+        result.pop("entries")
+        return result
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_analysis_cache() -> Optional[AnalysisCache]:
+    """Cache per settings: Redis when redis_url is set, in-memory otherwise; None when disabled"""
+    if settings.analysis_cache_size <= 0:
+        return None
+    if settings.redis_url:
+        try:
+            return RedisAnalysisCache(settings.redis_url, ttl_s=settings.analysis_cache_ttl_s)
+        except ImportError:
+            print("redis not installed; using the in-memory analysis cache")
+    return AnalysisCache(settings.analysis_cache_size, settings.analysis_cache_ttl_s)
@@ -0,0 +1,175 @@
+"""Batched analysis pipeline: normalize -> cache lookup -> embed -> sentiment -> score -> bulk upsert."""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from backend.app.config import settings
+from backend.app.database.supabase_client import SupabaseClient
+from backend.app.services.analysis_cache import AnalysisCache, fingerprint
+from backend.app.services.embedding_service import EmbeddingService
+from backend.app.services.pinecone_service import PineconeService
+from backend.app.services.llm_service import LLMService
+from backend.app.services.priority_service import PriorityService
+
+
+class BatchAnalyzer:
+    """Analyze many emails with one model call per stage instead of one per email"""
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        pinecone_service: PineconeService,
+        llm_service: LLMService,
+        priority_service: PriorityService,
+        database: Optional[SupabaseClient] = None,
+        cache: Optional[AnalysisCache] = None,
+        batch_size: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ):
+        self.embedding_service = embedding_service
+        self.pinecone_service = pinecone_service
+        self.llm_service = llm_service
+        self.priority_service = priority_service
+        self.database = database
+        self.cache = cache
+        self.batch_size = batch_size or settings.batch_size
+        self.chunk_size = chunk_size or settings.batch_chunk_size
+
+    @staticmethod
+    def normalize_email(data: Dict) -> Dict:
+        """Fill defaults, fingerprint the email and build the text used for embedding and sentiment"""
+        subject = (data.get("subject") or "").strip() or "(No subject)"
+        body = (data.get("body") or "").strip() or "(No body)"
+        sender = (data.get("sender") or "").strip() or "unknown@example.com"
+        recipient = (data.get("recipient") or "").strip()
+        received_at = data.get("received_at")
+        if not hasattr(received_at, "isoformat"):
+            received_at = None
+        message_id = data.get("message_id")
+        # Fingerprint before defaulting the date to now, so an undated email keeps
+        # one id across requests, workers and restarts
+        email_id = data.get("email_id") or fingerprint(sender, subject, body, received_at, message_id)
+        return {
+            "email_id": email_id,
+            "message_id": message_id,
+            "subject": subject,
+            "body": body,
+            "sender": sender,
+            "recipient": recipient,
+            "received_at": received_at or datetime.now(),
+            "text": f"{subject} {body}",
+        }
+
+    @staticmethod
+    def email_row(email_id: str, item: Dict, analysis: Dict) -> Dict:
+        """emails table row for an analyzed email.
+
+        user_id stays NULL until auth exists, so these rows can be read by
+        id (GET /api/v1/emails/{email_id}) but are not listed by
+        /api/v1/emails/user/{user_id}/emails, which filters on user_id.
+        """
+        return {
+            "id": email_id,
+            "user_id": None,
+            "subject": item["subject"],
+            "sender": item["sender"],
+            "recipient": item.get("recipient") or "",
+            "body": item["body"],
+            "priority_score": analysis["priority_score"],
+            "priority_level": analysis["priority_level"],
+            "intent": analysis["intent"],
+            "sentiment": analysis["sentiment"],
+            "received_at": item["received_at"],
+        }
+
+    async def persist(self, rows: List[Dict]):
+        """Store analyzed emails in one batch; a database error never fails the analysis"""
+        if not rows or not settings.persist_emails or self.database is None or not self.database.available:
+            return
+        try:
+            await self.database.insert_emails(rows)
+        except Exception as e:
+            print(f"Error persisting emails: {e}")
+
+    @staticmethod
+    def _cache_key(item: Dict, user_id: str) -> str:
+        return f"{user_id}:{item['email_id']}"
+
+    async def cached(self, items: List[Dict], user_id: str) -> Dict[str, Dict]:
+        """Stored results ({"email_id", **analysis}) by email_id for already-analyzed items"""
+        if self.cache is None or not items:
+            return {}
+        keys = {self._cache_key(item, user_id): item["email_id"] for item in items}
+        found = await self.cache.get_many(list(keys))
+        return {keys[key]: result for key, result in found.items()}
+
+    async def remember(self, items: List[Dict], results: List[Dict], user_id: str):
+        if self.cache is None:
+            return
+        await self.cache.put_many({
+            self._cache_key(item, user_id): result
+            for item, result in zip(items, results)
+            if "error" not in result
+        })
+
+    async def analyze(self, emails: List[Dict], user_id: str = "default_user") -> List[Dict]:
+        """Analyze emails chunk by chunk; results keep the input order"""
+        results: List[Dict] = []
+        for i in range(0, len(emails), self.chunk_size):
+            chunk = emails[i:i + self.chunk_size]
+            try:
+                results.extend(await self._analyze_chunk(chunk, user_id))
+            except Exception as e:
+                print(f"Error analyzing batch chunk: {e}")
+                results.extend({"error": str(e)} for _ in chunk)
+        return results
+
+    async def _analyze_chunk(self, chunk: List[Dict], user_id: str) -> List[Dict]:
+        items = [self.normalize_email(e) for e in chunk]
+        # Emails scored before (e.g. on the previous poll) skip every model call
+        done = await self.cached(items, user_id)
+        pending: Dict[str, Dict] = {}
+        for item in items:
+            if item["email_id"] not in done:
+                pending.setdefault(item["email_id"], item)
+        if pending:
+            scored = await self._score(list(pending.values()), user_id)
+            await self.remember(list(pending.values()), scored, user_id)
+            done.update((result["email_id"], result) for result in scored)
+        return [dict(done[item["email_id"]]) for item in items]
+
+    async def _score(self, items: List[Dict], user_id: str) -> List[Dict]:
+        texts = [item["text"] for item in items]
+
+        embeddings = await self.embedding_service.generate_embeddings_batch(texts, batch_size=self.batch_size)
+        sentiments = await self.llm_service.analyze_sentiment_batch(texts, batch_size=self.batch_size)
+        analyses = await self.priority_service.calculate_priority_batch(
+            items, embeddings, sentiments, user_id=user_id
+        )
+
+        vectors = []
+        rows = []
+        results = []
+        for item, embedding, analysis in zip(items, embeddings, analyses):
+            email_id = item["email_id"]
+            vectors.append({
+                "id": email_id,
+                "values": embedding,
+                "metadata": {
+                    "subject": item["subject"],
+                    "sender": item["sender"],
+                    "priority_score": analysis["priority_score"],
+                    "priority_level": analysis["priority_level"],
+                    "intent": analysis["intent"],
+                    "received_at": item["received_at"].isoformat(),
+                    "embedding_variant": self.embedding_service.variant,
+                },
+            })
+            rows.append(self.email_row(email_id, item, analysis))
+            results.append({"email_id": email_id, **analysis})
+
+        await self.pinecone_service.upsert_email_embeddings(
+            vectors, batch_size=settings.pinecone_upsert_batch_size
+        )
+        await self.persist(rows)
+        return results
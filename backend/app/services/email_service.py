@@ -1,23 +1,41 @@
-from typing import List, Optional
+from typing import Union
 from datetime import datetime
-import email
+import html
+import re
+from email import policy
+from email.header import decode_header, make_header
+from email.parser import BytesParser
 from email.utils import parsedate_to_datetime
-from bs4 import BeautifulSoup
-from backend.app.models.email import Email, EmailCreate, PriorityLevel, EmailIntent
+from backend.app.config import settings
+
+try:
+    from lxml import etree as _etree
+    from lxml import html as _lxml_html
+except ImportError:
+    _etree = None
+    _lxml_html = None
+
+# compat32 parses ~10x faster than policy.default; the few headers we read are decoded explicitly
+_parser = BytesParser(policy=policy.compat32)
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style)\b[^>]*>.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]*>")
 
 
 class EmailService:
     """Service for email parsing and processing"""
     
-    def parse_email(raw_email: str) -> dict:
-        """Parse raw email string into structured data"""
-        msg = email.message_from_string(raw_email)
+    def parse_email(raw_email: Union[bytes, str]) -> dict:
+        """Parse a raw RFC822 message (bytes as fetched, or str) into structured data"""
+        if isinstance(raw_email, str):
+            raw_email = raw_email.encode("utf-8", errors="surrogateescape")
+        msg = _parser.parsebytes(raw_email)
         
         # Extract headers
-        subject = msg.get("Subject", "")
-        sender = msg.get("From", "")
-        recipient = msg.get("To", "")
-        date_str = msg.get("Date", "")
+        subject = EmailService._header(msg, "Subject")
+        sender = EmailService._header(msg, "From")
+        recipient = EmailService._header(msg, "To")
+        date_str = EmailService._header(msg, "Date")
+        message_id = EmailService._header(msg, "Message-ID").strip() or None
         
         # Parse date
         try:
@@ -25,36 +43,25 @@ class EmailService:
         except (ValueError, TypeError):
             received_at = datetime.now()
         
-        # Extract body
+        # Extract body: the first text/plain part wins; HTML is only decoded if there is none
         body = ""
         html_body = None
-        
-        if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition", ""))
-                
-                if "attachment" not in content_disposition:
-                    if content_type == "text/plain":
-                        body = part.get_payload(decode=True).decode("utf-8", errors="ignore")
-                    elif content_type == "text/html":
-                        html_body = part.get_payload(decode=True).decode("utf-8", errors="ignore")
-        else:
-            content_type = msg.get_content_type()
+        html_part = None
+        for part in msg.walk():
+            if part.is_multipart() or part.get_content_disposition() == "attachment":
+                continue
+            content_type = part.get_content_type()
             if content_type == "text/plain":
-                body = msg.get_payload(decode=True).decode("utf-8", errors="ignore")
-            elif content_type == "text/html":
-                html_body = msg.get_payload(decode=True).decode("utf-8", errors="ignore")
+                body = EmailService._decode_part(part)
+                if body.strip():
+                    break
+            elif content_type == "text/html" and html_part is None:
+                html_part = part
         
         # Clean HTML if present
-        if html_body:
-            soup = BeautifulSoup(html_body, "html.parser")
-            # Remove scripts and styles
-            for script in soup(["script", "style"]):
-                script.decompose()
-            # Get text
-            if not body:
-                body = soup.get_text(separator=" ", strip=True)
+        if not body.strip() and html_part is not None:
+            html_body = EmailService._decode_part(html_part)
+            body = EmailService._html_to_text(html_body)
         
         # Clean body (remove signatures, etc.)
         body = EmailService._clean_email_body(body)
@@ -65,9 +72,45 @@ class EmailService:
             "recipient": EmailService._extract_email_address(recipient),
             "body": body,
             "html_body": html_body,
-            "received_at": received_at
+            "received_at": received_at,
+            "message_id": message_id,
         }
     
+    def _header(msg, name: str) -> str:
+        """Header value with RFC 2047 encoded words decoded"""
+        value = msg.get(name)
+        if value is None:
+            return ""
+        if isinstance(value, str) and "=?" not in value:
+            return value
+        try:
+            return str(make_header(decode_header(value)))
+        except Exception:
+            # Malformed encoded word or unknown charset: keep the raw value
+            return str(value)
+    
+    def _decode_part(part) -> str:
+        """Payload bytes (capped at email_max_body_bytes) decoded with the part's declared charset"""
+        payload = part.get_payload(decode=True) or b""
+        payload = payload[:settings.email_max_body_bytes]
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors="replace")
+        except LookupError:
+            return payload.decode("utf-8", errors="replace")
+    
+    def _html_to_text(html_body: str) -> str:
+        """Visible text of an HTML body, text nodes joined by single spaces"""
+        if _lxml_html is not None:
+            try:
+                doc = _lxml_html.fromstring(html_body)
+                _etree.strip_elements(doc, "script", "style", _etree.Comment, with_tail=False)
+                return " ".join(t.strip() for t in doc.itertext() if t.strip())
+            except (ValueError, _etree.ParserError):
+                pass  # e.g. empty document; the regex path handles anything
+        text = _SCRIPT_STYLE_RE.sub(" ", html_body)
+        return " ".join(t for t in (html.unescape(s).strip() for s in _TAG_RE.split(text)) if t)
+    
     def _clean_email_body(body: str) -> str:
         """Clean email body (remove signatures, etc.)"""
         if not body:
@@ -0,0 +1,228 @@
+"""Content-addressed embedding cache: in-memory LRU with an optional on-disk tier."""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so reflowed copies of the same text share a key"""
+    return " ".join((text or "").split())
+
+
+class _DiskTier:
+    """Memory-mapped float32 matrix; rows are reused ring-buffer style.
+
+    Each row carries the sha256 of its key in a parallel memmap, written after
+    the vector, so the key index is rebuilt from the rows themselves and a
+    row overwritten since the last flush can never answer for an old key.
+    Every process locks its own slot file, so workers sharing a directory
+    never write into each other's rows.
+    """
+
+    def __init__(self, path_prefix: str, dim: int, capacity: int, max_slots: int = 16):
+        import numpy as np
+
+        self.np = np
+        self.dim = dim
+        self.capacity = capacity
+        self._lock_file = None
+        for slot in range(max_slots):
+            prefix = path_prefix if slot == 0 else f"{path_prefix}.{slot}"
+            if self._try_lock(f"{prefix}.lock"):
+                break
+        else:
+            raise OSError(f"all {max_slots} embedding cache slots under {path_prefix} are in use")
+        self.data_path = f"{prefix}.f32"
+        self.digest_path = f"{prefix}.keys"
+        self.meta_path = f"{prefix}.json"
+        self.next_row = 0
+
+        meta = None
+        if os.path.exists(self.data_path) and os.path.exists(self.digest_path) and os.path.exists(self.meta_path):
+            try:
+                with open(self.meta_path) as f:
+                    meta = json.load(f)
+                if meta.get("dim") != dim or meta.get("capacity") != capacity:
+                    meta = None
+            except (OSError, ValueError):
+                meta = None
+
+        # The slot is ours alone, so recreating (truncating) it is safe
+        mode = "r+" if meta is not None else "w+"
+        self.matrix = np.memmap(self.data_path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+        self.digests = np.memmap(self.digest_path, dtype=np.uint8, mode=mode, shape=(capacity, 32))
+        self.rows: Dict[bytes, int] = {}
+        if meta is not None:
+            self.next_row = int(meta.get("next_row", 0)) % capacity
+            for row in np.flatnonzero(self.digests.any(axis=1)):
+                self.rows[self.digests[row].tobytes()] = int(row)
+        self.dirty = False
+
+    def _try_lock(self, lock_path: str) -> bool:
+        try:
+            import fcntl
+        except ImportError:
+            return True  # no flock (Windows): single-worker use only
+        lock_file = open(lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file  # held for the life of the process
+        return True
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.sha256(key.encode("utf-8")).digest()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        digest = self._digest(key)
+        row = self.rows.get(digest)
+        if row is None:
+            return None
+        if self.digests[row].tobytes() != digest:
+            del self.rows[digest]
+            return None
+        return self.matrix[row].tolist()
+
+    def put(self, key: str, embedding: List[float]):
+        digest = self._digest(key)
+        if digest in self.rows or len(embedding) != self.dim:
+            return
+        row = self.next_row
+        self.rows.pop(self.digests[row].tobytes(), None)
+        # Clear the row's key first: a half-written row is read as empty, never as the old key
+        self.digests[row] = 0
+        self.matrix[row] = self.np.asarray(embedding, dtype=self.np.float32)
+        self.digests[row] = self.np.frombuffer(digest, dtype=self.np.uint8)
+        self.rows[digest] = row
+        self.next_row = (row + 1) % self.capacity
+        self.dirty = True
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def flush(self):
+        if not self.dirty:
+            return
+        self.matrix.flush()
+        self.digests.flush()
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity, "next_row": self.next_row}, f)
+        os.replace(tmp_path, self.meta_path)
+        self.dirty = False
+
+    def close(self):
+        self.flush()
+        del self.matrix, self.digests
+        if self._lock_file is not None:
+            self._lock_file.close()  # frees the slot for the next cache opened in this process
+            self._lock_file = None
+
+
+class EmbeddingCache:
+    """Embeddings keyed by model name + hash of the normalized text.
+
+    model_name should also name the inference variant (e.g.
+    "all-MiniLM-L6-v2@onnx-int8"): it prefixes every key and names the
+    disk files, so int8 and fp32 vectors never share entries.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        dim: int,
+        max_entries: int = 10000,
+        disk_dir: Optional[str] = None,
+        disk_capacity: int = 100000,
+        flush_every: int = 256,
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_flush = 0
+        self._disk: Optional[_DiskTier] = None
+
+        if disk_dir:
+            try:
+                os.makedirs(disk_dir, exist_ok=True)
+                slug = model_name.replace("/", "__")
+                self._disk = _DiskTier(os.path.join(disk_dir, slug), dim, disk_capacity)
+            except ImportError:
+                print("numpy not installed; on-disk embedding cache disabled")
+            except OSError as e:
+                print(f"On-disk embedding cache disabled: {e}")
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = self.key(text)
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return embedding
+            if self._disk is not None:
+                embedding = self._disk.get(key)
+                if embedding is not None:
+                    self._remember(key, embedding)
+                    self.hits += 1
+                    return embedding
+            self.misses += 1
+            return None
+
+    def put(self, text: str, embedding: List[float]):
+        # Zero vectors are the API failure fallback; never cache them
+        if not any(embedding):
+            return
+        key = self.key(text)
+        with self._lock:
+            self._remember(key, embedding)
+            if self._disk is not None:
+                self._disk.put(key, embedding)
+                self._writes_since_flush += 1
+                if self._writes_since_flush >= self.flush_every:
+                    self._disk.flush()
+                    self._writes_since_flush = 0
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk) if self._disk is not None else 0,
+        }
+
+    def flush(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.flush()
+                self._writes_since_flush = 0
+
+    def close(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+                self._writes_since_flush = 0
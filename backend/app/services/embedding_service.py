@@ -1,6 +1,11 @@
-from typing import List
+import asyncio
+from typing import Dict, List, Optional
 
 from backend.app.config import settings
+from backend.app.services.embedding_cache import EmbeddingCache
+from backend.app.services.hf_client import hf_client
+from backend.app.utils.concurrency import MicroBatcher, run_in_inference_pool
+from backend.app.utils.tracing import span
 
 # Lazy imports for local model (dev only); production uses HF API
 
@@ -11,55 +16,149 @@ EMBEDDING_DIM = 384
 class EmbeddingService:
     def __init__(self):
         self.model = None
-        self.use_api = settings.environment == "production"
+        self.backend = settings.resolved_inference_backend()
+        self.use_api = self.backend == "api"
         self.model_name = HF_EMBEDDING_MODEL
+        self.batcher: Optional[MicroBatcher[str, List[float]]] = None
+        self.cache: Optional[EmbeddingCache] = None  # opened once the backend is settled
+
+    @property
+    def variant(self) -> str:
+        """Backend and weight precision; vectors from different variants are not interchangeable"""
+        if self.use_api:
+            return "api"
+        if self.backend == "onnx":
+            return f"onnx-{getattr(self.model, 'quantization', 'fp32')}"
+        return "torch-fp32"
+
+    def open_cache(self):
+        if self.cache is not None or settings.embedding_cache_size <= 0:
+            return
+        self.cache = EmbeddingCache(
+            f"{self.model_name}@{self.variant}",
+            EMBEDDING_DIM,
+            max_entries=settings.embedding_cache_size,
+            disk_dir=settings.embedding_cache_dir,
+            disk_capacity=settings.embedding_cache_disk_capacity,
+        )
 
     async def initialize(self):
+        await self._load_model()
+        self.open_cache()
+
+    async def _load_model(self):
         if self.use_api:
             return
+        if self.backend == "onnx":
+            try:
+                from backend.app.services.onnx_runtime import OnnxEmbedder, model_dir
+
+                self.model = await asyncio.to_thread(OnnxEmbedder, model_dir(self.model_name))
+                self.enable_micro_batching()
+                return
+            except (ImportError, OSError) as e:
+                print(f"ONNX backend unavailable, falling back to torch: {e}")
+                self.backend = "torch"
         
         try:
-            from sentence_transformers import SentenceTransformer
-            import torch
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.model = SentenceTransformer(self.model_name, device=device)
+            # Importing torch and loading weights takes seconds; keep the event loop free
+            self.model = await asyncio.to_thread(self._load_torch_model)
+            self.enable_micro_batching()
         except ImportError:
             self.use_api = True
 
-    def generate_embedding(self, text: str) -> List[float]:
-        if self.use_api:
-            return self._embed_via_api(text)
-        if self.model is None:
-            raise RuntimeError("Embedding model not initialized")
-        emb = self.model.encode(text, convert_to_numpy=True)
-        return emb.tolist()
-
-    def _embed_via_api(self, text: str) -> List[float]:
-        import httpx
-        if not getattr(settings, "huggingface_api_key", None):
+    def _load_torch_model(self):
+        from sentence_transformers import SentenceTransformer
+        import torch
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        return SentenceTransformer(self.model_name, device=device)
+
+    def enable_micro_batching(self):
+        """Encode concurrent single-text requests together (local models only)"""
+        if settings.micro_batch_window_ms > 0:
+            self.batcher = MicroBatcher(
+                lambda texts: self._encode_batch(texts, settings.batch_size),
+                window_ms=settings.micro_batch_window_ms,
+                max_items=settings.micro_batch_max_items,
+            )
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+        if self.batcher is not None:
+            # The batch records its own "embed" stage; this is the request's share of the wait
+            with span("embed_wait"):
+                embedding = await self.batcher.submit(text)
+        else:
+            embedding = await self._encode(text)
+        if self.cache is not None:
+            self.cache.put(text, embedding)
+        return embedding
+
+    async def _encode(self, text: str) -> List[float]:
+        with span("embed"):
+            if self.use_api:
+                return await self._embed_via_api(text)
+            if self.model is None:
+                raise RuntimeError("Embedding model not initialized")
+            emb = await run_in_inference_pool(self.model.encode, text, convert_to_numpy=True)
+            return emb.tolist()
+
+    async def _embed_via_api(self, text: str) -> List[float]:
+        if not hf_client.enabled:
             return [0.0] * EMBEDDING_DIM
-        url = f"https://api-inference.huggingface.co/models/{HF_EMBEDDING_MODEL}"
-        headers = {"Authorization": f"Bearer {settings.huggingface_api_key}"}
         try:
-            with httpx.Client(timeout=30.0) as client:
-                r = client.post(url, headers=headers, json={"inputs": text[:8192]})
-                r.raise_for_status()
-                out = r.json()
-                if isinstance(out, list) and out:
-                    vec = out[0]
-                    if isinstance(vec, list):
-                        return vec
+            out = await hf_client.post(HF_EMBEDDING_MODEL, {"inputs": text[:8192]})
+            if isinstance(out, list) and out:
+                vec = out[0]
+                if isinstance(vec, list):
+                    return vec
         except Exception:
             pass
         return [0.0] * EMBEDDING_DIM
 
-    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        if self.use_api:
-            return [self._embed_via_api(t) for t in texts]
-        if self.model is None:
-            raise RuntimeError("Embedding model not initialized")
-        embs = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
-        return [e.tolist() for e in embs]
+    async def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """Embed texts, encoding only cache misses (each distinct miss once)"""
+        if not texts:
+            return []
+        if self.cache is None:
+            return await self._encode_batch(texts, batch_size)
+
+        results: List[Optional[List[float]]] = [self.cache.get(t) for t in texts]
+        misses: Dict[str, List[int]] = {}
+        for i, emb in enumerate(results):
+            if emb is None:
+                misses.setdefault(self.cache.key(texts[i]), []).append(i)
+        if misses:
+            miss_texts = [texts[positions[0]] for positions in misses.values()]
+            encoded = await self._encode_batch(miss_texts, batch_size)
+            for text, positions, emb in zip(miss_texts, misses.values(), encoded):
+                self.cache.put(text, emb)
+                for i in positions:
+                    results[i] = emb
+        return results
+
+    async def _encode_batch(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        with span("embed"):
+            if self.use_api:
+                # Requests are pooled and capped per model by the shared client
+                return list(await asyncio.gather(*(self._embed_via_api(t) for t in texts)))
+            if self.model is None:
+                raise RuntimeError("Embedding model not initialized")
+            embs = await run_in_inference_pool(
+                self.model.encode,
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            return [e.tolist() for e in embs]
 
     def get_dimension(self) -> int:
         return EMBEDDING_DIM
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
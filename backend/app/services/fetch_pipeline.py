@@ -0,0 +1,172 @@
+"""Streaming inbox analysis: IMAP fetch -> parse -> score/upsert as concurrent stages.
+
+Stages are joined by bounded queues, so memory stays flat whatever the limit
+and each result is emitted as soon as its email is scored.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import AsyncIterator, Dict, List
+
+from backend.app.config import settings
+from backend.app.services.batch_service import BatchAnalyzer
+from backend.app.services.imap_service import iter_messages, parse_messages
+from backend.app.services.registry import ServiceRegistry
+from backend.app.utils.metrics import metrics
+
+_DONE = object()
+
+
+def fetch_result(item: Dict, analysis: Dict, latency_ms: float) -> Dict:
+    """One /fetch result row"""
+    return {
+        "email_id": analysis["email_id"],
+        "priority_score": analysis["priority_score"],
+        "priority_level": analysis["priority_level"],
+        "intent": analysis["intent"],
+        "sentiment": analysis["sentiment"],
+        "urgency_keywords": analysis.get("urgency_keywords") or [],
+        "sender_importance": analysis.get("sender_importance", 0.5),
+        "processing_time_ms": latency_ms,
+        "subject": item["subject"],
+        "sender": item["sender"],
+    }
+
+
+def record_results(items: List[Dict], analyses: List[Dict], latency_ms: float) -> List[Dict]:
+    """Record metrics for a scored batch and return its successful result rows"""
+    results = []
+    for item, analysis in zip(items, analyses):
+        if "error" in analysis:
+            print(f"Error processing email: {analysis['error']}")
+            metrics.record_email_processing(latency_ms, success=False)
+            continue
+        metrics.record_email_processing(latency_ms, success=True)
+        metrics.record_analysis(analysis["priority_level"], analysis["intent"])
+        results.append(fetch_result(item, analysis, latency_ms))
+    return results
+
+
+async def stream_inbox_analysis(
+    services: ServiceRegistry,
+    email: str,
+    password: str,
+    limit: int = 10,
+    incremental: bool = False,
+    user_id: str = "default_user",
+) -> AsyncIterator[Dict]:
+    """Yield one result row per email as soon as it is scored.
+
+    A failed IMAP connection or fetch, or a failure parsing or scoring, ends
+    the stream with {"error": ...}.
+    """
+    loop = asyncio.get_running_loop()
+    queue_size = settings.fetch_stream_queue_size
+    workers = max(1, settings.fetch_stream_workers)
+    raw_queue: asyncio.Queue = asyncio.Queue(queue_size)
+    parsed_queue: asyncio.Queue = asyncio.Queue(queue_size)
+    out_queue: asyncio.Queue = asyncio.Queue(queue_size)
+    stop = threading.Event()
+    fetch_error: List[Exception] = []
+    stage_error: List[Exception] = []  # parse/score failures; the stream still ends cleanly
+
+    def produce():
+        # Runs in a worker thread; blocks on the bounded queue for backpressure
+        for raw in iter_messages(email, password, limit=limit, incremental=incremental):
+            future = asyncio.run_coroutine_threadsafe(raw_queue.put(raw), loop)
+            while True:
+                if stop.is_set():
+                    future.cancel()
+                    return
+                try:
+                    future.result(timeout=0.5)
+                    break
+                except concurrent.futures.TimeoutError:
+                    continue
+
+    async def fetch_stage():
+        try:
+            await asyncio.to_thread(produce)
+        except Exception as e:
+            fetch_error.append(e)
+        finally:
+            if not stop.is_set():
+                await raw_queue.put(_DONE)
+
+    async def parse_stage():
+        try:
+            done = False
+            while not done:
+                raw = await raw_queue.get()
+                raws = []
+                # Parse whatever has already arrived in one hop (process pool for large backlogs)
+                while raw is not _DONE:
+                    raws.append(raw)
+                    if len(raws) >= settings.parse_pool_min_batch or raw_queue.empty():
+                        break
+                    raw = raw_queue.get_nowait()
+                done = raw is _DONE
+                if not raws:
+                    continue
+                for parsed in await asyncio.to_thread(parse_messages, raws):
+                    await parsed_queue.put(BatchAnalyzer.normalize_email(parsed))
+        except Exception as e:
+            stage_error.append(e)
+        finally:
+            # Always release the scorers, or the consumer below waits forever
+            if not stop.is_set():
+                for _ in range(workers):
+                    await parsed_queue.put(_DONE)
+
+    async def score_stage():
+        try:
+            done = False
+            while not done:
+                item = await parsed_queue.get()
+                batch = []
+                # Score whatever else is already waiting together (one model call per stage)
+                while item is not _DONE:
+                    batch.append(item)
+                    if len(batch) >= settings.batch_size or parsed_queue.empty():
+                        break
+                    item = parsed_queue.get_nowait()
+                done = item is _DONE
+                if not batch:
+                    continue
+                start = time.time()
+                with metrics.in_flight(len(batch)):
+                    analyses = await services.batch.analyze(batch, user_id=user_id)
+                latency_ms = (time.time() - start) * 1000 / len(batch)
+                for row in record_results(batch, analyses, latency_ms):
+                    await out_queue.put(row)
+        except Exception as e:
+            stage_error.append(e)
+        finally:
+            if not stop.is_set():
+                await out_queue.put(_DONE)
+
+    tasks = [asyncio.create_task(fetch_stage()), asyncio.create_task(parse_stage())]
+    tasks += [asyncio.create_task(score_stage()) for _ in range(workers)]
+    try:
+        finished = 0
+        while finished < workers:
+            row = await out_queue.get()
+            if row is _DONE:
+                finished += 1
+                continue
+            yield row
+        if fetch_error:
+            yield {"error": f"IMAP fetch failed: {fetch_error[0]}"}
+        elif stage_error:
+            yield {"error": f"Inbox analysis failed: {stage_error[0]}"}
+    finally:
+        # Client went away or the stream ended: stop the IMAP thread and every stage
+        stop.set()
+        pending = set(tasks)
+        while pending:
+            # Re-cancel: a wait_for finishing at the same moment can swallow one cancellation
+            for task in pending:
+                task.cancel()
+            _, pending = await asyncio.wait(pending, timeout=0.1)
@@ -0,0 +1,78 @@
+"""Shared async HTTP client for Hugging Face Inference API calls."""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from backend.app.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class HFInferenceClient:
+    """One pooled httpx.AsyncClient with a concurrency cap per model"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_concurrency_per_model: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.base_url = (base_url or settings.huggingface_api_url).rstrip("/")
+        self.api_key = api_key if api_key is not None else settings.huggingface_api_key
+        self.max_connections = max_connections or settings.hf_max_connections
+        self.max_concurrency_per_model = max_concurrency_per_model or settings.hf_max_concurrency_per_model
+        self.timeout = timeout or settings.hf_timeout_s
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    async def start(self):
+        if self._client is not None:
+            return
+        import httpx
+
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._semaphores.clear()
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(model)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_concurrency_per_model)
+            self._semaphores[model] = sem
+        return sem
+
+    async def post(self, model: str, payload: Dict, timeout: Optional[float] = None) -> Any:
+        """POST to /models/{model} and return the decoded JSON; raises on HTTP errors"""
+        if self._client is None:
+            await self.start()
+        async with self._semaphore(model):
+            r = await self._client.post(
+                f"/models/{model}",
+                json=payload,
+                timeout=timeout or self.timeout,
+            )
+        r.raise_for_status()
+        return r.json()
+
+
+hf_client = HFInferenceClient()
@@ -0,0 +1,119 @@
+"""Per-account pool of logged-in IMAP sessions, reused across /fetch calls."""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from backend.app.config import settings
+
+
+class _Session:
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+def _logout(client):
+    try:
+        client.logout()
+    except Exception:
+        pass
+
+
+class ImapConnectionPool:
+    """Keeps up to `size` idle authenticated sessions per account.
+
+    Sessions idle longer than idle_timeout_s are dropped (servers close them
+    anyway); ones idle longer than noop_after_s get a NOOP before reuse. A
+    session whose operation raised is logged out instead of returned.
+    """
+
+    def __init__(self, size: int = 2, idle_timeout_s: float = 600.0, noop_after_s: float = 30.0):
+        self.size = size
+        self.idle_timeout_s = idle_timeout_s
+        self.noop_after_s = noop_after_s
+        self._idle: Dict[Tuple[str, str, int, str], List[_Session]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "reused": 0, "noop_failures": 0}
+
+    @staticmethod
+    def _key(email: str, password: str, host: str, port: int) -> Tuple[str, str, int, str]:
+        # Only a digest of the password is kept, to tell credential changes apart
+        digest = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return (email.strip().lower(), host, port, digest)
+
+    def connect(self, email: str, password: str, host: str, port: int):
+        """A new logged-in client outside the pool (e.g. for a long-lived IDLE)"""
+        try:
+            from imapclient import IMAPClient
+        except ImportError:
+            raise RuntimeError("imapclient not installed. Run: pip install imapclient")
+        client = IMAPClient(host, port=port, use_uid=True, ssl=True, timeout=settings.imap_timeout_s)
+        try:
+            client.login(email.strip(), password)
+        except Exception:
+            _logout(client)
+            raise
+        self.stats["connects"] += 1
+        return client
+
+    def _checkout(self, key) -> object:
+        """An idle session that still answers, or None"""
+        while True:
+            with self._lock:
+                sessions = self._idle.get(key)
+                if not sessions:
+                    return None
+                session = sessions.pop()
+            idle_for = time.monotonic() - session.last_used
+            if idle_for > self.idle_timeout_s:
+                _logout(session.client)
+                continue
+            if idle_for > self.noop_after_s:
+                try:
+                    session.client.noop()
+                except Exception:
+                    self.stats["noop_failures"] += 1
+                    _logout(session.client)
+                    continue
+            self.stats["reused"] += 1
+            return session.client
+
+    def _checkin(self, key, client):
+        with self._lock:
+            sessions = self._idle.setdefault(key, [])
+            if len(sessions) < self.size:
+                sessions.append(_Session(client))
+                return
+        _logout(client)
+
+    @contextmanager
+    def session(self, email: str, password: str, host: str, port: int) -> Iterator[object]:
+        """Borrow a logged-in IMAPClient; it goes back to the pool unless the block raised"""
+        key = self._key(email, password, host, port)
+        client = self._checkout(key) or self.connect(email, password, host, port)
+        try:
+            yield client
+        except BaseException:
+            _logout(client)
+            raise
+        else:
+            self._checkin(key, client)
+
+    def close_all(self):
+        with self._lock:
+            sessions = [s for group in self._idle.values() for s in group]
+            self._idle.clear()
+        for session in sessions:
+            _logout(session.client)
+
+
+imap_pool = ImapConnectionPool(
+    size=settings.imap_pool_size,
+    idle_timeout_s=settings.imap_pool_idle_timeout_s,
+    noop_after_s=settings.imap_pool_noop_after_s,
+)
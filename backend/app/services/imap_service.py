@@ -1,8 +1,23 @@
 """Fetch emails via IMAP (Gmail or generic)."""
 
-from typing import List, Optional, Tuple
+import json
+import os
+import re
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from backend.app.config import settings
 from backend.app.services.email_service import EmailService
+from backend.app.services.imap_pool import imap_pool
+from backend.app.utils.concurrency import get_parse_executor, shutdown_parse_executor
+from backend.app.utils.tracing import span
+
+# Top-level MIME headers replaced by those of the text part we download
+_CONTENT_HEADER_RE = re.compile(
+    rb"^(?:content-type|content-transfer-encoding|mime-version)[ \t]*:.*?(?=\r?\n(?![ \t])|\Z)",
+    re.IGNORECASE | re.MULTILINE | re.DOTALL,
+)
 
 
 def _detect_imap_host(email: str) -> Tuple[str, int]:
@@ -17,44 +32,272 @@ def _detect_imap_host(email: str) -> Tuple[str, int]:
     return "imap.gmail.com", 993  # default to Gmail
 
 
+class CheckpointStore:
+    """Last seen UID per account and UIDVALIDITY, optionally persisted to a JSON file"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, int]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring IMAP checkpoints at {path}: {e}")
+
+    def get(self, account: str) -> Optional[Dict[str, int]]:
+        with self._lock:
+            return self._data.get(account)
+
+    def set(self, account: str, uidvalidity: int, last_uid: int):
+        with self._lock:
+            self._data[account] = {"uidvalidity": uidvalidity, "last_uid": last_uid}
+            if not self.path:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Error saving IMAP checkpoint: {e}")
+
+
+checkpoints = CheckpointStore(settings.imap_checkpoint_path)
+
+
+def _account_key(email: str, host: str) -> str:
+    return f"{email.strip().lower()}@{host}"
+
+
+def _param(params, name: bytes) -> Optional[str]:
+    """Look up a BODYSTRUCTURE parameter list (k1, v1, k2, v2, ...)"""
+    if not params or not isinstance(params, tuple):
+        return None
+    for i in range(0, len(params) - 1, 2):
+        if isinstance(params[i], bytes) and params[i].lower() == name:
+            value = params[i + 1]
+            return value.decode("ascii", errors="replace") if isinstance(value, bytes) else value
+    return None
+
+
+def _is_attachment(part) -> bool:
+    # Extension data of a text part: md5 (8), disposition (9)
+    disposition = part[9] if len(part) > 9 else None
+    return (
+        isinstance(disposition, tuple)
+        and bool(disposition)
+        and isinstance(disposition[0], bytes)
+        and disposition[0].lower() == b"attachment"
+    )
+
+
+def _find_text_parts(bodystructure, prefix: str = "") -> Dict[str, Tuple[str, object]]:
+    """First non-attachment text/plain and text/html parts: {subtype: (section, part)}"""
+    found: Dict[str, Tuple[str, object]] = {}
+    if bodystructure.is_multipart:
+        for i, part in enumerate(bodystructure[0], 1):
+            section = f"{prefix}.{i}" if prefix else str(i)
+            for subtype, hit in _find_text_parts(part, section).items():
+                found.setdefault(subtype, hit)
+        return found
+
+    if not isinstance(bodystructure[0], bytes) or bodystructure[0].lower() != b"text":
+        return found
+    subtype = (bodystructure[1] or b"").decode("ascii", errors="replace").lower()
+    if subtype in ("plain", "html") and not _is_attachment(bodystructure):
+        # The body of a single-part message is section 1
+        found[subtype] = (prefix or "1", bodystructure)
+    return found
+
+
+def _assemble_message(header: bytes, part, body: bytes) -> bytes:
+    """Top-level headers plus the one text part we downloaded, as a single-part message"""
+    subtype = part[1].decode("ascii", errors="replace").lower()
+    charset = _param(part[2], b"charset") or "utf-8"
+    encoding = part[5].decode("ascii", errors="replace") if isinstance(part[5], bytes) else "7bit"
+    header = _CONTENT_HEADER_RE.sub(b"", header)
+    header = re.sub(rb"(?:\r?\n){2,}", b"\r\n", header).strip(b"\r\n")
+    return (
+        header
+        + b"\r\nMIME-Version: 1.0"
+        + f"\r\nContent-Type: text/{subtype}; charset=\"{charset}\"".encode("ascii", errors="replace")
+        + f"\r\nContent-Transfer-Encoding: {encoding}\r\n\r\n".encode("ascii", errors="replace")
+        + body
+    )
+
+
+def _uids_by_sequence(client, exists: int, limit: int) -> List[int]:
+    """UIDs of the newest `limit` messages, from a sequence range (no SEARCH ALL)"""
+    lo = max(1, exists - limit + 1)
+    client.use_uid = False
+    try:
+        response = client.fetch(f"{lo}:{exists}", ["UID"])
+    finally:
+        client.use_uid = True
+    return sorted((data[b"UID"] for data in response.values()), reverse=True)
+
+
+def _fetch_messages(client, uids: List[int]) -> List[bytes]:
+    """Headers and structure first, then only the preferred text part of each message"""
+    if not uids:
+        return []
+    heads = client.fetch(uids, ["BODYSTRUCTURE", "BODY.PEEK[HEADER]"])
+
+    wanted: Dict[str, List[int]] = {}  # section -> uids
+    chosen: Dict[int, Tuple[str, object]] = {}
+    for uid, data in heads.items():
+        structure = data.get(b"BODYSTRUCTURE")
+        if structure is None:
+            continue
+        parts = _find_text_parts(structure)
+        hit = parts.get("plain") or parts.get("html")
+        if hit is None:
+            continue
+        chosen[uid] = hit
+        wanted.setdefault(hit[0], []).append(uid)
+
+    bodies: Dict[int, bytes] = {}
+    for section, section_uids in wanted.items():
+        key = f"BODY[{section}]".encode("ascii")
+        for uid, data in client.fetch(section_uids, [f"BODY.PEEK[{section}]"]).items():
+            bodies[uid] = data.get(key) or b""
+
+    out = []
+    for uid in uids:
+        header = heads.get(uid, {}).get(b"BODY[HEADER]")
+        if header is None:
+            continue
+        if uid in chosen:
+            out.append(_assemble_message(header, chosen[uid][1], bodies.get(uid, b"")))
+        else:
+            # No text part (e.g. only attachments): headers are enough to score
+            out.append(_CONTENT_HEADER_RE.sub(b"", header).rstrip(b"\r\n") + b"\r\n\r\n")
+    return out
+
+
+def parse_message(raw: bytes) -> Optional[dict]:
+    """Parse one downloaded message into a compact record; None when it cannot be parsed"""
+    try:
+        with span("parse"):
+            parsed = EmailService.parse_email(raw)
+    except Exception:
+        return None
+    # Scoring never reads the HTML source; don't carry (or pickle) it around
+    parsed.pop("html_body", None)
+    return parsed
+
+
+def parse_chunk(raws: List[bytes]) -> List[Optional[dict]]:
+    """Worker-process entry point: parse a chunk of raw messages"""
+    return [parse_message(raw) for raw in raws]
+
+
+def parse_messages(raws: List[bytes]) -> List[dict]:
+    """Parse a batch, splitting large ones across the parse process pool"""
+    results = None
+    executor = get_parse_executor() if len(raws) >= settings.parse_pool_min_batch else None
+    if executor is not None:
+        size = settings.parse_chunk_size
+        chunks = [raws[i:i + size] for i in range(0, len(raws), size)]
+        try:
+            with span("parse_pool", messages=len(raws), chunks=len(chunks)):
+                results = [r for chunk in executor.map(parse_chunk, chunks) for r in chunk]
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Parse pool failed, parsing in-thread: {e}")
+            shutdown_parse_executor()
+    if results is None:
+        results = parse_chunk(raws)
+    return [r for r in results if r is not None]
+
+
+def pending_uids(client, account: str, limit: int = 10, incremental: bool = False) -> Tuple[int, List[int]]:
+    """(UIDVALIDITY, UIDs to download) for INBOX; see sync_mailbox for the selection rules"""
+    folder = client.select_folder("INBOX", readonly=True)
+    exists = folder.get(b"EXISTS", 0)
+    uidvalidity = folder.get(b"UIDVALIDITY", 0)
+    if not exists:
+        return uidvalidity, []
+
+    checkpoint = checkpoints.get(account) if incremental else None
+    if checkpoint and checkpoint["uidvalidity"] == uidvalidity:
+        last_uid = checkpoint["last_uid"]
+        # "n:*" always matches the newest message, so filter again
+        newer = sorted(uid for uid in client.search(["UID", f"{last_uid + 1}:*"]) if uid > last_uid)
+        return uidvalidity, newer[:limit]
+    # First sync, non-incremental call, or the mailbox was rebuilt (UIDVALIDITY changed)
+    return uidvalidity, _uids_by_sequence(client, exists, limit)
+
+
+def fetch_uids(client, uids: List[int], chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    """Raw messages for uids, chunk_size per round trip"""
+    chunk_size = chunk_size or settings.imap_fetch_chunk_size
+    for i in range(0, len(uids), chunk_size):
+        yield from _fetch_messages(client, uids[i:i + chunk_size])
+
+
+def advance_checkpoint(account: str, uidvalidity: int, uids: List[int]):
+    """Mark uids as seen for account (never moves the checkpoint backwards)"""
+    if not uids:
+        return
+    last_uid = max(uids)
+    checkpoint = checkpoints.get(account)
+    if checkpoint and checkpoint["uidvalidity"] == uidvalidity:
+        last_uid = max(last_uid, checkpoint["last_uid"])
+    checkpoints.set(account, uidvalidity, last_uid)
+
+
+def sync_mailbox(
+    client,
+    account: str,
+    limit: int = 10,
+    incremental: bool = False,
+    chunk_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Yield raw INBOX messages over a logged-in client, chunk_size messages per round trip.
+
+    By default yields the newest `limit` messages. With incremental=True only
+    messages newer than the account's checkpoint are yielded (oldest first,
+    at most `limit` per call); the checkpoint advances once all were yielded.
+    """
+    uidvalidity, to_fetch = pending_uids(client, account, limit, incremental)
+    yield from fetch_uids(client, to_fetch, chunk_size)
+    if incremental:
+        advance_checkpoint(account, uidvalidity, to_fetch)
+
+
+def iter_messages(
+    email: str,
+    password: str,
+    limit: int = 10,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    incremental: bool = False,
+    chunk_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """sync_mailbox over a session borrowed from the per-account pool"""
+    if not host or not port:
+        host, port = _detect_imap_host(email)
+    with imap_pool.session(email, password, host, port) as client:
+        yield from sync_mailbox(client, _account_key(email, host), limit, incremental, chunk_size)
+
+
 def fetch_emails(
     email: str,
     password: str,
     limit: int = 10,
     host: Optional[str] = None,
     port: Optional[int] = None,
+    incremental: bool = False,
 ) -> List[dict]:
     """
     Connect via IMAP, fetch recent emails, parse and return list of dicts
     compatible with EmailService.parse_email / EmailCreate.
-    Uses app password for Gmail (2FA required).
+    Uses app password for Gmail (2FA required). See sync_mailbox for incremental.
     """
-    try:
-        from imapclient import IMAPClient
-    except ImportError:
-        raise RuntimeError("imapclient not installed. Run: pip install imapclient")
-
-    if not host or not port:
-        host, port = _detect_imap_host(email)
-
-    out: List[dict] = []
-    with IMAPClient(host, port=port, use_uid=True, ssl=True) as client:
-        client.login(email.strip(), password)
-        client.select_folder("INBOX")
-        messages = client.search(["ALL"])
-        if not messages:
-            return []
-        # fetch newest first
-        to_fetch = list(reversed(messages))[:limit]
-        raw = client.fetch(to_fetch, ["RFC822"])
-        for uid, data in raw.items():
-            rfc = data.get(b"RFC822")
-            if not rfc:
-                continue
-            raw_str = rfc.decode("utf-8", errors="replace") if isinstance(rfc, bytes) else str(rfc)
-            try:
-                parsed = EmailService.parse_email(raw_str)
-                out.append(parsed)
-            except Exception:
-                continue
-    return out
+    # Download everything first so the session goes back to the pool before parsing
+    raws = list(iter_messages(email, password, limit, host, port, incremental))
+    return parse_messages(raws)
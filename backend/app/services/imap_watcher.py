@@ -0,0 +1,262 @@
+"""IMAP IDLE watchers: score new mail as soon as the server announces it."""
+
+import asyncio
+import concurrent.futures
+import hmac
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from backend.app.config import settings
+from backend.app.services.batch_service import BatchAnalyzer
+from backend.app.services.fetch_pipeline import record_results
+from backend.app.services.imap_pool import imap_pool
+from backend.app.services.imap_service import (
+    _account_key,
+    _detect_imap_host,
+    advance_checkpoint,
+    checkpoints,
+    fetch_uids,
+    parse_messages,
+    pending_uids,
+)
+from backend.app.services.registry import ServiceRegistry
+
+# Seconds between checks of the stop flag while IDLE-ing
+_IDLE_POLL_S = 1.0
+
+
+def _is_login_error(error: Exception) -> bool:
+    try:
+        from imapclient.exceptions import LoginError
+    except ImportError:
+        return False
+    return isinstance(error, LoginError)
+
+
+def verify_login(email: str, password: str, host: str, port: int):
+    """Log in once and out again; raises what the server said on bad credentials"""
+    client = imap_pool.connect(email, password, host, port)
+    try:
+        client.logout()
+    except Exception:
+        pass
+
+
+class InboxWatcher:
+    """One dedicated connection in IDLE on INBOX, run from a background thread.
+
+    Each EXISTS push triggers an incremental sync; the new messages are passed
+    to on_messages, which returns True once they are scored. The watcher keeps
+    its own checkpoint (apart from incremental /fetch) and advances it only
+    then, so mail is never lost to a failed or cancelled scoring. Dropped connections are re-established with backoff; a
+    rejected login stops the watcher instead, since retrying a wrong password
+    can get the account locked.
+    """
+
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        on_messages: Callable[[List[dict]], bool],
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ):
+        if not host or not port:
+            host, port = _detect_imap_host(email)
+        self.email = email.strip()
+        self.password = password
+        self.host = host
+        self.port = port
+        self.account = _account_key(email, host)
+        self.checkpoint_key = f"{self.account}:idle"
+        self.on_messages = on_messages
+        self.connected = False
+        self.ingested = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_event: Optional[float] = None
+        self.recent: Deque[Dict] = deque(maxlen=settings.imap_watch_recent_results)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def matches(self, password: str) -> bool:
+        """Whether password is the one this watcher logs in with (constant time)"""
+        return hmac.compare_digest(self.password.encode("utf-8"), password.encode("utf-8"))
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"imap-idle-{self.email}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def status(self) -> Dict:
+        return {
+            "email": self.email,
+            "host": self.host,
+            "running": self.running,
+            "connected": self.connected,
+            "ingested": self.ingested,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_event": self.last_event,
+        }
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self._watch()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"IMAP watcher for {self.email} failed: {e}")
+                if _is_login_error(e):
+                    self._stop.set()
+            finally:
+                self.connected = False
+            # Reconnect with capped exponential backoff
+            self._stop.wait(min(60.0, 2.0 ** failures) if failures else 0)
+
+    def _watch(self):
+        client = imap_pool.connect(self.email, self.password, self.host, self.port)
+        try:
+            self.connected = True
+            folder = client.select_folder("INBOX", readonly=True)
+            uidvalidity = folder.get(b"UIDVALIDITY", 0)
+            checkpoint = checkpoints.get(self.checkpoint_key)
+            if not checkpoint or checkpoint["uidvalidity"] != uidvalidity:
+                # Start from "now": only mail arriving after the watch began is ingested
+                checkpoints.set(self.checkpoint_key, uidvalidity, folder.get(b"UIDNEXT", 1) - 1)
+
+            while not self._stop.is_set():
+                self._ingest(client)
+                client.idle()
+                started = time.monotonic()
+                try:
+                    while not self._stop.is_set() and time.monotonic() - started < settings.imap_idle_renew_s:
+                        responses = client.idle_check(timeout=_IDLE_POLL_S)
+                        if any(len(r) > 1 and r[1] == b"EXISTS" for r in responses):
+                            self.last_event = time.time()
+                            break
+                finally:
+                    client.idle_done()
+        finally:
+            try:
+                client.logout()
+            except Exception:
+                pass
+
+    def _ingest(self, client):
+        """Drain everything past the checkpoint, imap_watch_batch_limit messages at a time"""
+        limit = settings.imap_watch_batch_limit
+        while not self._stop.is_set():
+            uidvalidity, uids = pending_uids(client, self.checkpoint_key, limit=limit, incremental=True)
+            parsed = parse_messages(list(fetch_uids(client, uids)))
+            if parsed and not self.on_messages(parsed):
+                return  # stopping before they were scored: fetch them again next time
+            advance_checkpoint(self.checkpoint_key, uidvalidity, uids)
+            if len(uids) < limit:
+                return
+
+
+class WatcherManager:
+    """Watchers by account; scored results feed the same pipeline as /fetch"""
+
+    def __init__(self):
+        self._watchers: Dict[str, InboxWatcher] = {}
+        self._lock = threading.Lock()
+
+    async def start(self, email: str, password: str, services: ServiceRegistry) -> InboxWatcher:
+        """Start (or keep) the account's watcher; raises if the server rejects the login"""
+        loop = asyncio.get_running_loop()
+        host, port = _detect_imap_host(email)
+        account = _account_key(email, host)
+        watcher = self._watchers.get(account)
+        if watcher is not None and watcher.running and watcher.matches(password):
+            return watcher
+        # Fail the request on bad credentials rather than leave a watcher retrying them
+        await asyncio.to_thread(verify_login, email, password, host, port)
+        replaced = None
+        with self._lock:
+            watcher = self._watchers.get(account)
+            if watcher is not None and not watcher.matches(password):
+                replaced, watcher = watcher, None
+            if watcher is None:
+                watcher = InboxWatcher(email, password, on_messages=lambda parsed: None, host=host, port=port)
+                watcher.on_messages = self._scorer(watcher, services, loop)
+                self._watchers[account] = watcher
+        if replaced is not None:
+            await asyncio.to_thread(replaced.stop)
+        watcher.start()
+        return watcher
+
+    @staticmethod
+    def _scorer(watcher: InboxWatcher, services: ServiceRegistry, loop: asyncio.AbstractEventLoop):
+        async def score(parsed: List[dict]):
+            items = [BatchAnalyzer.normalize_email(p) for p in parsed]
+            start = time.time()
+            analyses = await services.batch.analyze(items, user_id="default_user")
+            latency_ms = (time.time() - start) * 1000 / len(items)
+            rows = record_results(items, analyses, latency_ms)
+            watcher.ingested += len(rows)
+            watcher.recent.extend(rows)
+
+        def on_messages(parsed: List[dict]) -> bool:
+            # Called from the watcher thread; waiting here applies backpressure to IDLE.
+            # A scoring error propagates, so the watcher reconnects and retries the batch.
+            future = asyncio.run_coroutine_threadsafe(score(parsed), loop)
+            while True:
+                try:
+                    future.result(timeout=_IDLE_POLL_S)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if watcher.stopping:
+                        future.cancel()
+                        return False
+
+        return on_messages
+
+    def get(self, email: str) -> Optional[InboxWatcher]:
+        host, _ = _detect_imap_host(email)
+        return self._watchers.get(_account_key(email, host))
+
+    def stop(self, email: str) -> bool:
+        host, _ = _detect_imap_host(email)
+        with self._lock:
+            watcher = self._watchers.pop(_account_key(email, host), None)
+        if watcher is None:
+            return False
+        watcher.stop()
+        return True
+
+    def stop_all(self):
+        with self._lock:
+            watchers = list(self._watchers.values())
+            self._watchers.clear()
+        for watcher in watchers:
+            watcher.stop()
+
+    def status(self) -> List[Dict]:
+        return [w.status() for w in self._watchers.values()]
+
+
+watchers = WatcherManager()
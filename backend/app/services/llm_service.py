@@ -1,84 +1,139 @@
+import asyncio
 from typing import Dict, List, Optional
 
 from backend.app.config import settings
+from backend.app.services.hf_client import hf_client
+from backend.app.services.text_features import FeatureExtractor, TextFeatures
+from backend.app.utils.concurrency import MicroBatcher, run_in_inference_pool
+from backend.app.utils.tracing import span
 
 # Lazy imports for local models (dev only); production uses HF API
 
 HF_SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
 HF_ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+HF_RESPONSE_MODEL = "microsoft/DialoGPT-medium"
+
+INTENT_KEYWORDS = {
+    "action_required": ["urgent", "asap", "deadline", "required", "need", "please", "action", "very important", "really important", "as soon as possible", "send it as soon as possible"],
+    "question": ["?", "question", "wondering", "ask", "help"],
+    "meeting": ["meeting", "call", "schedule", "calendar", "zoom", "teams"],
+    "newsletter": ["newsletter", "unsubscribe", "subscribe"],
+    "promotional": ["sale", "discount", "offer", "deal", "promo"],
+    "spam": ["click here", "limited time", "act now", "winner", "prize"],
+}
 
 
 class LLMService:
     def __init__(self):
         self.sentiment_analyzer = None
         self.text_generator = None
-        self.use_api = settings.environment == "production"
+        self.batcher: Optional[MicroBatcher[str, Dict]] = None
+        self.backend = settings.resolved_inference_backend()
+        self.use_api = self.backend == "api"
+        self.intent_features = FeatureExtractor(intent_keywords=INTENT_KEYWORDS)
 
     async def initialize(self):
         if self.use_api:
             return
+        if self.backend == "onnx":
+            try:
+                from backend.app.services.onnx_runtime import OnnxSentimentClassifier, model_dir
+
+                self.sentiment_analyzer = await asyncio.to_thread(
+                    OnnxSentimentClassifier, model_dir(HF_SENTIMENT_MODEL)
+                )
+                self.enable_micro_batching()
+                return
+            except (ImportError, OSError) as e:
+                print(f"ONNX backend unavailable, falling back to torch: {e}")
+                self.backend = "torch"
         
         try:
-            from transformers import pipeline
-            import torch
-            device = 0 if torch.cuda.is_available() else -1
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model=HF_SENTIMENT_MODEL,
-                device=device,
-            )
+            # Importing torch and loading weights takes seconds; keep the event loop free
+            self.sentiment_analyzer = await asyncio.to_thread(self._load_torch_pipeline)
+            self.enable_micro_batching()
         except ImportError:
             self.use_api = True
 
-    def analyze_sentiment(self, text: str) -> Dict:
+    @staticmethod
+    def _load_torch_pipeline():
+        from transformers import pipeline
+        import torch
+        device = 0 if torch.cuda.is_available() else -1
+        return pipeline(
+            "sentiment-analysis",
+            model=HF_SENTIMENT_MODEL,
+            device=device,
+        )
+
+    def enable_micro_batching(self):
+        """Classify concurrent single-text requests together (local models only)"""
+        if settings.micro_batch_window_ms > 0:
+            self.batcher = MicroBatcher(
+                lambda texts: run_in_inference_pool(
+                    self.sentiment_analyzer, texts, batch_size=settings.batch_size
+                ),
+                window_ms=settings.micro_batch_window_ms,
+                max_items=settings.micro_batch_max_items,
+            )
+
+    async def analyze_sentiment(self, text: str) -> Dict:
         if self.use_api:
-            return self._sentiment_via_api(text)
+            return await self._sentiment_via_api(text)
         if self.sentiment_analyzer is None:
             return {"label": "NEUTRAL", "score": 0.5}
         
-        r = self.sentiment_analyzer(text[:512])[0]
+        with span("sentiment"):
+            if self.batcher is not None:
+                r = await self.batcher.submit(text[:512])
+            else:
+                r = (await run_in_inference_pool(self.sentiment_analyzer, text[:512]))[0]
         return {"label": r["label"], "score": r["score"]}
 
-    def _sentiment_via_api(self, text: str) -> Dict:
-        import httpx
-        if not getattr(settings, "huggingface_api_key", None):
+    async def analyze_sentiment_batch(self, texts: List[str], batch_size: int = 32) -> List[Dict]:
+        if not texts:
+            return []
+        if self.use_api:
+            return list(await asyncio.gather(*(self._sentiment_via_api(t) for t in texts)))
+        if self.sentiment_analyzer is None:
+            return [{"label": "NEUTRAL", "score": 0.5} for _ in texts]
+        
+        with span("sentiment"):
+            out = await run_in_inference_pool(
+                self.sentiment_analyzer, [t[:512] for t in texts], batch_size=batch_size
+            )
+        return [{"label": r["label"], "score": r["score"]} for r in out]
+
+    async def _sentiment_via_api(self, text: str) -> Dict:
+        if not hf_client.enabled:
             return {"label": "NEUTRAL", "score": 0.5}
-        url = f"https://api-inference.huggingface.co/models/{HF_SENTIMENT_MODEL}"
-        headers = {"Authorization": f"Bearer {settings.huggingface_api_key}"}
         try:
-            with httpx.Client(timeout=30.0) as client:
-                r = client.post(url, headers=headers, json={"inputs": text[:512]})
-                r.raise_for_status()
-                out = r.json()
-                if isinstance(out, list) and out:
-                    e = out[0]
-                    if isinstance(e, dict):
-                        return {
-                            "label": e.get("label", "NEUTRAL"),
-                            "score": float(e.get("score", 0.5)),
-                        }
+            with span("sentiment"):
+                out = await hf_client.post(HF_SENTIMENT_MODEL, {"inputs": text[:512]})
+            if isinstance(out, list) and out:
+                e = out[0]
+                if isinstance(e, dict):
+                    return {
+                        "label": e.get("label", "NEUTRAL"),
+                        "score": float(e.get("score", 0.5)),
+                    }
         except Exception:
             pass
         return {"label": "NEUTRAL", "score": 0.5}
 
-    def classify_priority_llm(self, subject: str, body: str) -> Optional[Dict]:
-        if not getattr(settings, "huggingface_api_key", None) or not getattr(settings, "use_llm_priority", True):
+    async def classify_priority_llm(self, subject: str, body: str) -> Optional[Dict]:
+        if not hf_client.enabled or not getattr(settings, "use_llm_priority", True):
             return None
-        return self._classify_priority_via_api(f"{subject} {body}".strip()[:1024])
+        return await self._classify_priority_via_api(f"{subject} {body}".strip()[:1024])
 
-    def _classify_priority_via_api(self, text: str) -> Optional[Dict]:
-        import httpx
-        url = f"https://api-inference.huggingface.co/models/{HF_ZERO_SHOT_MODEL}"
-        headers = {"Authorization": f"Bearer {settings.huggingface_api_key}"}
+    async def _classify_priority_via_api(self, text: str) -> Optional[Dict]:
         payload = {
             "inputs": text or "(no content)",
             "parameters": {"candidate_labels": ["urgent", "high", "normal", "low"]},
         }
         try:
-            with httpx.Client(timeout=15.0) as client:
-                r = client.post(url, headers=headers, json=payload)
-                r.raise_for_status()
-                out = r.json()
+            with span("zero_shot"):
+                out = await hf_client.post(HF_ZERO_SHOT_MODEL, payload, timeout=15.0)
         except Exception:
             return None
         if not isinstance(out, dict):
@@ -95,18 +150,11 @@ class LLMService:
         priority_score = score_map.get(level, 50)
         return {"priority_level": level, "priority_score": priority_score, "confidence": score_val}
 
-    def classify_intent(self, text: str, subject: str) -> str:
-        combined = f"{subject} {text}".lower()
-        intent_keywords = {
-            "action_required": ["urgent", "asap", "deadline", "required", "need", "please", "action", "very important", "really important", "as soon as possible", "send it as soon as possible"],
-            "question": ["?", "question", "wondering", "ask", "help"],
-            "meeting": ["meeting", "call", "schedule", "calendar", "zoom", "teams"],
-            "newsletter": ["newsletter", "unsubscribe", "subscribe"],
-            "promotional": ["sale", "discount", "offer", "deal", "promo"],
-            "spam": ["click here", "limited time", "act now", "winner", "prize"],
-        }
-        scores = {k: sum(1 for w in v if w in combined) for k, v in intent_keywords.items()}
-        if max(scores.values()) == 0:
+    def classify_intent(self, text: str, subject: str, features: Optional[TextFeatures] = None) -> str:
+        if features is None:
+            features = self.intent_features.extract(subject, text)
+        scores = features.intent_counts
+        if not scores or max(scores.values()) == 0:
             return "information"
         return max(scores, key=scores.get)
 
@@ -116,26 +164,19 @@ class LLMService:
         email_body: str,
         tone: str = "professional",
     ) -> str:
-        import httpx
-        url = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
-        headers = {"Authorization": f"Bearer {settings.huggingface_api_key}"}
         prompt = f"Generate a {tone} email response to the following email:\n\nSubject: {email_subject}\nBody: {email_body[:500]}\n\nResponse:"
         
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(
-                    url,
-                    headers=headers,
-                    json={"inputs": prompt, "max_length": 200},
-                    timeout=30.0,
-                )
-                if r.status_code == 200:
-                    data = r.json()
-                    if isinstance(data, list) and data:
-                        raw = data[0].get("generated_text", "")
-                        if "Response:" in raw:
-                            return raw.split("Response:")[-1].strip()
-                        return raw.strip()
+            data = await hf_client.post(
+                HF_RESPONSE_MODEL,
+                {"inputs": prompt, "max_length": 200},
+                timeout=30.0,
+            )
+            if isinstance(data, list) and data:
+                raw = data[0].get("generated_text", "")
+                if "Response:" in raw:
+                    return raw.split("Response:")[-1].strip()
+                return raw.strip()
         except Exception:
             pass
         return self._generate_fallback_response(email_subject, tone)
@@ -0,0 +1,87 @@
+"""Export the local models to ONNX and quantize them to int8 for the "onnx" inference backend.
+
+    python -m backend.app.services.onnx_export                 # into settings.onnx_model_dir
+    python -m backend.app.services.onnx_export --output models/onnx --no-quantize
+
+Needs torch and transformers (export time only) plus onnxruntime.
+"""
+
+import argparse
+import os
+import sys
+
+from backend.app.config import settings
+from backend.app.services.embedding_service import HF_EMBEDDING_MODEL
+from backend.app.services.llm_service import HF_SENTIMENT_MODEL
+from backend.app.services.onnx_runtime import FULL_FILE, QUANTIZED_FILE
+
+# (model, head): "base" exports hidden states for pooling, "classifier" exports logits
+MODELS = [(HF_EMBEDDING_MODEL, "base"), (HF_SENTIMENT_MODEL, "classifier")]
+
+
+def export_model(model_name: str, head: str, output_dir: str, quantize: bool = True, opset: int = 14):
+    import torch
+    from transformers import AutoConfig, AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    target = os.path.join(output_dir, model_name.replace("/", "__"))
+    os.makedirs(target, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    loader = AutoModelForSequenceClassification if head == "classifier" else AutoModel
+    model = loader.from_pretrained(model_name)
+    model.eval()
+    # tokenizer.json + config.json (id2label, pad_token_id) are all the runtime needs
+    tokenizer.save_pretrained(target)
+    AutoConfig.from_pretrained(model_name).save_pretrained(target)
+
+    sample = tokenizer(["Export sample text", "Another one"], padding=True, return_tensors="pt")
+    output_name = "logits" if head == "classifier" else "last_hidden_state"
+    model_path = os.path.join(target, FULL_FILE)
+
+    class _Wrapper(torch.nn.Module):
+        # Only input_ids/attention_mask: token_type_ids default to zeros for both models
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _Wrapper(model),
+            (sample["input_ids"], sample["attention_mask"]),
+            model_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=[output_name],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                output_name: {0: "batch"} if head == "classifier" else {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+    print(f"Exported {model_name} -> {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(target, QUANTIZED_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"Quantized {model_name} -> {quantized_path}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=settings.onnx_model_dir)
+    parser.add_argument("--no-quantize", action="store_true", help="keep only the float32 model")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args(argv)
+
+    for model_name, head in MODELS:
+        export_model(model_name, head, args.output, quantize=not args.no_quantize, opset=args.opset)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
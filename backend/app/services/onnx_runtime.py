@@ -0,0 +1,145 @@
+"""ONNX Runtime inference for the local embedding and sentiment models (CPU, no torch).
+
+Models are produced by `python -m backend.app.services.onnx_export` and loaded
+from <onnx_model_dir>/<model slug>/: model.int8.onnx (or model.onnx),
+tokenizer.json and config.json. The wrappers mimic the call signatures of
+SentenceTransformer.encode and the transformers sentiment pipeline, so the
+services can swap them in without other changes.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from backend.app.config import settings
+
+QUANTIZED_FILE = "model.int8.onnx"
+FULL_FILE = "model.onnx"
+
+
+def model_dir(model_name: str) -> str:
+    return os.path.join(settings.onnx_model_dir, model_name.replace("/", "__"))
+
+
+class _OnnxModel:
+    def __init__(self, path: str, max_length: int):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(path, QUANTIZED_FILE)
+        self.quantization = "int8"
+        if not os.path.exists(model_file):
+            model_file = os.path.join(path, FULL_FILE)
+            self.quantization = "fp32"
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"No ONNX model in {path}; run python -m backend.app.services.onnx_export")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # 0 lets ONNX Runtime use one thread per physical core
+        options.intra_op_num_threads = settings.onnx_intra_op_threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.no_padding()
+        config_path = os.path.join(path, "config.json")
+        self.config: Dict = {}
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                self.config = json.load(f)
+        pad_id = self.config.get("pad_token_id")
+        self.pad_id = pad_id if isinstance(pad_id, int) else 0
+
+        # Token ids by text: the same subject/body is often scored more than once
+        self._cache: "OrderedDict[str, Tuple[List[int], List[int]]]" = OrderedDict()
+        self._cache_size = settings.onnx_tokenizer_cache_size
+        self._cache_lock = threading.Lock()  # models are called from several inference threads
+
+    def _tokenize(self, texts: List[str]) -> List[Tuple[List[int], List[int]]]:
+        with self._cache_lock:
+            out: List = [self._cache.get(t) for t in texts]
+        missing = [i for i, hit in enumerate(out) if hit is None]
+        if not missing:
+            return out
+        for i, enc in zip(missing, self.tokenizer.encode_batch([texts[i] for i in missing])):
+            out[i] = (enc.ids, enc.type_ids)
+        if self._cache_size > 0:
+            with self._cache_lock:
+                for i in missing:
+                    self._cache[texts[i]] = out[i]
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return out
+
+    def _run(self, encodings: List[Tuple[List[int], List[int]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """(first output, attention mask) for one padded batch"""
+        width = max(len(ids) for ids, _ in encodings)
+        input_ids = np.full((len(encodings), width), self.pad_id, dtype=np.int64)
+        type_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, (ids, types) in enumerate(encodings):
+            input_ids[row, :len(ids)] = ids
+            type_ids[row, :len(types)] = types
+            mask[row, :len(ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": mask, "token_type_ids": type_ids}
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+        return self.session.run(None, feeds)[0], mask
+
+    def _batches(self, texts: List[str], batch_size: int):
+        """Yield (positions, output, mask), batching texts of similar length to cut padding"""
+        encodings = self._tokenize(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i][0]))
+        for start in range(0, len(order), batch_size):
+            positions = order[start:start + batch_size]
+            output, mask = self._run([encodings[i] for i in positions])
+            yield positions, output, mask
+
+
+class OnnxEmbedder(_OnnxModel):
+    """Mean-pooled, L2-normalized sentence embeddings (sentence-transformers semantics)"""
+
+    def __init__(self, path: str, max_length: int = 256):
+        super().__init__(path, max_length)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        result = np.zeros((len(texts), 0), dtype=np.float32)
+        for positions, hidden, mask in self._batches(texts, batch_size):
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            if result.shape[1] == 0:
+                result = np.zeros((len(texts), pooled.shape[1]), dtype=np.float32)
+            result[positions] = pooled
+        return result[0] if single else result
+
+
+class OnnxSentimentClassifier(_OnnxModel):
+    """Top label and softmax score per text, like pipeline("sentiment-analysis")"""
+
+    def __init__(self, path: str, max_length: int = 512):
+        super().__init__(path, max_length)
+        id2label = self.config.get("id2label") or {}
+        self.labels = {int(k): v for k, v in id2label.items()}
+
+    def __call__(self, inputs: Union[str, List[str]], batch_size: int = 32, **kwargs) -> List[Dict]:
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        results: List = [None] * len(texts)
+        for positions, logits, _ in self._batches(texts, batch_size):
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            best = probs.argmax(axis=1)
+            for row, i in enumerate(positions):
+                label = int(best[row])
+                results[i] = {"label": self.labels.get(label, f"LABEL_{label}"), "score": float(probs[row, label])}
+        return results
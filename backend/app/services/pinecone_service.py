@@ -1,16 +1,65 @@
-from typing import List, Dict, Optional
+import asyncio
+import threading
+import time
+from typing import Any, List, Dict, Optional, Tuple
 
 from backend.app.config import settings
+from backend.app.services.vector_writer import VectorWriteBuffer
+from backend.app.utils.tracing import span
 
-# Handle different Pinecone versions
-try:
-    # Try new API (v3+)
-    from pinecone import Pinecone, ServerlessSpec
-    USE_NEW_API = True
-except ImportError:
-    USE_NEW_API = False
-    Pinecone = None
-    ServerlessSpec = None
+# (api_key, index_name, use_grpc) -> (client, index); one control-plane round trip per process
+_connections: Dict[Tuple[str, str, bool], Tuple[Any, Any]] = {}
+_connections_lock = threading.Lock()
+
+
+def _connect(api_key: str, index_name: str, dimension: int) -> Tuple[Any, Any]:
+    """Return the shared (client, index) pair, creating the index on first use"""
+    key = (api_key, index_name, settings.pinecone_use_grpc)
+    with _connections_lock:
+        if key in _connections:
+            return _connections[key]
+        
+        # Imported on first connect: the client library is slow to import
+        from pinecone import Pinecone, ServerlessSpec
+
+        if settings.pinecone_use_grpc:
+            # Needs pinecone[grpc]
+            from pinecone.grpc import PineconeGRPC
+            pc = PineconeGRPC(api_key=api_key)
+        else:
+            pc = Pinecone(api_key=api_key, pool_threads=settings.pinecone_pool_threads)
+        
+        # Check if index exists
+        existing_indexes = [idx.name for idx in pc.list_indexes()]
+        
+        if index_name not in existing_indexes:
+            # Create index if it doesn't exist
+            print(f"Creating Pinecone index: {index_name}")
+            region = settings.pinecone_environment
+            if region and "-" in region:
+                parts = region.split("-")
+                if len(parts) >= 3:
+                    region = f"{parts[0]}-{parts[1]}-{parts[2]}"
+            
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region=region or "us-east-1")
+            )
+        
+        # Connect to index (the client caches the host lookup)
+        index = pc.Index(index_name, pool_threads=settings.pinecone_pool_threads)
+        _connections[key] = (pc, index)
+        return pc, index
+
+
+def _forget_connection(api_key: str, index_name: str, index: Any):
+    """Drop the cached pair if it still holds this (failed) index handle"""
+    key = (api_key, index_name, settings.pinecone_use_grpc)
+    with _connections_lock:
+        if key in _connections and _connections[key][1] is index:
+            del _connections[key]
 
 
 class PineconeService:
@@ -18,64 +67,147 @@ class PineconeService:
         self.pc = None
         self.index_name = settings.pinecone_index_name
         self.index = None
+        self.writer: Optional[VectorWriteBuffer] = None
         self.dimension = 384  # For sentence-transformers/all-MiniLM-L6-v2
+        self.healthy: Optional[bool] = None
+        self.last_health_check: Optional[float] = None
+        self._health_task: Optional[asyncio.Task] = None
+    
+    @property
+    def backend(self) -> str:
+        """Resolved vector backend; "auto" picks local when no Pinecone key is configured"""
+        if settings.vector_backend == "auto":
+            return "pinecone" if settings.pinecone_api_key else "local"
+        return settings.vector_backend
     
     async def initialize(self):
-        """Initialize or connect to Pinecone index. Skips silently if API key is missing (e.g. local dev)."""
-        if not USE_NEW_API:
-            raise ImportError("Pinecone v3+ required. Install: pip install 'pinecone>=3.0.0'")
+        """Initialize or connect to Pinecone index, or open the in-process index for the local backend."""
+        if self.backend == "local":
+            self._initialize_local()
+            return
         if not getattr(settings, "pinecone_api_key", None):
             self.index = None
             return
         try:
-            self.pc = Pinecone(api_key=settings.pinecone_api_key)
-            
-            # Check if index exists
-            existing_indexes = [idx.name for idx in self.pc.list_indexes()]
-            
-            if self.index_name not in existing_indexes:
-                # Create index if it doesn't exist
-                print(f"Creating Pinecone index: {self.index_name}")
-                region = settings.pinecone_environment
-                if region and "-" in region:
-                    parts = region.split("-")
-                    if len(parts) >= 3:
-                        region = f"{parts[0]}-{parts[1]}-{parts[2]}"
-                
-                self.pc.create_index(
-                    name=self.index_name,
-                    dimension=self.dimension,
-                    metric="cosine",
-                    spec=ServerlessSpec(cloud="aws", region=region or "us-east-1")
-                )
-            
-            # Connect to index
-            self.index = self.pc.Index(self.index_name)
+            from pinecone import Pinecone  # noqa: F401
+        except ImportError:
+            raise ImportError("Pinecone v3+ required. Install: pip install 'pinecone>=3.0.0'")
+        try:
+            self.pc, self.index = await asyncio.to_thread(
+                _connect, settings.pinecone_api_key, self.index_name, self.dimension
+            )
+            self.healthy = True
             print(f"Connected to Pinecone index: {self.index_name}")
             
+            if settings.pinecone_write_behind:
+                await self._start_writer()
+            if settings.pinecone_health_interval_s > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+            
         except Exception as e:
             print(f"Error initializing Pinecone: {e}")
             raise
     
+    async def _health_loop(self):
+        """Re-validate the shared index in the background; reconnect when a probe fails"""
+        while True:
+            await asyncio.sleep(settings.pinecone_health_interval_s)
+            await self.check_health()
+    
+    async def check_health(self) -> bool:
+        try:
+            await asyncio.to_thread(self.index.describe_index_stats)
+            self.healthy = True
+        except Exception as e:
+            print(f"Pinecone health check failed, reconnecting: {e}")
+            self.healthy = False
+            _forget_connection(settings.pinecone_api_key, self.index_name, self.index)
+            try:
+                self.pc, self.index = await asyncio.to_thread(
+                    _connect, settings.pinecone_api_key, self.index_name, self.dimension
+                )
+                self.healthy = True
+            except Exception as reconnect_error:
+                # Keep the old handle; the next probe tries again
+                print(f"Pinecone reconnect failed: {reconnect_error}")
+        self.last_health_check = time.time()
+        return self.healthy
+    
+    def _initialize_local(self):
+        from backend.app.services.vector_store import LocalVectorIndex
+        
+        self.index = LocalVectorIndex(
+            self.dimension,
+            path=settings.local_vector_path,
+            ivf_threshold=settings.local_vector_ivf_threshold,
+            nprobe=settings.local_vector_nprobe,
+        )
+        # In-process upserts are microseconds; no write-behind buffer needed
+        print(f"Using local vector index ({len(self.index)} vectors)")
+    
+    async def _start_writer(self):
+        # Look the index up per batch so a reconnect is picked up
+        self.writer = VectorWriteBuffer(
+            lambda vectors: self.index.upsert(vectors=vectors),
+            batch_size=settings.pinecone_upsert_batch_size,
+            flush_interval_s=settings.pinecone_flush_interval_s,
+            max_concurrency=settings.pinecone_upsert_concurrency,
+            max_retries=settings.pinecone_upsert_retries,
+        )
+        await self.writer.start()
+    
+    async def close(self):
+        """Stop the health probe, drain buffered upserts and persist the local index"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
+        save = getattr(self.index, "save", None)
+        if save is not None:
+            save()
+    
     async def upsert_email_embedding(
         self,
         email_id: str,
         embedding: List[float],
         metadata: Dict
     ):
-        """Store email embedding in Pinecone"""
+        """Store email embedding in Pinecone (buffered when write-behind is on)"""
         if self.index is None:
             return
         
+        if self.writer is not None:
+            await self.writer.add({"id": email_id, "values": embedding, "metadata": metadata})
+            return
+        
         try:
-            self.index.upsert(vectors=[{
-                "id": email_id,
-                "values": embedding,
-                "metadata": metadata
-            }])
+            with span("upsert"):
+                self.index.upsert(vectors=[{
+                    "id": email_id,
+                    "values": embedding,
+                    "metadata": metadata
+                }])
         except Exception as e:
             print(f"Error upserting embedding: {e}")
     
+    async def upsert_email_embeddings(self, vectors: List[Dict], batch_size: int = 100):
+        """Store many embeddings using one upsert request per batch_size vectors"""
+        if self.index is None or not vectors:
+            return
+        
+        if self.writer is not None:
+            await self.writer.add_many(vectors)
+            return
+        
+        for i in range(0, len(vectors), batch_size):
+            try:
+                with span("upsert"):
+                    self.index.upsert(vectors=vectors[i:i + batch_size])
+            except Exception as e:
+                print(f"Error upserting embeddings batch: {e}")
+    
     async def search_similar_emails(
         self,
         embedding: List[float],
@@ -87,26 +219,72 @@ class PineconeService:
             return []
         
         try:
-            query_response = self.index.query(
-                vector=embedding,
-                top_k=top_k,
-                include_metadata=True,
-                filter=filter_dict
-            )
-            
-            results = []
-            for match in query_response.matches:
-                results.append({
-                    "id": match.id,
-                    "score": match.score,
-                    "metadata": match.metadata
-                })
-            
-            return results
+            # Off the event loop, so the similarity deadline can cut a slow query short
+            with span("vector_search"):
+                query_response = await asyncio.to_thread(
+                    self.index.query,
+                    vector=embedding,
+                    top_k=top_k,
+                    include_metadata=True,
+                    filter=filter_dict
+                )
+            return self._to_results(query_response)
         except Exception as e:
             print(f"Error searching similar emails: {e}")
             return []
     
+    async def search_similar_emails_batch(
+        self,
+        embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_dict: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """Top-k similar emails for every row of embeddings, in input order.
+        
+        The local index answers all rows with one matrix multiply; Pinecone
+        queries run in parallel, at most pinecone_query_concurrency at a time.
+        """
+        if self.index is None or not len(embeddings):
+            return [[] for _ in range(len(embeddings))]
+        
+        query_batch = getattr(self.index, "query_batch", None)
+        if query_batch is not None:
+            try:
+                with span("vector_search", queries=len(embeddings)):
+                    responses = query_batch(embeddings, top_k=top_k, include_metadata=True, filter=filter_dict)
+                return [self._to_results(r) for r in responses]
+            except Exception as e:
+                print(f"Error searching similar emails: {e}")
+                return [[] for _ in range(len(embeddings))]
+        
+        semaphore = asyncio.Semaphore(settings.pinecone_query_concurrency)
+        index = self.index
+        
+        async def query_one(embedding) -> List[Dict]:
+            async with semaphore:
+                try:
+                    with span("vector_search"):
+                        response = await asyncio.to_thread(
+                            index.query,
+                            vector=[float(x) for x in embedding],
+                            top_k=top_k,
+                            include_metadata=True,
+                            filter=filter_dict
+                        )
+                    return self._to_results(response)
+                except Exception as e:
+                    print(f"Error searching similar emails: {e}")
+                    return []
+        
+        return list(await asyncio.gather(*(query_one(e) for e in embeddings)))
+    
+    @staticmethod
+    def _to_results(query_response) -> List[Dict]:
+        return [
+            {"id": match.id, "score": match.score, "metadata": match.metadata}
+            for match in query_response.matches
+        ]
+    
     async def upsert_intent_pattern(
         self,
         intent: str,
@@ -1,10 +1,14 @@
-from typing import Dict, List
+import asyncio
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 from backend.app.config import settings
-from backend.app.models.email import PriorityLevel, EmailIntent
+from backend.app.utils.concurrency import with_timeout
+from backend.app.utils.tracing import span
+from backend.app.models.email import PriorityLevel
 from backend.app.services.embedding_service import EmbeddingService
 from backend.app.services.pinecone_service import PineconeService
-from backend.app.services.llm_service import LLMService
+from backend.app.services.llm_service import LLMService, INTENT_KEYWORDS
+from backend.app.services.text_features import FeatureExtractor, TextFeatures
 
 
 class PriorityService:
@@ -51,48 +55,90 @@ class PriorityService:
             "as soon as possible", "asap", "send it as soon as possible",
             "need it urgently", "top priority", "highest priority", "critically important"
         ]
+        # Compiled once; every scorer shares the features extracted per email
+        self.features = FeatureExtractor(
+            self.urgency_keywords.keys(),
+            self.low_urgency_phrases,
+            self.strong_urgency_phrases,
+            INTENT_KEYWORDS,
+        )
     
+    @span("calculate_priority")
     async def calculate_priority(
         self,
         subject: str,
         body: str,
         sender: str,
         received_at: datetime,
-        user_id: str
+        user_id: str,
+        sentiment_result: Optional[Dict] = None,
+        embedding: Optional[Union[List[float], "asyncio.Future[List[float]]"]] = None,
+        similar_emails_score: Optional[float] = None
     ) -> Dict:
+        """Score one email. Precomputed sentiment/embedding/similarity (e.g. from a batch) skip model and index calls.
+
+        embedding may also be a task still computing it; only the similarity stage waits for it.
+        """
         import time
         start_time = time.time()
 
-        intent = self.llm_service.classify_intent(body, subject)
-        sentiment_result = self.llm_service.analyze_sentiment(f"{subject} {body}")
+        with span("features"):
+            features = self.features.extract(subject, body)
+            intent = self.llm_service.classify_intent(body, subject, features=features)
+
+        # Independent stages run concurrently, each under its own deadline
+        sentiment_task = None
+        if sentiment_result is None:
+            sentiment_task = asyncio.ensure_future(with_timeout(
+                self.llm_service.analyze_sentiment(f"{subject} {body}"),
+                settings.sentiment_timeout_s, {"label": "NEUTRAL", "score": 0.5}, "sentiment"
+            ))
+        use_llm = getattr(settings, "use_llm_priority", True)
+        llm_task = asyncio.ensure_future(with_timeout(
+            self.llm_service.classify_priority_llm(subject, body),
+            settings.zero_shot_timeout_s, None, "zero-shot priority"
+        )) if use_llm else None
+        sender_task = asyncio.ensure_future(self._calculate_sender_importance(sender, user_id))
+        # Similarity only feeds the rule-based fallback; start it speculatively
+        similar_task = None
+        if similar_emails_score is None:
+            similar_task = asyncio.ensure_future(with_timeout(
+                self._get_similar_emails_priority(subject, body, embedding),
+                settings.similarity_timeout_s, 0.5, "similar emails"
+            ))
 
-        if getattr(settings, "use_llm_priority", True):
-            llm_priority = self.llm_service.classify_priority_llm(subject, body)
-            if llm_priority is not None:
-                try:
-                    priority_level = PriorityLevel(llm_priority["priority_level"])
-                except ValueError:
-                    priority_level = PriorityLevel.NORMAL
-                priority_score = min(100, max(0, float(llm_priority.get("priority_score", 50))))
-                if intent == "spam":
-                    priority_level = PriorityLevel.SPAM
-                processing_time = (time.time() - start_time) * 1000
-                sender_importance = await self._calculate_sender_importance(sender, user_id)
-                return {
-                    "priority_score": round(priority_score, 2),
-                    "priority_level": priority_level,
-                    "intent": intent,
-                    "sentiment": sentiment_result.get("label", "NEUTRAL"),
-                    "urgency_keywords": self._extract_urgency_keywords(subject, body),
-                    "sender_importance": round(sender_importance, 2),
-                    "processing_time_ms": round(processing_time, 2),
-                }
+        llm_priority = await llm_task if llm_task is not None else None
+        if llm_priority is not None and similar_task is not None:
+            similar_task.cancel()
+        if sentiment_task is not None:
+            sentiment_result = await sentiment_task
+        sender_importance = await sender_task
+
+        if llm_priority is not None:
+            try:
+                priority_level = PriorityLevel(llm_priority["priority_level"])
+            except ValueError:
+                priority_level = PriorityLevel.NORMAL
+            priority_score = min(100, max(0, float(llm_priority.get("priority_score", 50))))
+            if intent == "spam":
+                priority_level = PriorityLevel.SPAM
+            processing_time = (time.time() - start_time) * 1000
+            return {
+                "priority_score": round(priority_score, 2),
+                "priority_level": priority_level,
+                "intent": intent,
+                "sentiment": sentiment_result.get("label", "NEUTRAL"),
+                "urgency_keywords": self._extract_urgency_keywords(subject, body, features),
+                "sender_importance": round(sender_importance, 2),
+                "processing_time_ms": round(processing_time, 2),
+            }
         # Fallback: rule-based (no API or LLM failed)
+        if similar_task is not None:
+            similar_emails_score = await similar_task
         sentiment_score = sentiment_result.get("score", 0.5)
-        urgency_score = self._calculate_urgency_score(subject, body)
-        sender_importance = await self._calculate_sender_importance(sender, user_id)
-        time_sensitivity = self._calculate_time_sensitivity(received_at)
-        similar_emails_score = await self._get_similar_emails_priority(subject, body)
+        with span("rule_score"):
+            urgency_score = self._calculate_urgency_score(subject, body, features)
+            time_sensitivity = self._calculate_time_sensitivity(received_at)
         priority_score = (
             sender_importance * self.weights["sender_importance"] * 100 +
             urgency_score * self.weights["urgency_keywords"] * 100 +
@@ -101,9 +147,8 @@ class PriorityService:
             time_sensitivity * self.weights["time_sensitivity"] * 100 +
             similar_emails_score * self.weights["similar_emails"] * 100
         )
-        text_lower = f"{subject} {body}".lower()
-        has_strong_importance = any(phrase in text_lower for phrase in self.strong_urgency_phrases)
-        if any(phrase in text_lower for phrase in self.low_urgency_phrases):
+        has_strong_importance = bool(features.strong_urgency_phrases)
+        if features.low_urgency_phrases:
             priority_score -= 15
         elif has_strong_importance:
             priority_score += 28
@@ -119,54 +164,61 @@ class PriorityService:
             "priority_level": priority_level,
             "intent": intent,
             "sentiment": sentiment_result.get("label", "NEUTRAL"),
-            "urgency_keywords": self._extract_urgency_keywords(subject, body),
+            "urgency_keywords": self._extract_urgency_keywords(subject, body, features),
             "sender_importance": round(sender_importance, 2),
             "processing_time_ms": round(processing_time, 2)
         }
     
-    def _calculate_urgency_score(self, subject: str, body: str) -> float:
-        import re
-        text = f"{subject} {body}".lower()
+    async def calculate_priority_batch(
+        self,
+        emails: List[Dict],
+        embeddings: List[List[float]],
+        sentiments: List[Dict],
+        user_id: str = "default_user"
+    ) -> List[Dict]:
+        """Score a batch whose embeddings and sentiments were computed up front"""
+        # One batched similarity search for the whole batch instead of one query per email
+        similar_scores = await with_timeout(
+            self._get_similar_emails_priority_batch(embeddings),
+            settings.similarity_timeout_s, [0.5] * len(emails), "similar emails"
+        )
+        # Scored concurrently: each zero-shot call is a network round trip, and
+        # hf_client's per-model semaphore caps how many are in flight
+        return list(await asyncio.gather(*(
+            self.calculate_priority(
+                subject=email_data["subject"],
+                body=email_data["body"],
+                sender=email_data["sender"],
+                received_at=email_data["received_at"],
+                user_id=user_id,
+                sentiment_result=sentiment,
+                embedding=embedding,
+                similar_emails_score=similar,
+            )
+            for email_data, embedding, sentiment, similar in zip(emails, embeddings, sentiments, similar_scores)
+        )))
+    
+    def _calculate_urgency_score(
+        self,
+        subject: str,
+        body: str,
+        features: Optional[TextFeatures] = None
+    ) -> float:
+        if features is None:
+            features = self.features.extract(subject, body)
         max_score = max(self.urgency_keywords.values())
 
-        for phrase in self.low_urgency_phrases:
-            if phrase in text:
-                return 0.2  # low urgency so "not important" → LOW priority
-
-        strong_boost = 0.0
-        for phrase in self.strong_urgency_phrases:
-            if phrase in text:
-                strong_boost = 0.95  # push toward high/urgent
-                break
+        if features.low_urgency_phrases:
+            return 0.2  # low urgency so "not important" → LOW priority
 
-        negated_important = re.search(r'\bnot\s+important\b', text) or "not important" in text
-        negated_urgent = re.search(r'\bnot\s+urgent\b', text) or "not urgent" in text
+        strong_boost = 0.95 if features.strong_urgency_phrases else 0.0  # push toward high/urgent
 
-        found_keywords = []
         total_score = 0
         time_modifier = 1.0
         time_based_urgency = 0.0
 
-        near_deadline = re.search(
-            r'(?:in\s+(\d+)\s+day|(\d+)\s+day\s+(?:left|remaining|to\s+go|until)|due\s+in\s+(\d+)\s+day)',
-            text, re.I
-        )
-        in_days = re.findall(r'in\s+(\d+)\s+days?', text)
-        days_only = re.findall(r'(\d+)\s+days?\s+(?:from\s+now|away|left|remaining)', text)
-        all_days = []
-        for m in in_days:
-            all_days.append(int(m))
-        for m in days_only:
-            all_days.append(int(m))
-        if near_deadline:
-            g = near_deadline.groups()
-            for x in g:
-                if x and x.isdigit():
-                    all_days.append(int(x))
-                    break
-        
-        if all_days:
-            d = min(all_days)
+        if features.days:
+            d = min(features.days)
             if d <= 1:
                 time_based_urgency = 0.95
             elif d <= 2:
@@ -185,35 +237,27 @@ class PriorityService:
                 time_modifier = 0.2
         
         # "today" / "tomorrow" / "in X hours"
-        if re.search(r'\b(?:today|tomorrow|this\s+week)\b', text):
+        if features.mentions_relative_day:
             time_based_urgency = max(time_based_urgency, 0.9)
-        hours = re.findall(r'in\s+(\d+)\s+hours?', text)
-        if hours and int(hours[0]) <= 24:
+        if features.hours and features.hours[0] <= 24:
             time_based_urgency = max(time_based_urgency, 0.9)
         
         # Far future
-        after = re.findall(r'after\s+(\d+)\s+days?', text)
-        for m in after:
-            try:
-                d = int(m)
-                if d >= 50:
-                    time_modifier = min(time_modifier, 0.2)
-                elif d >= 30:
-                    time_modifier = min(time_modifier, 0.4)
-                elif d >= 14:
-                    time_modifier = min(time_modifier, 0.6)
-            except ValueError:
-                pass
+        for d in features.after_days:
+            if d >= 50:
+                time_modifier = min(time_modifier, 0.2)
+            elif d >= 30:
+                time_modifier = min(time_modifier, 0.4)
+            elif d >= 14:
+                time_modifier = min(time_modifier, 0.6)
         
-        for keyword, score in self.urgency_keywords.items():
-            if keyword in text:
-                # Don't count "important" if text says "not important"
-                if keyword == "important" and negated_important:
-                    continue
-                if keyword == "urgent" and negated_urgent:
-                    continue
-                found_keywords.append(keyword)
-                total_score += score
+        for keyword in features.urgency_keywords:
+            # Don't count "important" if text says "not important"
+            if keyword == "important" and features.negated_important:
+                continue
+            if keyword == "urgent" and features.negated_urgent:
+                continue
+            total_score += self.urgency_keywords[keyword]
 
         if total_score > 0:
             base = min(1.0, total_score / (max_score * 2))
@@ -228,10 +272,17 @@ class PriorityService:
             final = max(final, strong_boost)
         return min(1.0, max(0.0, final))
     
-    def _extract_urgency_keywords(self, subject: str, body: str) -> List[str]:
-        text = f"{subject} {body}".lower()
-        return [kw for kw in self.urgency_keywords.keys() if kw in text]
+    def _extract_urgency_keywords(
+        self,
+        subject: str,
+        body: str,
+        features: Optional[TextFeatures] = None
+    ) -> List[str]:
+        if features is None:
+            features = self.features.extract(subject, body)
+        return list(features.urgency_keywords)
     
+    @span("sender_importance")
     async def _calculate_sender_importance(self, sender: str, user_id: str) -> float:
         """Calculate sender importance score (0.0 to 1.0)"""
         sender_lower = sender.lower()
@@ -258,29 +309,50 @@ class PriorityService:
         else:
             return 0.4
     
-    async def _get_similar_emails_priority(self, subject: str, body: str) -> float:
+    async def _get_similar_emails_priority(
+        self,
+        subject: str,
+        body: str,
+        embedding: Optional[Union[List[float], "asyncio.Future[List[float]]"]] = None
+    ) -> float:
         try:
-            embedding = self.embedding_service.generate_embedding(f"{subject} {body}")
+            if embedding is None:
+                embedding = await self.embedding_service.generate_embedding(f"{subject} {body}")
+            elif asyncio.isfuture(embedding):
+                # Shielded: the caller still needs the vector if this stage is cancelled
+                embedding = await asyncio.shield(embedding)
             similar = await self.pinecone_service.search_similar_emails(embedding, top_k=3)
-            
-            if not similar:
-                return 0.5  
-            total_score = 0
-            count = 0
-            
-            for match in similar:
-                metadata = match.get("metadata", {})
-                if "priority_score" in metadata:
-                    total_score += metadata["priority_score"] / 100
-                    count += 1
-            
-            if count == 0:
-                return 0.5
-            
-            return total_score / count
+            return self._similar_priority(similar)
+        except Exception as e:
+            print(f"Error getting similar emails priority: {e}")
+            return 0.5
+    
+    async def _get_similar_emails_priority_batch(self, embeddings: List[List[float]]) -> List[float]:
+        try:
+            similar = await self.pinecone_service.search_similar_emails_batch(embeddings, top_k=3)
+            return [self._similar_priority(matches) for matches in similar]
         except Exception as e:
             print(f"Error getting similar emails priority: {e}")
+            return [0.5] * len(embeddings)
+    
+    @staticmethod
+    def _similar_priority(similar: List[Dict]) -> float:
+        """Mean priority (0.0 to 1.0) of the matches that carry one; 0.5 when none do"""
+        if not similar:
+            return 0.5  
+        total_score = 0
+        count = 0
+        
+        for match in similar:
+            metadata = match.get("metadata") or {}
+            if "priority_score" in metadata:
+                total_score += metadata["priority_score"] / 100
+                count += 1
+        
+        if count == 0:
             return 0.5
+        
+        return total_score / count
     
     def _score_to_level(self, score: float, intent: str) -> PriorityLevel:
         if intent == "spam":
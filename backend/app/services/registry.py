@@ -0,0 +1,166 @@
+"""Process-wide registry of warmed service singletons."""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+from backend.app.database.supabase_client import SupabaseClient, database
+from backend.app.services.analysis_cache import AnalysisCache, create_analysis_cache
+from backend.app.services.embedding_service import EmbeddingService
+from backend.app.services.pinecone_service import PineconeService
+from backend.app.services.llm_service import LLMService
+from backend.app.services.priority_service import PriorityService
+from backend.app.services.batch_service import BatchAnalyzer
+from backend.app.services.hf_client import hf_client
+from backend.app.utils.concurrency import shutdown_inference_executor, shutdown_parse_executor
+
+WARMUP_TEXT = "Warm-up: please review the attached report before the meeting today."
+
+
+class ServiceRegistry:
+    """Holds one instance of each heavy service for the lifetime of the process"""
+
+    def __init__(self):
+        self.embedding: Optional[EmbeddingService] = None
+        self.pinecone: Optional[PineconeService] = None
+        self.llm: Optional[LLMService] = None
+        self.priority: Optional[PriorityService] = None
+        self.batch: Optional[BatchAnalyzer] = None
+        self.db: SupabaseClient = database
+        self.analysis_cache: Optional[AnalysisCache] = None
+        self.initialized = False
+        self.warmed_up = False
+        self.stage = "not_started"  # startup progress, reported by /ready
+        self.error: Optional[str] = None
+        self._started_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+        self._startup_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def initialize(self, warmup: bool = False):
+        """Create and initialize services once; safe to call repeatedly"""
+        if not self.initialized:
+            async with self._lock:
+                if not self.initialized:
+                    self._started_at = self._started_at or time.monotonic()
+                    self.stage = "loading_embedding_model"
+                    await hf_client.start()
+
+                    embedding = EmbeddingService()
+                    await embedding.initialize()
+
+                    self.stage = "connecting_vector_store"
+                    pinecone = PineconeService()
+                    try:
+                        await pinecone.initialize()
+                    except Exception as e:
+                        # Similarity search is optional; keep serving without it
+                        print(f"Pinecone unavailable, similarity disabled: {e}")
+                        pinecone.index = None
+
+                    self.stage = "loading_sentiment_model"
+                    llm = LLMService()
+                    await llm.initialize()
+
+                    self.stage = "connecting_database"
+                    try:
+                        await self.db.initialize()
+                    except Exception as e:
+                        # Analysis works without storage; results just aren't persisted
+                        print(f"Database unavailable, emails will not be stored: {e}")
+
+                    self.embedding = embedding
+                    self.pinecone = pinecone
+                    self.llm = llm
+                    self.priority = PriorityService(embedding, pinecone, llm)
+                    self.analysis_cache = create_analysis_cache()
+                    self.batch = BatchAnalyzer(
+                        embedding, pinecone, llm, self.priority, self.db, self.analysis_cache
+                    )
+                    self.initialized = True
+
+        if warmup and not self.warmed_up:
+            self.stage = "warming_up"
+            await self.warmup()
+        # While a background startup runs, it alone reports ready (after its warm-up)
+        if self._startup_task is None or self._startup_task.done():
+            self._mark_ready()
+
+    def _mark_ready(self):
+        if self.stage != "ready":
+            self.stage = "ready"
+            self.error = None
+            self._ready_at = time.monotonic()
+
+    def start(self, warmup: bool = False) -> asyncio.Task:
+        """Initialize in the background so the server answers (e.g. /health) while models load"""
+        if self._startup_task is None:
+            self._started_at = time.monotonic()
+            self._startup_task = asyncio.create_task(self._startup(warmup))
+        return self._startup_task
+
+    async def _startup(self, warmup: bool):
+        try:
+            await self.initialize(warmup=warmup)
+        except Exception as e:
+            self.stage = "failed"
+            self.error = str(e)
+            print(f"Service startup failed: {e}")
+            return
+        self._mark_ready()
+
+    def status(self) -> Dict:
+        """Readiness and startup progress"""
+        if self._started_at is None:
+            elapsed = None
+        else:
+            elapsed = round((self._ready_at or time.monotonic()) - self._started_at, 3)
+        return {
+            "ready": self.stage == "ready",
+            "stage": self.stage,
+            "initialized": self.initialized,
+            "warmed_up": self.warmed_up,
+            "startup_s": elapsed,
+            "error": self.error,
+        }
+
+    async def warmup(self):
+        """Run one throwaway inference per model so the first request is not cold"""
+        start = asyncio.get_running_loop().time()
+        try:
+            await self.embedding.generate_embedding(WARMUP_TEXT)
+            await self.llm.analyze_sentiment(WARMUP_TEXT)
+            self.llm.classify_intent(WARMUP_TEXT, "Warm-up")
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+            return
+        self.warmed_up = True
+        elapsed_ms = (asyncio.get_running_loop().time() - start) * 1000
+        print(f"Services warmed up in {elapsed_ms:.0f}ms")
+
+    async def close(self):
+        if self._startup_task is not None and not self._startup_task.done():
+            self._startup_task.cancel()
+            try:
+                await self._startup_task
+            except asyncio.CancelledError:
+                pass
+        self._startup_task = None
+        if self.pinecone is not None:
+            await self.pinecone.close()
+        if self.embedding is not None:
+            self.embedding.close()
+        if self.analysis_cache is not None:
+            await self.analysis_cache.close()
+        await self.db.close()
+        await hf_client.close()
+        shutdown_inference_executor()
+        shutdown_parse_executor()
+        self.initialized = False
+        self.warmed_up = False
+        self.stage = "not_started"
+        self.error = None
+        self._started_at = self._ready_at = None
+
+
+registry = ServiceRegistry()
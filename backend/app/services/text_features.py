@@ -0,0 +1,151 @@
+"""Single-pass keyword/phrase matching shared by the rule engine and intent classifier."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+# Words and standalone punctuation ("?" is an intent signal)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Deadline expressions (matched on lowercased text)
+_NEAR_DEADLINE_RE = re.compile(
+    r'(?:in\s+(\d+)\s+day|(\d+)\s+day\s+(?:left|remaining|to\s+go|until)|due\s+in\s+(\d+)\s+day)'
+)
+_IN_DAYS_RE = re.compile(r'in\s+(\d+)\s+days?')
+_DAYS_ONLY_RE = re.compile(r'(\d+)\s+days?\s+(?:from\s+now|away|left|remaining)')
+_IN_HOURS_RE = re.compile(r'in\s+(\d+)\s+hours?')
+_AFTER_DAYS_RE = re.compile(r'after\s+(\d+)\s+days?')
+
+_HITS = "\0"
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def word_forms(word: str) -> List[str]:
+    """word plus its common inflections: deadline(s), offer(ed), schedul(ing), ..."""
+    if len(word) < 3 or not word.isalpha():
+        return [word]
+    forms = [word, word + "s", word + "es", word + "ed", word + "ing"]
+    if word.endswith("e"):
+        forms += [word + "d", word[:-1] + "ing"]
+    return forms
+
+
+class PhraseMatcher:
+    """Token trie over every phrase of every group.
+
+    Matches respect word boundaries ("now" does not hit "know"), the last
+    word of a phrase also matches its inflections ("deadline" hits
+    "deadlines", "need" hits "needed"), and overlapping phrases ("as soon as
+    possible" inside "send it as soon as possible") are all reported.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self._root: Dict = {}
+        for group, phrases in groups.items():
+            for phrase in phrases:
+                tokens = tokenize(phrase)
+                if not tokens:
+                    continue
+                node = self._root
+                for tok in tokens[:-1]:
+                    node = node.setdefault(tok, {})
+                for form in word_forms(tokens[-1]):
+                    hits = node.setdefault(form, {}).setdefault(_HITS, [])
+                    if (group, phrase) not in hits:
+                        hits.append((group, phrase))
+
+    def find(self, tokens: List[str]) -> Dict[str, List[str]]:
+        """Return {group: [distinct phrases hit]} in one pass over the tokens"""
+        found: Dict[str, List[str]] = {}
+        seen = set()
+        root = self._root
+        n = len(tokens)
+        for i in range(n):
+            node = root.get(tokens[i])
+            j = i + 1
+            while node is not None:
+                for hit in node.get(_HITS, ()):
+                    if hit not in seen:
+                        seen.add(hit)
+                        found.setdefault(hit[0], []).append(hit[1])
+                if j >= n:
+                    break
+                node = node.get(tokens[j])
+                j += 1
+        return found
+
+
+@dataclass
+class TextFeatures:
+    """Everything the scorers need from subject + body, computed once"""
+    text: str
+    urgency_keywords: List[str] = field(default_factory=list)
+    low_urgency_phrases: List[str] = field(default_factory=list)
+    strong_urgency_phrases: List[str] = field(default_factory=list)
+    intent_counts: Dict[str, int] = field(default_factory=dict)
+    negated_important: bool = False
+    negated_urgent: bool = False
+    mentions_relative_day: bool = False
+    days: List[int] = field(default_factory=list)
+    hours: List[int] = field(default_factory=list)
+    after_days: List[int] = field(default_factory=list)
+
+
+class FeatureExtractor:
+    """Compiled once from the keyword tables; extract() is called per email"""
+
+    def __init__(
+        self,
+        urgency_keywords: Iterable[str] = (),
+        low_urgency_phrases: Iterable[str] = (),
+        strong_urgency_phrases: Iterable[str] = (),
+        intent_keywords: Optional[Dict[str, Iterable[str]]] = None,
+    ):
+        self.urgency_keywords = list(urgency_keywords)
+        self.intent_names = list((intent_keywords or {}).keys())
+        groups: Dict[str, Iterable[str]] = {
+            "urgency": self.urgency_keywords,
+            "low": list(low_urgency_phrases),
+            "strong": list(strong_urgency_phrases),
+            "negated_important": ["not important"],
+            "negated_urgent": ["not urgent"],
+            "relative_day": ["today", "tomorrow", "this week"],
+        }
+        for intent, words in (intent_keywords or {}).items():
+            groups[f"intent:{intent}"] = list(words)
+        self.matcher = PhraseMatcher(groups)
+
+    def extract(self, subject: str, body: str) -> TextFeatures:
+        text = f"{subject} {body}".lower()
+        hits = self.matcher.find(_TOKEN_RE.findall(text))
+
+        urgency_hits = set(hits.get("urgency", ()))
+        features = TextFeatures(
+            text=text,
+            urgency_keywords=[kw for kw in self.urgency_keywords if kw in urgency_hits],
+            low_urgency_phrases=hits.get("low", []),
+            strong_urgency_phrases=hits.get("strong", []),
+            intent_counts={k: len(hits.get(f"intent:{k}", ())) for k in self.intent_names},
+            negated_important="negated_important" in hits,
+            negated_urgent="negated_urgent" in hits,
+            mentions_relative_day="relative_day" in hits,
+        )
+
+        # Cheap guards keep the numeric regexes off texts that cannot match
+        if "day" in text:
+            features.days.extend(int(m) for m in _IN_DAYS_RE.findall(text))
+            features.days.extend(int(m) for m in _DAYS_ONLY_RE.findall(text))
+            near_deadline = _NEAR_DEADLINE_RE.search(text)
+            if near_deadline:
+                for x in near_deadline.groups():
+                    if x and x.isdigit():
+                        features.days.append(int(x))
+                        break
+            features.after_days.extend(int(m) for m in _AFTER_DAYS_RE.findall(text))
+        if "hour" in text:
+            features.hours.extend(int(m) for m in _IN_HOURS_RE.findall(text))
+        return features
+
@@ -0,0 +1,310 @@
+"""In-process vector index usable wherever PineconeService expects a Pinecone Index."""
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class VectorIndex(ABC):
+    """The subset of the Pinecone Index API that PineconeService relies on.
+
+    upsert(vectors=[{"id", "values", "metadata"}])
+    query(vector=..., top_k=..., include_metadata=True, filter=None) -> obj with .matches
+    delete(ids=[...])
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: List[Dict]):
+        ...
+
+    @abstractmethod
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        ...
+
+
+def matches_filter(metadata: Dict, flt: Optional[Dict]) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq/$ne/$in/$nin/$gt/$gte/$lt/$lte/$and/$or)"""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, c) for c in cond):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, target in cond.items():
+            if op == "$eq" and not value == target:
+                return False
+            if op == "$ne" and not value != target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+            try:
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+            except TypeError:
+                return False
+    return True
+
+
+class LocalVectorIndex(VectorIndex):
+    """Cosine similarity over a contiguous float32 matrix of normalized rows.
+
+    Small corpora are searched exactly with one matrix-vector product. Past
+    ivf_threshold vectors an IVF (k-means inverted file) index is built and
+    only the nprobe closest clusters are scanned.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        path: Optional[str] = None,
+        ivf_threshold: int = 50000,
+        nprobe: int = 8,
+        initial_capacity: int = 1024,
+    ):
+        self.dimension = dimension
+        self.path = path
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Dict] = []
+        self._rows: Dict[str, int] = {}
+        self._ivf: Optional[Dict[str, Any]] = None
+        self._dirty = False
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(values) -> np.ndarray:
+        vec = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vec, axis=-1, keepdims=True)
+        return vec / np.maximum(norm, 1e-12)
+
+    def _grow(self, needed: int):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+        grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+        self._matrix = grown
+
+    def upsert(self, vectors: List[Dict]):
+        with self._lock:
+            self._grow(len(self._ids) + len(vectors))
+            for v in vectors:
+                row = self._rows.get(v["id"])
+                values = self._normalize(v["values"])
+                metadata = dict(v.get("metadata") or {})
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(v["id"])
+                    self._metadata.append(metadata)
+                    self._rows[v["id"]] = row
+                    self._matrix[row] = values
+                    self._ivf_add(row)
+                else:
+                    self._matrix[row] = values
+                    self._metadata[row] = metadata
+                    self._ivf_move(row)
+            self._dirty = True
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            for email_id in ids:
+                row = self._rows.pop(email_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                self._ivf_remove(row, last)
+                if row != last:
+                    # Move the last row into the hole to keep the matrix contiguous
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = self._ids[last]
+                    self._metadata[row] = self._metadata[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                self._metadata.pop()
+            self._dirty = True
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict] = None):
+        return self.query_batch([vector], top_k, include_metadata, filter)[0]
+
+    def query_batch(self, vectors, top_k: int = 5, include_metadata: bool = True,
+                    filter: Optional[Dict] = None) -> List[SimpleNamespace]:
+        """Top-k per row of a query matrix"""
+        queries = self._normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return [SimpleNamespace(matches=[]) for _ in range(len(queries))]
+            allowed = None
+            if filter:
+                allowed = np.fromiter(
+                    (matches_filter(m, filter) for m in self._metadata), dtype=bool, count=n
+                )
+            if self._ivf is None and n >= self.ivf_threshold:
+                self._build_ivf()
+            if self._ivf is not None:
+                return [self._query_ivf(q, top_k, include_metadata, allowed) for q in queries]
+
+            scores = queries @ self._matrix[:n].T
+            if allowed is not None:
+                scores[:, ~allowed] = -np.inf
+            return [self._top_k(row_scores, np.arange(n), top_k, include_metadata) for row_scores in scores]
+
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, top_k: int, include_metadata: bool) -> SimpleNamespace:
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return SimpleNamespace(matches=[])
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        matches = []
+        for i in best:
+            if not np.isfinite(scores[i]):
+                continue
+            row = int(rows[i])
+            matches.append(SimpleNamespace(
+                id=self._ids[row],
+                score=float(scores[i]),
+                metadata=dict(self._metadata[row]) if include_metadata else None,
+            ))
+        return SimpleNamespace(matches=matches)
+
+    # IVF approximate index
+
+    def _build_ivf(self, iterations: int = 10, seed: int = 0):
+        n = len(self._ids)
+        data = self._matrix[:n]
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(n, nlist, replace=False)].copy()
+        sample = data if n <= 50000 else data[rng.choice(n, 50000, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = self._normalize(members.mean(axis=0))
+        assign = np.argmax(data @ centroids.T, axis=1)
+        lists = [np.nonzero(assign == c)[0].tolist() for c in range(nlist)]
+        # assign[row] is the cluster holding row, so updates find its list without a scan
+        self._ivf = {"centroids": centroids, "lists": lists, "assign": assign.tolist()}
+
+    def _nearest_list(self, row: int) -> int:
+        return int(np.argmax(self._ivf["centroids"] @ self._matrix[row]))
+
+    def _ivf_add(self, row: int):
+        if self._ivf is None:
+            return
+        c = self._nearest_list(row)
+        self._ivf["lists"][c].append(row)
+        self._ivf["assign"].append(c)
+
+    def _ivf_move(self, row: int):
+        """Re-file an overwritten row under its new nearest centroid"""
+        if self._ivf is None:
+            return
+        old, new = self._ivf["assign"][row], self._nearest_list(row)
+        if old != new:
+            self._ivf["lists"][old].remove(row)
+            self._ivf["lists"][new].append(row)
+            self._ivf["assign"][row] = new
+
+    def _ivf_remove(self, row: int, last: int):
+        """Drop row from its list; last takes its place, mirroring delete's swap-remove"""
+        if self._ivf is None:
+            return
+        lists, assign = self._ivf["lists"], self._ivf["assign"]
+        lists[assign[row]].remove(row)
+        if row != last:
+            moved = lists[assign[last]]
+            moved[moved.index(last)] = row
+            assign[row] = assign[last]
+        assign.pop()
+
+    def _query_ivf(self, query: np.ndarray, top_k: int, include_metadata: bool,
+                   allowed: Optional[np.ndarray]) -> SimpleNamespace:
+        centroids = self._ivf["centroids"]
+        nprobe = min(self.nprobe, len(centroids))
+        probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.fromiter(
+            (r for c in probe for r in self._ivf["lists"][c]), dtype=np.int64
+        )
+        if allowed is not None:
+            rows = rows[allowed[rows]]
+        if len(rows) == 0:
+            return SimpleNamespace(matches=[])
+        scores = self._matrix[rows] @ query
+        return self._top_k(scores, rows, top_k, include_metadata)
+
+    # Persistence: float32 rows in a memory-mapped file + JSON ids/metadata
+
+    def _load(self):
+        data_path, meta_path = f"{self.path}.f32", f"{self.path}.meta.json"
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("dimension") != self.dimension:
+            print(f"Ignoring local vector index at {self.path}: dimension mismatch")
+            return
+        count = len(meta["ids"])
+        if count:
+            stored = np.memmap(data_path, dtype=np.float32, mode="r", shape=(count, self.dimension))
+            self._grow(count)
+            self._matrix[:count] = stored
+            del stored
+        self._ids = meta["ids"]
+        self._metadata = meta["metadata"]
+        self._rows = {email_id: i for i, email_id in enumerate(self._ids)}
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            count = len(self._ids)
+            data_path, meta_path = f"{self.path}.f32", f"{self.path}.meta.json"
+            if count:
+                out = np.memmap(data_path, dtype=np.float32, mode="w+", shape=(count, self.dimension))
+                out[:] = self._matrix[:count]
+                out.flush()
+                del out
+            tmp_path = f"{meta_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"dimension": self.dimension, "ids": self._ids, "metadata": self._metadata}, f)
+            os.replace(tmp_path, meta_path)
+            self._dirty = False
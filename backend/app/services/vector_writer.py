@@ -0,0 +1,110 @@
+"""Write-behind buffer that batches vector upserts off the request path."""
+
+import asyncio
+import random
+from typing import Callable, Dict, List, Optional
+
+from backend.app.utils.tracing import span
+
+
+class VectorWriteBuffer:
+    """Collects vectors and flushes them in batches on a size or time trigger.
+
+    Batches are sent concurrently (bounded), retried with exponential backoff,
+    and everything still pending is flushed on close().
+    """
+
+    def __init__(
+        self,
+        upsert_fn: Callable[[List[Dict]], object],
+        batch_size: int = 100,
+        flush_interval_s: float = 1.0,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_base_s: float = 0.5,
+        max_pending: int = 10000,
+    ):
+        self.upsert_fn = upsert_fn
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.max_pending = max_pending
+        self._pending: List[Dict] = []
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.stats = {"queued": 0, "written": 0, "failed": 0, "requests": 0, "retries": 0}
+
+    async def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def add(self, vector: Dict):
+        await self.add_many([vector])
+
+    async def add_many(self, vectors: List[Dict]):
+        self._pending.extend(vectors)
+        self.stats["queued"] += len(vectors)
+        if len(self._pending) >= self.max_pending:
+            # Backpressure: the caller waits for the backlog to drain
+            await self.flush()
+        elif len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing vector buffer: {e}")
+
+    async def flush(self):
+        """Send everything pending as concurrent batch upserts"""
+        if not self._pending:
+            return
+        vectors, self._pending = self._pending, []
+        batches = [vectors[i:i + self.batch_size] for i in range(0, len(vectors), self.batch_size)]
+        await asyncio.gather(*(self._send(batch) for batch in batches))
+
+    async def _send(self, batch: List[Dict]):
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.stats["requests"] += 1
+                    with span("upsert"):
+                        await asyncio.to_thread(self.upsert_fn, batch)
+                    self.stats["written"] += len(batch)
+                    return
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        self.stats["failed"] += len(batch)
+                        print(f"Error upserting {len(batch)} vectors after {attempt + 1} attempts: {e}")
+                        return
+                    self.stats["retries"] += 1
+                    delay = self.backoff_base_s * (2 ** attempt)
+                    await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def close(self):
+        """Stop the flusher and drain every pending vector"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            try:
+                await self._task
+            except Exception:
+                pass
+            self._task = None
+        while self._pending:
+            await self.flush()
@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+from backend.app.config import settings
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_inference_executor: Optional[ThreadPoolExecutor] = None
+_parse_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    """Thread pool for local model forward passes (torch releases the GIL)"""
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = ThreadPoolExecutor(
+            max_workers=settings.inference_threads,
+            thread_name_prefix="inference",
+        )
+    return _inference_executor
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Process pool for CPU-bound MIME parsing; None when disabled or on a single CPU"""
+    global _parse_executor
+    if _parse_executor is None:
+        workers = settings.parse_processes or _usable_cpus()
+        if workers < 2:
+            # One worker only adds IPC on top of in-thread parsing
+            return None
+        # spawn: forking a process that runs model threads is not safe
+        _parse_executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _parse_executor
+
+
+def _usable_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+async def run_in_inference_pool(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking model call off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), lambda: fn(*args, **kwargs))
+
+
+async def with_timeout(aw: Awaitable[T], timeout: float, default: T, stage: str = "stage") -> T:
+    """Await with a deadline; on timeout or error return default so other stages still count"""
+    try:
+        return await asyncio.wait_for(aw, timeout)
+    except asyncio.TimeoutError:
+        print(f"{stage} timed out after {timeout}s")
+    except Exception as e:
+        print(f"{stage} failed: {e}")
+    return default
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesce concurrent single-item calls into one batched call.
+
+    The first waiting item holds the batch open for at most window_ms; a batch
+    that reaches max_items runs immediately. fn gets the items in submit order
+    and returns one result per item; an exception fails every caller in that batch.
+    """
+
+    def __init__(self, fn: Callable[[List[T]], Awaitable[List[R]]], window_ms: float = 5.0, max_items: int = 32):
+        self.fn = fn
+        self.window_s = window_ms / 1000
+        self.max_items = max(1, max_items)
+        self.stats: Dict[str, int] = {"batches": 0, "items": 0}
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [(item, future) for item, future in self._pending if not future.cancelled()]
+        self._pending = []
+        if batch:
+            # Batches run concurrently; the inference pool bounds the actual parallelism.
+            # A fresh context keeps the batch's spans out of whichever request flushed it.
+            task = contextvars.Context().run(asyncio.ensure_future, self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]):
+        self.stats["batches"] += 1
+        self.stats["items"] += len(batch)
+        try:
+            results = await self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def shutdown_inference_executor():
+    global _inference_executor
+    if _inference_executor is not None:
+        _inference_executor.shutdown(wait=False)
+        _inference_executor = None
+
+
+def shutdown_parse_executor():
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
@@ -1,7 +1,64 @@
-import time
-from typing import Dict, List
+import os
+from contextlib import contextmanager
+from typing import Dict, Tuple
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Pipeline stages with their own latency histogram
+STAGES = ("parse", "embed", "sentiment", "zero_shot", "vector_search", "upsert", "db_write")
+
+# Model/API calls span ~1ms (cache hit) to tens of seconds (cold HF endpoint)
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5,
+    0.75, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Prometheus metrics are process globals; with PROMETHEUS_MULTIPROC_DIR set
+# (before this import) prometheus_client writes them to per-worker files.
+STAGE_LATENCY = Histogram(
+    "email_prioritizer_stage_latency_seconds",
+    "Latency of one pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+EMAIL_LATENCY = Histogram(
+    "email_prioritizer_email_latency_seconds",
+    "End-to-end processing latency per email",
+    buckets=LATENCY_BUCKETS,
+)
+EMAILS_PROCESSED = Counter(
+    "email_prioritizer_emails_processed_total",
+    "Emails processed",
+    ["status"],
+)
+PRIORITY_LEVELS = Counter(
+    "email_prioritizer_priority_level_total",
+    "Analyzed emails per priority level",
+    ["priority_level"],
+)
+INTENTS = Counter(
+    "email_prioritizer_intent_total",
+    "Analyzed emails per intent",
+    ["intent"],
+)
+RESPONSES_GENERATED = Counter(
+    "email_prioritizer_responses_generated_total",
+    "Generated email responses",
+)
+IN_FLIGHT = Gauge(
+    "email_prioritizer_emails_in_flight",
+    "Emails currently being processed",
+    multiprocess_mode="livesum",
+)
 
 
 class MetricsCollector:
@@ -27,6 +84,9 @@ class MetricsCollector:
     
     def record_email_processing(self, latency_ms: float, success: bool = True):
         """Record email processing metrics"""
+        EMAILS_PROCESSED.labels(status="success" if success else "error").inc()
+        if success:
+            EMAIL_LATENCY.observe(latency_ms / 1000)
         self.metrics["total_emails_processed"] += 1
         if success:
             self.metrics["total_processing_time_ms"] += latency_ms
@@ -47,8 +107,26 @@ class MetricsCollector:
         else:
             self.metrics["errors"] += 1
     
+    def record_analysis(self, priority_level, intent: str):
+        """Count an analysis result by priority level and intent"""
+        level = getattr(priority_level, "value", priority_level)
+        PRIORITY_LEVELS.labels(priority_level=str(level)).inc()
+        INTENTS.labels(intent=str(intent)).inc()
+
+    def observe_stage(self, stage: str, seconds: float):
+        STAGE_LATENCY.labels(stage=stage).observe(seconds)
+
+    @contextmanager
+    def in_flight(self, count: int = 1):
+        IN_FLIGHT.inc(count)
+        try:
+            yield
+        finally:
+            IN_FLIGHT.dec(count)
+
     def record_response_generation(self):
         """Record response generation"""
+        RESPONSES_GENERATED.inc()
         self.metrics["response_generation_count"] += 1
     
     def record_priority_feedback(self, correct: bool):
@@ -77,6 +155,25 @@ class MetricsCollector:
             )
         }
     
+    def prometheus_exposition(self) -> Tuple[bytes, str]:
+        """Prometheus text format; aggregated across workers in multiprocess mode"""
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry), CONTENT_TYPE_LATEST
+        return generate_latest(), CONTENT_TYPE_LATEST
+
+    def mark_process_dead(self):
+        """Drop this worker's live gauges from the multiprocess directory"""
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(os.getpid())
+
     def reset(self):
-        """Reset metrics"""
+        """Reset metrics (Prometheus series are cumulative and not reset)"""
         self.__init__()
+
+
+# One collector per process; import this instead of instantiating
+metrics = MetricsCollector()
@@ -0,0 +1,192 @@
+"""Lightweight per-request tracing: spans, timing breakdowns and OTLP-JSON export."""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from backend.app.config import settings
+from backend.app.utils.metrics import STAGES, metrics
+
+DEBUG_TIMINGS_HEADER = "X-Debug-Timings"
+SERVICE_NAME = "email-prioritizer"
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = self.start_ns
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans of one request; shared by every task and thread spawned under it"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, None, {})
+        self.spans: List[Span] = []
+
+    def timings(self) -> Dict[str, float]:
+        """Milliseconds per span name (repeated spans, e.g. one parse per email, are summed)"""
+        out: Dict[str, float] = {}
+        for s in self.spans:
+            out[s.name] = out.get(s.name, 0.0) + s.duration_ms
+        out = {k: round(v, 3) for k, v in out.items()}
+        out["total"] = round(self.root.duration_ms, 3)
+        return out
+
+    def to_otlp(self) -> Dict:
+        """One trace as an OTLP/JSON ExportTraceServiceRequest"""
+        def encode(span: Span) -> Dict:
+            item = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()
+                ],
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            return item
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "backend.app.utils.tracing"},
+                    "spans": [encode(self.root)] + [encode(s) for s in self.spans],
+                }],
+            }]
+        }
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Trace]:
+    """Open a trace for the current request; spans opened inside attach to it"""
+    trace = Trace(name)
+    trace.root.attributes.update(attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        trace.root.end_ns = time.time_ns()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if settings.trace_export_path:
+            export_trace(trace, settings.trace_export_path)
+
+
+class span:
+    """Time a block or function as a child of the current span.
+
+        with span("embed"):
+            ...
+
+        @span("sender_importance")
+        async def _calculate_sender_importance(...): ...
+
+    Spans named after a pipeline stage also feed the Prometheus stage histogram,
+    so they are recorded even when no trace is active.
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._span: Optional[Span] = None
+        self._token = None
+        self._start = 0.0
+
+    def __enter__(self) -> "span":
+        self._start = time.perf_counter()
+        trace = _current_trace.get()
+        if trace is not None:
+            parent = _current_span.get()
+            self._span = Span(self.name, parent.span_id if parent else None, dict(self.attributes))
+            self._token = _current_span.set(self._span)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        if self.name in STAGES:
+            metrics.observe_stage(self.name, elapsed)
+        if self._span is not None:
+            self._span.end_ns = self._span.start_ns + int(elapsed * 1e9)
+            if exc_type is not None:
+                self._span.attributes["error"] = exc_type.__name__
+            _current_span.reset(self._token)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.spans.append(self._span)
+        return False
+
+    def set_attribute(self, key: str, value):
+        if self._span is not None:
+            self._span.attributes[key] = value
+
+    def __call__(self, fn):
+        name, attributes = self.name, self.attributes
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def wants_timings(headers) -> bool:
+    value = headers.get(DEBUG_TIMINGS_HEADER, "")
+    return value.lower() in ("1", "true", "yes")
+
+
+def export_trace(trace: Trace, path: str):
+    """Append the trace as one OTLP/JSON line (same layout as the collector's file exporter)"""
+    try:
+        line = json.dumps(trace.to_otlp(), separators=(",", ":"))
+        with _export_lock:
+            with open(path, "a") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"Error exporting trace: {e}")
@@ -0,0 +1,107 @@
+"""Deterministic synthetic emails for benchmarks."""
+
+import random
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime
+from typing import Dict, List
+
+SUBJECTS = [
+    "Urgent: contract needs signature today",
+    "Quarterly report draft",
+    "Meeting tomorrow at 10?",
+    "Weekly newsletter - product updates",
+    "Limited time offer: 50% discount",
+    "Re: question about the invoice",
+    "Deadline in 3 days for the proposal",
+    "Lunch next week",
+]
+SENDERS = [
+    "boss@company.com",
+    "alice@gmail.com",
+    "no-reply@service.io",
+    "team@work.com",
+    "deals@shop.example",
+]
+SENTENCES = [
+    "Please review the attached document and send your comments as soon as possible.",
+    "I know you are busy, so no rush on this one.",
+    "Can we schedule a call to go over the numbers?",
+    "This is very important for the client presentation.",
+    "Click here to claim your prize before the offer ends.",
+    "Let me know if you have any question about the plan.",
+    "The deadline is in 2 days and we still need approval.",
+    "Thanks again for your help last week.",
+    "Unsubscribe at any time from this newsletter.",
+    "We need the final numbers now, the board meets today.",
+]
+
+
+def make_emails(n: int, seed: int = 7, sentences: int = 6) -> List[Dict]:
+    """Return n EmailCreate-shaped dicts"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 9, 0, 0)
+    emails = []
+    for i in range(n):
+        emails.append({
+            "subject": rng.choice(SUBJECTS),
+            "body": " ".join(rng.choice(SENTENCES) for _ in range(sentences)),
+            "sender": rng.choice(SENDERS),
+            "recipient": "user@example.com",
+            "received_at": (start + timedelta(minutes=37 * i)).isoformat(),
+        })
+    return emails
+
+
+def newsletter_html(paragraphs: int = 200, seed: int = 7) -> str:
+    """A large marketing-style HTML body with styles, scripts and nested tables"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(paragraphs):
+        rows.append(
+            f'<tr><td class="col" style="padding:8px;font-family:Arial">'
+            f'<a href="https://example.com/item/{i}"><img src="https://example.com/{i}.png" alt="item"/></a>'
+            f'<p>{rng.choice(SENTENCES)} <b>{rng.choice(SUBJECTS)}</b></p></td></tr>'
+        )
+    return (
+        "<html><head><style>.col{color:#333} td{padding:0}</style>"
+        "<script>var tracking = {id: 42};</script></head><body>"
+        f"<table width=\"600\">{''.join(rows)}</table>"
+        "<p>Unsubscribe | Manage preferences</p></body></html>"
+    )
+
+
+def make_rfc822(
+    n: int,
+    seed: int = 7,
+    html_every: int = 3,
+    newsletter_every: int = 0,
+    html_only: bool = False,
+) -> List[bytes]:
+    """Raw RFC822 messages: plain, multipart/alternative, and optional large newsletters.
+
+    html_only drops the text/plain alternative from newsletters so parsing has to strip the HTML.
+    """
+    rng = random.Random(seed)
+    messages = []
+    for i, data in enumerate(make_emails(n, seed=seed)):
+        msg = EmailMessage()
+        msg["Subject"] = data["subject"]
+        msg["From"] = f"Sender {i} <{data['sender']}>"
+        msg["To"] = "User <user@example.com>"
+        msg["Date"] = format_datetime(datetime.fromisoformat(data["received_at"]))
+        msg["Message-ID"] = f"<bench-{seed}-{i}@example.com>"
+        if newsletter_every and i % newsletter_every == 0:
+            page = newsletter_html(rng.randint(100, 400), seed=seed + i)
+            if html_only:
+                msg.set_content(page, subtype="html")
+            else:
+                msg.set_content("View this email in your browser.")
+                msg.add_alternative(page, subtype="html")
+        elif html_every and i % html_every == 0:
+            msg.set_content(data["body"])
+            msg.add_alternative(f"<html><body><p>{data['body']}</p></body></html>", subtype="html")
+        else:
+            msg.set_content(data["body"])
+        messages.append(msg.as_bytes())
+    return messages
@@ -0,0 +1,72 @@
+"""Timing, percentile summaries and baseline comparison."""
+
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms: List[float], items_per_call: int = 1) -> Dict:
+    values = sorted(latencies_ms)
+    total_s = sum(values) / 1000
+    return {
+        "calls": len(values),
+        "items_per_call": items_per_call,
+        "p50_ms": round(percentile(values, 50), 4),
+        "p95_ms": round(percentile(values, 95), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "mean_ms": round(sum(values) / len(values), 4) if values else 0.0,
+        "emails_per_sec": round(len(values) * items_per_call / total_s, 2) if total_s else 0.0,
+    }
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 3, items_per_call: int = 1) -> Dict:
+    """Call fn repeatedly and summarize per-call wall-clock latency"""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies, items_per_call)
+
+
+def save_results(results: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float, metric: str = "p95_ms") -> List[Dict]:
+    """Rows for every benchmark present in both runs; regressed when metric grew past tolerance"""
+    rows = []
+    for name, stats in current.get("benchmarks", {}).items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or not base.get(metric):
+            continue
+        ratio = stats[metric] / base[metric]
+        rows.append({
+            "name": name,
+            "baseline": base[metric],
+            "current": stats[metric],
+            "ratio": round(ratio, 3),
+            "regressed": ratio > 1 + tolerance,
+        })
+    return rows
@@ -0,0 +1,234 @@
+"""Run the priority pipeline benchmarks.
+
+    python -m benchmarks.run                      # run, save results, compare to baseline
+    python -m benchmarks.run --update-baseline    # record the current run as the baseline
+    python -m benchmarks.run --only urgency_score parse_email
+
+Exits non-zero when a benchmark's p95 regresses past --tolerance.
+"""
+
+import argparse
+import asyncio
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import corpus, harness
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def bench_urgency_score(args):
+    from backend.app.services.priority_service import PriorityService
+    from benchmarks.stubs import StubEmbeddingService, StubPineconeService, StubLLMService
+
+    service = PriorityService(StubEmbeddingService(), StubPineconeService(), StubLLMService())
+    emails = corpus.make_emails(args.corpus_size)
+    state = {"i": 0}
+
+    def run():
+        e = emails[state["i"] % len(emails)]
+        state["i"] += 1
+        service._calculate_urgency_score(e["subject"], e["body"])
+
+    return harness.measure(run, args.iterations)
+
+
+def bench_classify_intent(args):
+    from benchmarks.stubs import StubLLMService
+
+    llm = StubLLMService()
+    emails = corpus.make_emails(args.corpus_size)
+    state = {"i": 0}
+
+    def run():
+        e = emails[state["i"] % len(emails)]
+        state["i"] += 1
+        llm.classify_intent(e["body"], e["subject"])
+
+    return harness.measure(run, args.iterations)
+
+
+def _bench_parse(args, messages):
+    from backend.app.services.email_service import EmailService
+
+    state = {"i": 0}
+
+    def run():
+        raw = messages[state["i"] % len(messages)]
+        state["i"] += 1
+        EmailService.parse_email(raw)
+
+    return harness.measure(run, args.iterations)
+
+
+def bench_parse_email(args):
+    return _bench_parse(args, corpus.make_rfc822(args.corpus_size))
+
+
+def bench_parse_newsletter(args):
+    return _bench_parse(args, corpus.make_rfc822(max(4, args.corpus_size // 10), html_every=0, newsletter_every=1))
+
+
+def bench_parse_newsletter_html(args):
+    return _bench_parse(args, corpus.make_rfc822(
+        max(4, args.corpus_size // 10), html_every=0, newsletter_every=1, html_only=True
+    ))
+
+
+def _client(args):
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+    from backend.app.services.registry import registry
+    from benchmarks.stubs import install_stub_services
+
+    install_stub_services(registry, latency_ms=args.backend_latency_ms)
+    return TestClient(app)
+
+
+def bench_analyze_route(args):
+    emails = corpus.make_emails(args.corpus_size)
+    state = {"i": 0}
+    with _client(args) as client:
+        def run():
+            e = emails[state["i"] % len(emails)]
+            state["i"] += 1
+            r = client.post("/api/v1/emails/analyze", json=e)
+            r.raise_for_status()
+
+        return harness.measure(run, args.iterations)
+
+
+def bench_batch_analyze_route(args):
+    emails = corpus.make_emails(args.batch_size)
+    with _client(args) as client:
+        def run():
+            r = client.post("/api/v1/emails/batch-analyze", json=emails)
+            r.raise_for_status()
+
+        iterations = max(3, args.iterations // args.batch_size)
+        return harness.measure(run, iterations, warmup=1, items_per_call=len(emails))
+
+
+def bench_repoll_cached(args):
+    """batch-analyze of an already-scored batch: every email is an analysis cache hit"""
+    from backend.app.services.analysis_cache import AnalysisCache
+    from backend.app.services.registry import registry
+
+    emails = corpus.make_emails(args.batch_size)
+    with _client(args) as client:
+        registry.batch.cache = AnalysisCache()
+        client.post("/api/v1/emails/batch-analyze", json=emails).raise_for_status()
+        calls = registry.embedding.calls
+
+        def run():
+            r = client.post("/api/v1/emails/batch-analyze", json=emails)
+            r.raise_for_status()
+
+        iterations = max(3, args.iterations // args.batch_size)
+        stats = harness.measure(run, iterations, warmup=1, items_per_call=len(emails))
+        assert registry.embedding.calls == calls, "cached re-poll reached the embedding model"
+        return stats
+
+
+def bench_embed_concurrent(args):
+    """32 concurrent single-text embeds; the model runs one 5ms forward pass at a time"""
+    from benchmarks.stubs import StubEmbeddingService
+
+    service = StubEmbeddingService(latency_ms=max(args.backend_latency_ms, 5.0), serial=True)
+    service.cache = None
+    service.enable_micro_batching()
+    texts = [e["body"] for e in corpus.make_emails(32)]
+
+    async def burst():
+        await asyncio.gather(*(service.generate_embedding(t) for t in texts))
+
+    # One loop for every burst: the stub's forward-pass lock belongs to it
+    loop = asyncio.new_event_loop()
+    try:
+        iterations = max(3, args.iterations // len(texts))
+        return harness.measure(lambda: loop.run_until_complete(burst()), iterations, items_per_call=len(texts))
+    finally:
+        loop.close()
+
+
+BENCHMARKS = {
+    "urgency_score": bench_urgency_score,
+    "classify_intent": bench_classify_intent,
+    "parse_email": bench_parse_email,
+    "parse_newsletter": bench_parse_newsletter,
+    "parse_newsletter_html": bench_parse_newsletter_html,
+    "analyze_route": bench_analyze_route,
+    "batch_analyze_route": bench_batch_analyze_route,
+    "repoll_cached": bench_repoll_cached,
+    "embed_concurrent": bench_embed_concurrent,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Email prioritizer benchmarks")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="subset of benchmarks to run")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--corpus-size", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--backend-latency-ms", type=float, default=0.0,
+                        help="simulated latency of each stubbed model call")
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    selected = args.only or list(BENCHMARKS)
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {
+            "iterations": args.iterations,
+            "corpus_size": args.corpus_size,
+            "batch_size": args.batch_size,
+            "backend_latency_ms": args.backend_latency_ms,
+        },
+        "benchmarks": {},
+    }
+    for name in selected:
+        start = time.perf_counter()
+        stats = BENCHMARKS[name](args)
+        results["benchmarks"][name] = stats
+        print(
+            f"{name:<22} p50 {stats['p50_ms']:>9.3f}ms  p95 {stats['p95_ms']:>9.3f}ms  "
+            f"p99 {stats['p99_ms']:>9.3f}ms  {stats['emails_per_sec']:>10.1f} emails/s  "
+            f"({time.perf_counter() - start:.1f}s)"
+        )
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    harness.save_results(results, output)
+    print(f"Results saved to {output}")
+
+    if args.update_baseline:
+        harness.save_results(results, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    baseline = harness.load_results(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; record one with --update-baseline")
+        return 0
+
+    rows = harness.compare(results, baseline, args.tolerance)
+    regressed = [r for r in rows if r["regressed"]]
+    for r in rows:
+        flag = "REGRESSED" if r["regressed"] else "ok"
+        print(f"{r['name']:<22} p95 {r['baseline']:.3f}ms -> {r['current']:.3f}ms (x{r['ratio']}) {flag}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
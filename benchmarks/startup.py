@@ -0,0 +1,86 @@
+"""Measure API cold-start import time with `python -X importtime`.
+
+    python -m benchmarks.startup                    # median of 5 fresh interpreters
+    python -m benchmarks.startup --budget-ms 800 --top 20
+
+Exits non-zero when importing backend.app.main takes longer than --budget-ms
+or pulls in a dependency that should only load on first use.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET = "backend.app.main"
+BUDGET_MS = 1500.0  # median cold import; tests/test_startup.py enforces it
+
+# Heavy or optional dependencies that must stay out of the import path
+DEFERRED = (
+    "torch", "transformers", "sentence_transformers", "onnxruntime", "tokenizers",
+    "pinecone", "supabase", "asyncpg", "redis", "imapclient", "numpy", "httpx",
+)
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_profile() -> Tuple[Dict[str, Tuple[int, int]], float]:
+    """({module: (self_us, cumulative_us)}, total ms) for one fresh interpreter"""
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {TARGET} failed:\n{proc.stderr[-2000:]}")
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    if TARGET not in modules:
+        raise RuntimeError(f"{TARGET} missing from -X importtime output")
+    return modules, modules[TARGET][1] / 1000
+
+
+def eager_imports(modules: Dict[str, Tuple[int, int]]) -> List[str]:
+    """DEFERRED packages that importing TARGET pulled in"""
+    return sorted({name.split(".")[0] for name in modules} & set(DEFERRED))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="max median import time")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    totals: List[float] = []
+    modules: Dict[str, Tuple[int, int]] = {}
+    for _ in range(args.runs):
+        modules, total_ms = import_profile()
+        totals.append(total_ms)
+    median_ms = statistics.median(totals)
+
+    print(f"import {TARGET}: median {median_ms:.0f}ms over {args.runs} runs (budget {args.budget_ms:.0f}ms)")
+    print("slowest modules by self time (last run):")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda kv: -kv[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f}ms self {cumulative_us / 1000:8.1f}ms cumulative  {name}")
+
+    failed = False
+    eager = eager_imports(modules)
+    if eager:
+        print(f"FAIL: imported at startup, should load on first use: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: startup import over budget by {median_ms - args.budget_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
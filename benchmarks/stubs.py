@@ -0,0 +1,123 @@
+"""In-process stand-ins for the embedding model, Pinecone and Hugging Face backends."""
+
+import asyncio
+import hashlib
+import random
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from backend.app.services.embedding_service import EmbeddingService, EMBEDDING_DIM
+from backend.app.services.pinecone_service import PineconeService
+from backend.app.services.llm_service import LLMService
+from backend.app.services.priority_service import PriorityService
+from backend.app.services.batch_service import BatchAnalyzer
+from backend.app.services.registry import ServiceRegistry
+
+
+def fake_vector(text: str) -> List[float]:
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+    rng = random.Random(seed)
+    return [rng.uniform(-1.0, 1.0) for _ in range(EMBEDDING_DIM)]
+
+
+class StubEmbeddingService(EmbeddingService):
+    def __init__(self, latency_ms: float = 0.0, serial: bool = False):
+        super().__init__()
+        self.use_api = False
+        self.latency_ms = latency_ms
+        self.calls = 0
+        # serial: one forward pass at a time, like a model saturating the CPU
+        self._forward = asyncio.Lock() if serial else None
+        self.open_cache()  # no model to load, so initialize() never runs
+
+    async def initialize(self):
+        return
+
+    async def _forward_pass(self):
+        self.calls += 1
+        if not self.latency_ms:
+            return
+        if self._forward is None:
+            await asyncio.sleep(self.latency_ms / 1000)
+            return
+        async with self._forward:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+    async def _encode(self, text: str) -> List[float]:
+        await self._forward_pass()
+        return fake_vector(text)
+
+    async def _encode_batch(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        await self._forward_pass()
+        return [fake_vector(t) for t in texts]
+
+
+class StubIndex:
+    """Keeps vectors in memory and answers queries with the most recent matches"""
+
+    def __init__(self):
+        self.vectors: Dict[str, Dict] = {}
+        self.upsert_calls = 0
+        self.query_calls = 0
+
+    def upsert(self, vectors: List[Dict]):
+        self.upsert_calls += 1
+        for v in vectors:
+            self.vectors[v["id"]] = v
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True, filter: Optional[Dict] = None):
+        self.query_calls += 1
+        recent = list(self.vectors.values())[-top_k:]
+        return SimpleNamespace(matches=[
+            SimpleNamespace(id=v["id"], score=0.9, metadata=v.get("metadata", {}))
+            for v in recent
+        ])
+
+    def delete(self, ids: List[str]):
+        for i in ids:
+            self.vectors.pop(i, None)
+
+
+class StubPineconeService(PineconeService):
+    def __init__(self):
+        super().__init__()
+        self.index = StubIndex()
+
+    async def initialize(self):
+        return
+
+
+class StubLLMService(LLMService):
+    """Local-mode LLMService whose sentiment pipeline is a cheap callable"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__()
+        self.use_api = False
+        self.latency_ms = latency_ms
+        self.sentiment_analyzer = self._fake_pipeline
+
+    def _fake_pipeline(self, inputs, **kwargs):
+        if self.latency_ms:
+            import time
+            time.sleep(self.latency_ms / 1000)
+        items = inputs if isinstance(inputs, list) else [inputs]
+        return [{"label": "neutral", "score": 0.6} for _ in items]
+
+    async def initialize(self):
+        return
+
+    async def classify_priority_llm(self, subject: str, body: str) -> Optional[Dict]:
+        # Exercise the (heavier) rule-based path
+        return None
+
+
+def install_stub_services(registry: ServiceRegistry, latency_ms: float = 0.0) -> ServiceRegistry:
+    """Fill a registry with stubs so the FastAPI lifespan skips real initialization"""
+    registry.embedding = StubEmbeddingService(latency_ms)
+    registry.pinecone = StubPineconeService()
+    registry.llm = StubLLMService(latency_ms)
+    registry.priority = PriorityService(registry.embedding, registry.pinecone, registry.llm)
+    registry.batch = BatchAnalyzer(registry.embedding, registry.pinecone, registry.llm, registry.priority)
+    registry.initialized = True
+    registry.warmed_up = True
+    return registry
@@ -37,6 +37,11 @@ CREATE INDEX IF NOT EXISTS idx_emails_received_at ON emails(received_at DESC);
 CREATE INDEX IF NOT EXISTS idx_emails_priority_level ON emails(priority_level);
 CREATE INDEX IF NOT EXISTS idx_emails_sender ON emails(sender);
 
+-- inbox listing: equality on user_id, then the keyset sort order (see get_user_emails)
+CREATE INDEX IF NOT EXISTS idx_emails_user_inbox
+    ON emails(user_id, priority_score DESC, received_at DESC, id DESC)
+    INCLUDE (priority_level, intent, sentiment, is_read, is_archived);
+
 -- function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
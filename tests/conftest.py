@@ -0,0 +1,22 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.stubs import install_stub_services
+from backend.app.services.registry import registry
+
+
+@pytest.fixture
+def services():
+    """The app registry filled with in-process stubs; caches off so every call does real work"""
+    install_stub_services(registry)
+    registry.embedding.cache = None
+    registry.batch.cache = None
+    yield registry
+
+
+@pytest.fixture
+def client(services):
+    from backend.app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,296 @@
+"""In-memory stand-ins for an asyncpg pool and the Supabase REST client, covering the emails queries SupabaseClient issues.
+
+PostgresStandIn interprets only the SQL shapes the data layer generates
+(unnest bulk insert with ON CONFLICT, SELECT by id, UPDATE ... RETURNING *,
+the keyset inbox SELECT, INSERT INTO users) and RestStandIn only the
+PostgREST calls it makes. Both apply the emails
+table's defaults and NOT NULL constraints, so the tests check the queries'
+semantics rather than their exact text. Anything else raises, so a new
+query shape fails loudly instead of passing vacuously.
+"""
+
+import re
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+_DEFAULTS = {
+    "user_id": None,
+    "html_body": None,
+    "priority_score": 0.0,
+    "priority_level": "normal",
+    "intent": None,
+    "sentiment": None,
+    "is_read": False,
+    "is_archived": False,
+}
+_NOT_NULL = ("id", "subject", "sender", "recipient", "body", "received_at")
+_USER_DEFAULTS = {"name": None, "preferences": {}}
+
+_INSERT_RE = re.compile(
+    r"^INSERT INTO emails \((?P<columns>[^)]*)\) SELECT \* FROM unnest\((?P<params>[^)]*)\) "
+    r"ON CONFLICT \(id\) DO UPDATE SET (?P<updates>.+)$"
+)
+_SELECT_BY_ID_RE = re.compile(r"^SELECT \* FROM emails WHERE id = \$1::uuid$")
+_UPDATE_RE = re.compile(r"^UPDATE emails SET (?P<assignments>.+) WHERE id = \$1::uuid RETURNING \*$")
+_INBOX_RE = re.compile(
+    r"^SELECT (?P<columns>.+?) FROM emails WHERE user_id = \$(?P<user_id>\d+)::uuid"
+    r"(?: AND priority_level = \$(?P<priority_level>\d+))?"
+    r"(?: AND \(priority_score, received_at, id\) < \(\$(?P<score>\d+), \$(?P<received_at>\d+), \$(?P<id>\d+)::uuid\))?"
+    r" ORDER BY priority_score DESC, received_at DESC, id DESC LIMIT \$(?P<limit>\d+)(?: OFFSET \$(?P<offset>\d+))?$"
+)
+_INSERT_USER_RE = re.compile(r"^INSERT INTO users \((?P<columns>[^)]*)\) VALUES \((?P<params>[^)]*)\) RETURNING \*$")
+
+
+def _inbox_key(row: Dict):
+    """Sort key of the inbox order; REST rows carry received_at as an ISO string"""
+    received_at = row["received_at"]
+    if isinstance(received_at, str):
+        received_at = datetime.fromisoformat(received_at)
+    return row["priority_score"], received_at, str(row["id"])
+
+
+def _project(row: Dict, columns: str) -> Dict:
+    if columns.strip() == "*":
+        return dict(row)
+    return {column.strip(): row[column.strip()] for column in columns.split(",")}
+
+
+class NotNullViolation(Exception):
+    pass
+
+
+class PostgresStandIn:
+    def __init__(self):
+        self.emails: Dict[str, Dict] = {}
+        self.users: Dict[str, Dict] = {}
+        self.statements: List[str] = []
+
+    async def execute(self, sql: str, *args):
+        self.statements.append(sql)
+        match = _INSERT_RE.match(sql)
+        if match is None:
+            raise NotImplementedError(sql)
+        columns = [c.strip() for c in match.group("columns").split(",")]
+        params = [p.strip() for p in match.group("params").split(",")]
+        assert len(params) == len(columns) == len(args), "one array parameter per column"
+        assert all(p.endswith("[]") for p in params), "unnest takes array parameters"
+        assert len({len(a) for a in args}) == 1, "unnest arrays must have equal length"
+        updates = {}
+        for assignment in match.group("updates").split(","):
+            column, value = (part.strip() for part in assignment.split("="))
+            assert value == f"EXCLUDED.{column}"
+            updates[column] = column
+        for values in zip(*args):
+            row = dict(zip(columns, values))
+            existing = self.emails.get(row["id"])
+            if existing is not None:
+                existing.update({column: row[column] for column in updates})
+                continue
+            stored = {**_DEFAULTS, **row}
+            missing = [c for c in _NOT_NULL if stored.get(c) is None]
+            if missing:
+                raise NotNullViolation(f"null value in column {missing[0]!r}")
+            self.emails[row["id"]] = stored
+        return f"INSERT 0 {len(args[0]) if args else 0}"
+
+    async def fetchrow(self, sql: str, *args) -> Optional[Dict]:
+        self.statements.append(sql)
+        if _SELECT_BY_ID_RE.match(sql):
+            row = self.emails.get(args[0])
+            return dict(row) if row else None
+        match = _UPDATE_RE.match(sql)
+        if match is not None:
+            row = self.emails.get(args[0])
+            if row is None:
+                return None
+            for assignment in match.group("assignments").split(","):
+                column, placeholder = (part.strip() for part in assignment.split("="))
+                row[column] = args[int(placeholder.lstrip("$")) - 1]
+            return dict(row)
+        match = _INSERT_USER_RE.match(sql)
+        if match is not None:
+            columns = [c.strip() for c in match.group("columns").split(",")]
+            user = {"id": str(uuid.uuid4()), **_USER_DEFAULTS, **dict(zip(columns, args))}
+            self.users[user["id"]] = user
+            return dict(user)
+        raise NotImplementedError(sql)
+
+    async def fetch(self, sql: str, *args) -> List[Dict]:
+        self.statements.append(sql)
+        match = _INBOX_RE.match(sql)
+        if match is None:
+            raise NotImplementedError(sql)
+
+        def arg(name: str):
+            return args[int(match.group(name)) - 1]
+
+        rows = [r for r in self.emails.values() if r["user_id"] == arg("user_id")]
+        if match.group("priority_level"):
+            rows = [r for r in rows if r["priority_level"] == arg("priority_level")]
+        if match.group("score"):
+            after = (arg("score"), arg("received_at"), arg("id"))
+            rows = [r for r in rows if _inbox_key(r) < after]
+        rows.sort(key=_inbox_key, reverse=True)
+        offset = arg("offset") if match.group("offset") else 0
+        return [_project(r, match.group("columns")) for r in rows[offset:offset + arg("limit")]]
+
+    async def close(self):
+        pass
+
+
+class RestStandIn:
+    """Just enough of supabase.Client for the emails and users tables"""
+
+    def __init__(self):
+        self.emails: Dict[str, Dict] = {}
+        self.users: Dict[str, Dict] = {}
+        self.requests: List[str] = []
+
+    def table(self, name: str) -> "_RestQuery":
+        assert name in ("emails", "users"), name
+        return _RestQuery(self, name)
+
+
+def _split_terms(expr: str) -> List[str]:
+    """Top-level comma split of a PostgREST logic filter, respecting () and quotes"""
+    terms, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(expr):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in "()":
+            depth += 1 if ch == "(" else -1
+        elif not quoted and depth == 0 and ch == ",":
+            terms.append(expr[start:i])
+            start = i + 1
+    terms.append(expr[start:])
+    return terms
+
+
+def _coerce(column: str, value: str):
+    value = value.strip('"')
+    if column == "priority_score":
+        return float(value)
+    if column == "received_at":
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _term_matches(row: Dict, term: str) -> bool:
+    if term.startswith("and(") and term.endswith(")"):
+        return all(_term_matches(row, t) for t in _split_terms(term[4:-1]))
+    column, op, value = term.split(".", 2)
+    stored = _inbox_key(row)[("priority_score", "received_at", "id").index(column)]
+    wanted = _coerce(column, value)
+    if op == "eq":
+        return stored == wanted
+    if op == "lt":
+        return stored < wanted
+    raise NotImplementedError(term)
+
+
+class _RestQuery:
+    def __init__(self, db: RestStandIn, table: str):
+        self.db = db
+        self.table = table
+        self.action = None
+        self.payload = None
+        self.columns = "*"
+        self.filters: List = []
+        self.any_of: List[str] = []
+        self.orders: List = []
+        self.row_limit = None
+        self.row_offset = 0
+        self.on_conflict = ""
+        self.ignore_duplicates = False
+
+    def _set(self, action: str, payload=None) -> "_RestQuery":
+        assert self.action is None, "one action per request"
+        self.action, self.payload = action, payload
+        return self
+
+    def select(self, columns: str = "*") -> "_RestQuery":
+        self.columns = columns
+        return self._set("select")
+
+    def insert(self, json) -> "_RestQuery":
+        return self._set("insert", json)
+
+    def upsert(self, json, *, on_conflict: str = "", ignore_duplicates: bool = False) -> "_RestQuery":
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self._set("upsert", json)
+
+    def update(self, json: Dict) -> "_RestQuery":
+        return self._set("update", json)
+
+    def eq(self, column: str, value) -> "_RestQuery":
+        self.filters.append((column, str(value)))
+        return self
+
+    def or_(self, filters: str) -> "_RestQuery":
+        self.any_of.append(filters)
+        return self
+
+    def order(self, column: str, *, desc: bool = False) -> "_RestQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> "_RestQuery":
+        self.row_limit = size
+        return self
+
+    def offset(self, size: int) -> "_RestQuery":
+        self.row_offset = size
+        return self
+
+    def _matches(self, row: Dict) -> bool:
+        return all(str(row.get(column)) == value for column, value in self.filters) and all(
+            any(_term_matches(row, term) for term in _split_terms(expr)) for expr in self.any_of
+        )
+
+    def _select(self, rows: List[Dict]) -> List[Dict]:
+        rows = [row for row in rows if self._matches(row)]
+        for column, desc in reversed(self.orders):
+            index = ("priority_score", "received_at", "id").index(column)
+            rows.sort(key=lambda row: _inbox_key(row)[index], reverse=desc)
+        end = None if self.row_limit is None else self.row_offset + self.row_limit
+        return [_project(row, self.columns) for row in rows[self.row_offset:end]]
+
+    def execute(self) -> SimpleNamespace:
+        self.db.requests.append(self.action)
+        stored_rows = getattr(self.db, self.table)
+        if self.action == "select":
+            data = self._select(list(stored_rows.values()))
+        elif self.action == "update":
+            data = []
+            for row in stored_rows.values():
+                if self._matches(row):
+                    row.update(self.payload)
+                    data.append(dict(row))
+        elif self.table == "users":
+            assert self.action == "insert"
+            user = {"id": str(uuid.uuid4()), **_USER_DEFAULTS, **self.payload}
+            stored_rows[user["id"]] = user
+            data = [dict(user)]
+        else:
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            assert self.action == "insert" or self.on_conflict in ("", "id")
+            data = []
+            for row in rows:
+                existing = stored_rows.get(row["id"])
+                if existing is not None:
+                    if self.action == "insert":
+                        raise ValueError(f"duplicate key value: {row['id']}")
+                    if not self.ignore_duplicates:
+                        # merge-duplicates: every column sent overwrites the stored one
+                        existing.update(row)
+                        data.append(dict(existing))
+                    continue
+                stored = {**_DEFAULTS, **row}
+                missing = [c for c in _NOT_NULL if stored.get(c) is None]
+                if missing:
+                    raise NotNullViolation(f"null value in column {missing[0]!r}")
+                stored_rows[row["id"]] = stored
+                data.append(dict(stored))
+        return SimpleNamespace(data=data)
@@ -0,0 +1,69 @@
+from backend.app.services.embedding_cache import EmbeddingCache
+
+
+def _release(cache):
+    """Drop a cache's disk slot without flushing, as a crashed worker would"""
+    cache._disk._lock_file.close()
+
+
+def test_rows_overwritten_after_the_last_flush_are_not_served_for_old_keys(tmp_path):
+    cache = EmbeddingCache("org/model", 4, max_entries=1, disk_dir=str(tmp_path), disk_capacity=3)
+    for i in range(3):
+        cache.put(f"text {i}", [i + 1.0] * 4)
+    cache.flush()
+    for i in range(3, 5):
+        cache.put(f"text {i}", [i + 1.0] * 4)
+    _release(cache)
+
+    reopened = EmbeddingCache("org/model", 4, max_entries=1, disk_dir=str(tmp_path), disk_capacity=3)
+    assert reopened.get("text 0") is None
+    assert reopened.get("text 1") is None
+    for i in range(2, 5):
+        assert reopened.get(f"text {i}") == [i + 1.0] * 4
+
+
+def test_workers_sharing_a_directory_get_separate_files(tmp_path):
+    first = EmbeddingCache("org/model", 4, disk_dir=str(tmp_path), disk_capacity=3)
+    first.put("shared", [1.0] * 4)
+    first.flush()
+    second = EmbeddingCache("org/model", 4, disk_dir=str(tmp_path), disk_capacity=3)
+    second.put("other", [2.0] * 4)
+    second.flush()
+
+    assert first._disk.data_path != second._disk.data_path
+    assert first.get("shared") == [1.0] * 4
+    assert second.get("shared") is None
+
+
+def test_inference_variants_do_not_share_entries(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from backend.app.services import embedding_service
+    from backend.app.services.embedding_service import EmbeddingService
+
+    monkeypatch.setattr(embedding_service.settings, "embedding_cache_dir", str(tmp_path))
+    caches = {}
+    for backend, model in (("onnx", SimpleNamespace(quantization="int8")), ("torch", object())):
+        service = EmbeddingService()
+        service.use_api = False
+        service.backend, service.model = backend, model
+        service.open_cache()
+        caches[service.variant] = service.cache
+
+    assert set(caches) == {"onnx-int8", "torch-fp32"}
+    caches["onnx-int8"].put("same text", [1.0] * 384)
+    assert caches["torch-fp32"].get("same text") is None
+    assert caches["onnx-int8"]._disk.data_path != caches["torch-fp32"]._disk.data_path
+
+
+def test_closed_cache_is_served_after_reopening(tmp_path):
+    cache = EmbeddingCache("org/model", 4, max_entries=1, disk_dir=str(tmp_path), disk_capacity=8)
+    for i in range(3):
+        cache.put(f"text {i}", [i + 1.0] * 4)
+    data_path = cache._disk.data_path
+    cache.close()
+
+    reopened = EmbeddingCache("org/model", 4, max_entries=1, disk_dir=str(tmp_path), disk_capacity=8)
+    assert reopened._disk.data_path == data_path
+    for i in range(3):
+        assert reopened.get(f"text {i}") == [i + 1.0] * 4
@@ -0,0 +1,104 @@
+"""Each analyzed email is embedded exactly once, whichever route it comes through, and timed once."""
+
+import asyncio
+from collections import Counter
+from unittest import mock
+
+import numpy as np
+import pytest
+
+import backend.app.api.routes.emails as email_routes
+from backend.app.config import settings
+from backend.app.services.embedding_service import EmbeddingService
+from backend.app.utils.metrics import STAGE_LATENCY
+from backend.app.utils.tracing import start_trace
+from benchmarks.corpus import make_emails
+from benchmarks.stubs import fake_vector
+
+
+@pytest.fixture
+def encoded(services):
+    """Counter of texts passed to the encoder, single or batched"""
+    counts = Counter()
+
+    async def encode(text):
+        counts[text] += 1
+        return fake_vector(text)
+
+    async def encode_batch(texts, batch_size):
+        counts.update(texts)
+        return [fake_vector(t) for t in texts]
+
+    services.embedding._encode = encode
+    services.embedding._encode_batch = encode_batch
+    return counts
+
+
+def _emails(n):
+    emails = make_emails(n)
+    for i, email in enumerate(emails):
+        email["subject"] = f"{email['subject']} #{i}"
+    return emails
+
+
+def _assert_once_each(encoded, emails):
+    assert sum(encoded.values()) == len(emails)
+    assert set(encoded) == {f"{e['subject']} {e['body']}" for e in emails}
+
+
+def test_analyze_encodes_once(client, encoded):
+    emails = _emails(3)
+    for email in emails:
+        response = client.post("/api/v1/emails/analyze", json=email)
+        assert response.status_code == 200, response.text
+    _assert_once_each(encoded, emails)
+
+
+def test_batch_analyze_encodes_once(client, encoded):
+    emails = _emails(12)
+    response = client.post("/api/v1/emails/batch-analyze", json=emails)
+    assert response.status_code == 200, response.text
+    assert response.json()["total"] == len(emails)
+    _assert_once_each(encoded, emails)
+
+
+def test_fetch_encodes_once(client, encoded):
+    emails = _emails(6)
+    parsed = [{k: e[k] for k in ("subject", "body", "sender")} for e in emails]
+    with mock.patch.object(email_routes, "fetch_emails", lambda *args, **kwargs: parsed):
+        response = client.post(
+            "/api/v1/emails/fetch", json={"email": "me@example.com", "password": "secret", "limit": 6}
+        )
+    assert response.status_code == 200, response.text
+    assert response.json()["total"] == len(emails)
+    _assert_once_each(encoded, emails)
+
+
+def _embed_observations():
+    (family,) = STAGE_LATENCY.collect()
+    return next(
+        s.value for s in family.samples if s.name.endswith("_count") and s.labels["stage"] == "embed"
+    )
+
+
+def test_micro_batched_embeds_are_timed_once_per_batch(monkeypatch):
+    class Model:
+        def encode(self, texts, **kwargs):
+            return np.array([fake_vector(t) for t in texts])
+
+    service = EmbeddingService()
+    service.use_api, service.model = False, Model()
+    monkeypatch.setattr(settings, "micro_batch_window_ms", 5.0)
+    service.enable_micro_batching()
+
+    async def embed_three():
+        with start_trace("test") as trace:
+            await asyncio.gather(*(service.generate_embedding(f"text {i}") for i in range(3)))
+        return trace
+
+    STAGE_LATENCY.labels(stage="embed")  # collected only once the label exists
+    before = _embed_observations()
+    trace = asyncio.run(embed_three())
+    assert service.batcher.stats == {"batches": 1, "items": 3}
+    assert _embed_observations() - before == 1
+    assert [s.name for s in trace.spans] == ["embed_wait"] * 3
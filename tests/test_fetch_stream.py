@@ -0,0 +1,57 @@
+"""A failing parse or score stage ends /fetch/stream with an error row instead of hanging."""
+
+import asyncio
+
+import pytest
+
+import backend.app.services.fetch_pipeline as fetch_pipeline
+from backend.app.services.fetch_pipeline import stream_inbox_analysis
+
+
+async def _collect(services):
+    rows = []
+
+    async def consume():
+        async for row in stream_inbox_analysis(services, "me@example.com", "secret", limit=3):
+            rows.append(row)
+
+    await asyncio.wait_for(consume(), timeout=5)
+    return rows
+
+
+@pytest.fixture
+def inbox(monkeypatch):
+    def iter_messages(email, password, limit=10, incremental=False):
+        yield from (b"raw %d" % i for i in range(3))
+
+    def parse_messages(raws):
+        return [{"subject": raw.decode(), "body": "Please review", "sender": "a@b.com"} for raw in raws]
+
+    monkeypatch.setattr(fetch_pipeline, "iter_messages", iter_messages)
+    monkeypatch.setattr(fetch_pipeline, "parse_messages", parse_messages)
+
+
+@pytest.mark.asyncio
+async def test_parse_failure_ends_the_stream(services, inbox, monkeypatch):
+    def broken(raws):
+        raise ValueError("bad MIME")
+
+    monkeypatch.setattr(fetch_pipeline, "parse_messages", broken)
+    rows = await _collect(services)
+    assert rows == [{"error": "Inbox analysis failed: bad MIME"}]
+
+
+@pytest.mark.asyncio
+async def test_score_failure_ends_the_stream(services, inbox, monkeypatch):
+    async def broken(items, user_id="default_user"):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(services.batch, "analyze", broken)
+    rows = await _collect(services)
+    assert rows[-1] == {"error": "Inbox analysis failed: model crashed"}
+
+
+@pytest.mark.asyncio
+async def test_stream_scores_every_message(services, inbox):
+    rows = await _collect(services)
+    assert sorted(row["subject"] for row in rows) == ["raw 0", "raw 1", "raw 2"]
@@ -0,0 +1,17 @@
+"""An undated email gets the same id whichever route it comes through, in any worker."""
+
+from backend.app.services.analysis_cache import fingerprint
+
+UNDATED = {"subject": "Lunch?", "body": "Free at noon?", "sender": "friend@example.com"}
+
+
+def test_undated_email_is_fingerprinted_without_a_date(client):
+    expected = fingerprint(UNDATED["sender"], UNDATED["subject"], UNDATED["body"], None, None)
+
+    response = client.post("/api/v1/emails/analyze", json=UNDATED)
+    assert response.status_code == 200, response.text
+    assert response.json()["email_id"] == expected
+
+    response = client.post("/api/v1/emails/batch-analyze", json=[UNDATED])
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][0]["email_id"] == expected
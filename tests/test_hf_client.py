@@ -0,0 +1,122 @@
+"""HFInferenceClient against a local stub of the Inference API."""
+
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backend.app.services.hf_client as hf_module
+from backend.app.config import Settings
+from backend.app.services.hf_client import HFInferenceClient
+
+LATENCY_S = 0.05
+
+
+class _StubInferenceAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.in_flight = defaultdict(int)
+        self.max_in_flight = defaultdict(int)
+        self.requests = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+            server.in_flight[self.path] += 1
+            server.max_in_flight[self.path] = max(server.max_in_flight[self.path], server.in_flight[self.path])
+        time.sleep(LATENCY_S)
+        with server.lock:
+            server.in_flight[self.path] -= 1
+        body = json.dumps([{"label": "POSITIVE", "score": 0.9}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    server = _StubInferenceAPI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("HUGGINGFACE_API_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "test-key")
+    monkeypatch.setattr(hf_module, "settings", Settings())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(stub_api):
+    client = HFInferenceClient(max_connections=4, max_concurrency_per_model=4)
+    try:
+        for _ in range(5):
+            await client.post("org/model", {"inputs": "sequential"})
+        await asyncio.gather(*(client.post("org/model", {"inputs": f"text {i}"}) for i in range(20)))
+    finally:
+        await client.close()
+    assert stub_api.requests == 25
+    assert len(stub_api.connections) <= 4
+
+
+@pytest.mark.asyncio
+async def test_per_model_concurrency_cap(stub_api):
+    client = HFInferenceClient(max_connections=32, max_concurrency_per_model=3)
+    try:
+        await asyncio.gather(*(
+            client.post(model, {"inputs": f"text {i}"})
+            for i in range(12)
+            for model in ("org/first", "org/second")
+        ))
+    finally:
+        await client.close()
+    assert stub_api.max_in_flight["/models/org/first"] == 3
+    assert stub_api.max_in_flight["/models/org/second"] == 3
+
+
+@pytest.mark.asyncio
+async def test_calls_do_not_block_the_event_loop(stub_api):
+    client = HFInferenceClient(max_connections=8, max_concurrency_per_model=4)
+    await client.start()  # startup imports httpx; only the calls themselves are measured
+    gaps = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticks = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(client.post("org/model", {"inputs": f"text {i}"}) for i in range(16)))
+    finally:
+        elapsed = time.perf_counter() - start
+        ticks.cancel()
+        await client.close()
+    # 16 calls of 50ms, 4 at a time, overlap instead of running back to back...
+    assert elapsed < 16 * LATENCY_S * 0.75
+    # ...and the loop kept ticking meanwhile; a blocking call would allow one tick per call
+    assert len(gaps) >= elapsed / (LATENCY_S / 4)
@@ -0,0 +1,125 @@
+"""IDLE watchers keep their own checkpoint, apart from incremental /fetch."""
+
+import queue
+import time
+
+import imapclient
+import pytest
+
+import backend.app.services.imap_service as imap_service
+import backend.app.services.imap_watcher as imap_watcher
+from backend.app.services.imap_pool import imap_pool
+from backend.app.services.imap_service import CheckpointStore, fetch_emails
+from backend.app.services.imap_watcher import InboxWatcher
+
+EMAIL = "me@gmail.com"
+PASSWORD = "secret"
+
+
+class FakeMailbox:
+    uids = []
+    pushes = queue.Queue()
+
+
+class FakeIMAPClient:
+    def __init__(self, host, port=None, **kwargs):
+        self.use_uid = True
+
+    def login(self, user, password):
+        pass
+
+    def logout(self):
+        pass
+
+    def noop(self):
+        pass
+
+    def select_folder(self, folder, readonly=False):
+        uids = FakeMailbox.uids
+        return {b"EXISTS": len(uids), b"UIDVALIDITY": 7, b"UIDNEXT": max(uids, default=0) + 1}
+
+    def search(self, criteria):
+        low = int(criteria[1].split(":")[0])
+        return [uid for uid in FakeMailbox.uids if uid >= low] or FakeMailbox.uids[-1:]
+
+    def fetch(self, messages, items):
+        # Only the sequence-number UID lookup goes through here; bodies are patched below
+        lo, hi = (int(n) for n in messages.split(":"))
+        return {seq: {b"UID": FakeMailbox.uids[seq - 1]} for seq in range(lo, hi + 1)}
+
+    def idle(self):
+        pass
+
+    def idle_check(self, timeout):
+        try:
+            return [FakeMailbox.pushes.get(timeout=min(timeout, 0.05))]
+        except queue.Empty:
+            return []
+
+    def idle_done(self):
+        pass
+
+
+def _raw(uid):
+    return f"Subject: message {uid}\r\nFrom: a@b.com\r\n\r\nHello {uid}".encode()
+
+
+@pytest.fixture(autouse=True)
+def fake_imap(monkeypatch):
+    FakeMailbox.uids = [1, 2]
+    FakeMailbox.pushes = queue.Queue()
+    store = CheckpointStore()
+    monkeypatch.setattr(imapclient, "IMAPClient", FakeIMAPClient)
+    monkeypatch.setattr(imap_service, "checkpoints", store)
+    monkeypatch.setattr(imap_watcher, "checkpoints", store)
+    monkeypatch.setattr(imap_service, "_fetch_messages", lambda client, uids: [_raw(uid) for uid in uids])
+    yield store
+    imap_pool.close_all()
+
+
+def _subjects(parsed):
+    return sorted(p["subject"] for p in parsed)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_watcher_and_incremental_fetch_both_see_new_mail():
+    assert _subjects(fetch_emails(EMAIL, PASSWORD, incremental=True)) == ["message 1", "message 2"]
+
+    seen = []
+
+    def on_messages(parsed):
+        seen.extend(_subjects(parsed))
+        return True
+
+    watcher = InboxWatcher(EMAIL, PASSWORD, on_messages=on_messages)
+    watcher.start()
+    try:
+        _wait_for(lambda: watcher.connected)
+        FakeMailbox.uids.append(3)
+        FakeMailbox.pushes.put((3, b"EXISTS"))
+        _wait_for(lambda: seen == ["message 3"])
+    finally:
+        watcher.stop()
+
+    assert _subjects(fetch_emails(EMAIL, PASSWORD, incremental=True)) == ["message 3"]
+
+
+def test_unscored_messages_are_fetched_again(fake_imap):
+    watcher = InboxWatcher(EMAIL, PASSWORD, on_messages=lambda parsed: False)
+    fake_imap.set(watcher.checkpoint_key, 7, 1)
+    client = FakeIMAPClient("imap.gmail.com")
+
+    watcher._ingest(client)
+    assert fake_imap.get(watcher.checkpoint_key)["last_uid"] == 1
+
+    delivered = []
+    watcher.on_messages = lambda parsed: delivered.extend(_subjects(parsed)) or True
+    watcher._ingest(client)
+    assert delivered == ["message 2"]
+    assert fake_imap.get(watcher.checkpoint_key)["last_uid"] == 2
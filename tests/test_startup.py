@@ -0,0 +1,48 @@
+"""Cold-start budget and readiness reporting."""
+
+import statistics
+
+import pytest
+
+from backend.app.config import settings
+from backend.app.services.registry import ServiceRegistry
+from benchmarks.startup import BUDGET_MS, eager_imports, import_profile
+
+
+def test_import_stays_within_budget_and_defers_heavy_dependencies():
+    runs = [import_profile() for _ in range(3)]
+    assert eager_imports(runs[-1][0]) == []
+    assert statistics.median(total_ms for _, total_ms in runs) <= BUDGET_MS
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    # API backend without a key: nothing to download or load
+    monkeypatch.setattr(settings, "inference_backend", "api")
+    monkeypatch.setattr(settings, "huggingface_api_key", None)
+    monkeypatch.setattr(settings, "vector_backend", "local")
+    monkeypatch.setattr(settings, "database_url", None)
+    monkeypatch.setattr(settings, "supabase_url", None)
+    return ServiceRegistry()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("warmup", [False, True])
+async def test_background_startup_reports_ready(fresh_registry, warmup):
+    try:
+        await fresh_registry.start(warmup=warmup)
+        status = fresh_registry.status()
+        assert status["ready"], status
+        assert status["warmed_up"] is warmup
+    finally:
+        await fresh_registry.close()
+
+
+@pytest.mark.asyncio
+async def test_blocking_initialize_reports_ready(fresh_registry):
+    try:
+        assert fresh_registry.status()["stage"] == "not_started"
+        await fresh_registry.initialize()
+        assert fresh_registry.status()["ready"]
+    finally:
+        await fresh_registry.close()
@@ -0,0 +1,212 @@
+"""SupabaseClient against in-memory stand-ins for asyncpg and the REST client (or a real database via TEST_DATABASE_URL)."""
+
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+from backend.app.database.supabase_client import SupabaseClient, _init_connection, decode_cursor, encode_cursor
+from tests.postgres_standin import PostgresStandIn, RestStandIn
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "setup_database.sql")
+
+
+async def _real_pool():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    asyncpg = pytest.importorskip("asyncpg")
+    pool = await asyncpg.create_pool(url, init=_init_connection)
+    with open(SCHEMA) as f:
+        await pool.execute(f.read())
+    await pool.execute("TRUNCATE users, emails")
+    return pool
+
+
+@pytest.fixture(params=["standin", "rest", "postgres"])
+def backend(request):
+    return request.param
+
+
+@asynccontextmanager
+async def _database(backend: str):
+    client = SupabaseClient()
+    if backend == "rest":
+        client.client = RestStandIn()
+    else:
+        client.pool = PostgresStandIn() if backend == "standin" else await _real_pool()
+    client.initialized = True
+    try:
+        yield client
+    finally:
+        await client.close()
+
+
+def _email(**overrides):
+    row = {
+        "id": str(uuid.uuid4()),
+        "user_id": None,
+        "subject": "Contract needs signature",
+        "sender": "boss@company.com",
+        "recipient": "me@company.com",
+        "body": "Please sign today.",
+        "priority_score": 81.5,
+        "priority_level": "urgent",
+        "intent": "action_required",
+        "sentiment": "NEGATIVE",
+        "received_at": datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc),
+    }
+    row.update(overrides)
+    return row
+
+
+def _as_datetime(value):
+    # PostgREST returns timestamps as ISO strings
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+@pytest.mark.asyncio
+async def test_insert_emails_writes_all_rows_in_one_statement(backend):
+    async with _database(backend) as db:
+        rows = [_email(), _email(subject="Lunch", priority_score=20.0, priority_level="low")]
+        assert await db.insert_emails(rows) == 2
+        if isinstance(db.pool, PostgresStandIn):
+            assert len(db.pool.statements) == 1
+
+        stored = await db.get_email(rows[1]["id"])
+        assert stored["subject"] == "Lunch"
+        assert stored["priority_level"] == "low"
+        assert stored["is_read"] is False
+        assert _as_datetime(stored["received_at"]) == rows[1]["received_at"]
+
+
+@pytest.mark.asyncio
+async def test_insert_emails_conflict_refreshes_scores_only(backend):
+    async with _database(backend) as db:
+        row = _email()
+        await db.insert_emails([row])
+        rescored = {**row, "subject": "Edited subject", "priority_score": 40.0, "priority_level": "normal"}
+        new = _email(subject="New")
+        assert await db.insert_emails([rescored, new]) == 2
+
+        stored = await db.get_email(row["id"])
+        assert stored["subject"] == row["subject"]
+        assert stored["priority_score"] == 40.0
+        assert stored["priority_level"] == "normal"
+        assert (await db.get_email(new["id"]))["subject"] == "New"
+
+
+@pytest.mark.asyncio
+async def test_insert_emails_with_no_rows_skips_the_database(backend):
+    async with _database(backend) as db:
+        assert await db.insert_emails([]) == 0
+        if isinstance(db.pool, PostgresStandIn):
+            assert db.pool.statements == []
+        if isinstance(db.client, RestStandIn):
+            assert db.client.requests == []
+
+
+@pytest.mark.asyncio
+async def test_get_email_missing_returns_none(backend):
+    async with _database(backend) as db:
+        assert await db.get_email(str(uuid.uuid4())) is None
+
+
+@pytest.mark.asyncio
+async def test_update_email(backend):
+    async with _database(backend) as db:
+        row = _email()
+        await db.insert_emails([row])
+
+        updated = await db.update_email(row["id"], {"is_read": True, "priority_level": "high"})
+        assert updated["is_read"] is True
+        assert updated["priority_level"] == "high"
+        assert (await db.get_email(row["id"]))["is_read"] is True
+
+        assert (await db.update_email(row["id"], {}))["id"] == row["id"]
+        assert await db.update_email(str(uuid.uuid4()), {"is_read": True}) is None
+
+
+def _inbox_order(rows):
+    return sorted(rows, key=lambda r: (r["priority_score"], r["received_at"], r["id"]), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_through_ties_without_gaps_or_repeats(backend):
+    async with _database(backend) as db:
+        user = await db.create_user({"email": "me@company.com"})
+        tied = [_email(user_id=user["id"], priority_score=50.0) for _ in range(7)]
+        others = [
+            _email(user_id=user["id"], priority_score=90.0),
+            _email(user_id=user["id"], priority_score=50.0, received_at=datetime(2024, 4, 30, tzinfo=timezone.utc)),
+            _email(user_id=user["id"], priority_score=10.0),
+        ]
+        await db.insert_emails(tied + others + [_email()])  # the last one belongs to nobody
+
+        seen, cursor = [], None
+        while True:
+            page = await db.get_user_emails(user["id"], limit=3, cursor=cursor)
+            seen.extend(row["id"] for row in page)
+            if len(page) < 3:
+                break
+            cursor = encode_cursor(page[-1])
+
+        assert seen == [row["id"] for row in _inbox_order(tied + others)]
+
+
+@pytest.mark.asyncio
+async def test_cursor_respects_priority_filter_and_list_fields(backend):
+    async with _database(backend) as db:
+        user = await db.create_user({"email": "me@company.com"})
+        urgent = [_email(user_id=user["id"], priority_score=80.0 + i) for i in range(3)]
+        await db.insert_emails(urgent + [_email(user_id=user["id"], priority_level="low")])
+
+        first = await db.get_user_emails(user["id"], limit=2, priority_level="urgent", fields="list")
+        rest = await db.get_user_emails(
+            user["id"], limit=2, priority_level="urgent", fields="list", cursor=encode_cursor(first[-1])
+        )
+        assert [row["id"] for row in first + rest] == [row["id"] for row in _inbox_order(urgent)]
+        assert all("body" not in row and "html_body" not in row for row in first + rest)
+        assert "body" in (await db.get_user_emails(user["id"], limit=1))[0]
+
+
+@pytest.mark.asyncio
+async def test_malformed_cursor_is_rejected(backend):
+    async with _database(backend) as db:
+        for cursor in ("not a cursor", encode_cursor({"priority_score": 1.0, "received_at": "yesterday", "id": "x"})):
+            with pytest.raises(ValueError):
+                await db.get_user_emails(str(uuid.uuid4()), cursor=cursor)
+
+
+def test_cursor_round_trip():
+    row = _email()
+    assert decode_cursor(encode_cursor(row)) == (row["priority_score"], row["received_at"], row["id"])
+    as_json = {**row, "received_at": row["received_at"].isoformat()}
+    assert encode_cursor(as_json) == encode_cursor(row)
+
+
+def test_user_emails_route_pages_and_rejects_bad_cursors(client):
+    from backend.app.api.dependencies import get_database
+    from backend.app.main import app
+
+    db = SupabaseClient()
+    db.pool = PostgresStandIn()
+    user_id = str(uuid.uuid4())
+    rows = [_email(user_id=user_id, priority_score=50.0) for _ in range(3)]
+    client.portal.call(db.insert_emails, rows)
+    app.dependency_overrides[get_database] = lambda: db
+    try:
+        url = f"/api/v1/emails/user/{user_id}/emails"
+        first = client.get(url, params={"limit": 2, "fields": "list"}).json()
+        assert first["count"] == 2 and first["next_cursor"]
+        assert "body" not in first["emails"][0]
+        rest = client.get(url, params={"limit": 2, "cursor": first["next_cursor"]}).json()
+        assert rest["next_cursor"] is None
+        assert {e["id"] for e in first["emails"] + rest["emails"]} == {r["id"] for r in rows}
+
+        assert client.get(url, params={"cursor": "garbage"}).status_code == 400
+        assert client.get(url, params={"fields": "some"}).status_code == 400
+    finally:
+        app.dependency_overrides.pop(get_database, None)
@@ -0,0 +1,28 @@
+import pytest
+
+from backend.app.services.llm_service import INTENT_KEYWORDS, LLMService
+from backend.app.services.text_features import FeatureExtractor
+
+URGENCY = ["urgent", "deadline", "now", "today"]
+
+
+@pytest.fixture
+def extractor():
+    return FeatureExtractor(URGENCY, intent_keywords=INTENT_KEYWORDS)
+
+
+def test_inflected_keywords_match(extractor):
+    assert extractor.extract("Urgent deadlines", "").urgency_keywords == ["urgent", "deadline"]
+    counts = extractor.extract("Deals and prizes", "He needs the meetings scheduled").intent_counts
+    assert counts["promotional"] == 1
+    assert counts["spam"] == 1
+    assert counts["action_required"] == 1
+    assert counts["meeting"] == 2
+
+
+def test_keywords_do_not_match_inside_other_words(extractor):
+    assert extractor.extract("I know", "nowhere to be").urgency_keywords == []
+
+
+def test_plural_promotion_is_classified_promotional():
+    assert LLMService().classify_intent("inside", "Offers and discounts") == "promotional"
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from backend.app.services.vector_store import LocalVectorIndex, VectorIndex
+
+
+@pytest.fixture
+def ivf_index():
+    rng = np.random.default_rng(0)
+    index = LocalVectorIndex(16, ivf_threshold=400, nprobe=1000)
+    index.upsert([{"id": f"e{i}", "values": v} for i, v in enumerate(rng.normal(size=(600, 16)))])
+    index.query(rng.normal(size=16))
+    assert index._ivf is not None
+    return index
+
+
+def _assert_lists_consistent(index):
+    ivf = index._ivf
+    assert sorted(r for rows in ivf["lists"] for r in rows) == list(range(len(index)))
+    for cluster, rows in enumerate(ivf["lists"]):
+        assert all(ivf["assign"][r] == cluster for r in rows)
+
+
+def test_vector_index_is_abstract():
+    with pytest.raises(TypeError):
+        VectorIndex()
+
+
+def test_overwrite_and_delete_keep_the_ivf_index(ivf_index):
+    ivf = ivf_index._ivf
+    rng = np.random.default_rng(1)
+    new_vector = rng.normal(size=16)
+    ivf_index.upsert([{"id": "e3", "values": new_vector}])
+    ivf_index.delete(["e0", "e10", "e599", "missing"])
+
+    assert ivf_index._ivf is ivf
+    assert len(ivf_index) == 597
+    _assert_lists_consistent(ivf_index)
+    assert ivf_index.query(new_vector, top_k=1).matches[0].id == "e3"
+    moved = ivf_index._rows["e598"]
+    assert ivf_index.query(ivf_index._matrix[moved], top_k=1).matches[0].id == "e598"
+    assert "e0" not in {m.id for m in ivf_index.query(rng.normal(size=16), top_k=597).matches}
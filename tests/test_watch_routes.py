@@ -0,0 +1,90 @@
+import time
+
+import imapclient
+import pytest
+from imapclient.exceptions import LoginError
+
+import backend.app.services.imap_watcher as imap_watcher
+from backend.app.config import settings
+from backend.app.services.imap_watcher import InboxWatcher, watchers
+
+PASSWORD = "right password"
+
+
+class FakeIMAPClient:
+    logins = 0
+
+    def __init__(self, host, port=None, **kwargs):
+        pass
+
+    def login(self, user, password):
+        FakeIMAPClient.logins += 1
+        if password != PASSWORD:
+            raise LoginError("[AUTHENTICATIONFAILED] Invalid credentials")
+
+    def select_folder(self, folder, readonly=False):
+        return {b"UIDVALIDITY": 1, b"UIDNEXT": 1}
+
+    def idle(self):
+        pass
+
+    def idle_check(self, timeout):
+        time.sleep(0.01)
+        return []
+
+    def idle_done(self):
+        pass
+
+    def logout(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_imap(monkeypatch):
+    FakeIMAPClient.logins = 0
+    monkeypatch.setattr(imapclient, "IMAPClient", FakeIMAPClient)
+    monkeypatch.setattr(imap_watcher, "pending_uids", lambda *args, **kwargs: (1, []))
+    yield
+    watchers.stop_all()
+
+
+def _wait_until_stopped(watcher: InboxWatcher, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while watcher.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_watch_rejects_bad_credentials_up_front(client):
+    response = client.post("/api/v1/emails/watch", json={"email": "me@gmail.com", "password": "wrong"})
+    assert response.status_code == 400
+    assert watchers.get("me@gmail.com") is None
+
+
+def test_watch_results_need_the_mailbox_password(client, monkeypatch):
+    url = "/api/v1/emails/watch/me@gmail.com"
+    response = client.post("/api/v1/emails/watch", json={"email": "me@gmail.com", "password": PASSWORD})
+    assert response.status_code == 200
+
+    assert client.get(url).status_code == 422
+    assert client.get(url, headers={"X-IMAP-Password": "wrong"}).status_code == 404
+    assert client.get(url, headers={"X-IMAP-Password": PASSWORD}).json()["email"] == "me@gmail.com"
+
+    assert client.get("/api/v1/emails/watch").status_code == 403
+    monkeypatch.setattr(settings, "watch_admin_token", "admin")
+    assert client.get("/api/v1/emails/watch", headers={"Authorization": "Bearer nope"}).status_code == 403
+    listed = client.get("/api/v1/emails/watch", headers={"Authorization": "Bearer admin"})
+    assert [w["email"] for w in listed.json()["watchers"]] == ["me@gmail.com"]
+
+    assert client.delete(url, headers={"X-IMAP-Password": "wrong"}).status_code == 404
+    assert watchers.get("me@gmail.com") is not None
+    assert client.delete(url, headers={"X-IMAP-Password": PASSWORD}).status_code == 200
+    assert watchers.get("me@gmail.com") is None
+
+
+def test_watcher_stops_after_a_rejected_login():
+    watcher = InboxWatcher("me@gmail.com", "wrong", on_messages=lambda parsed: None)
+    watcher.start()
+    _wait_until_stopped(watcher)
+    assert not watcher.running
+    assert FakeIMAPClient.logins == 1
+    assert "AUTHENTICATIONFAILED" in watcher.last_error